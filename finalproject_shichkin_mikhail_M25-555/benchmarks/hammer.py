@@ -0,0 +1,90 @@
+"""
+Нагрузочная проверка конкурентных сделок из нескольких процессов.
+
+Все процессы торгуют одним и тем же пользователем в общей директории данных:
+каждая итерация — buy 1.0 BTC и sell 0.5 BTC. Если обновления не теряются,
+итоговый баланс равен workers * ops * 0.5.
+
+Запуск:
+    python benchmarks/hammer.py --workers 8 --ops 200 --backend json
+"""
+
+import argparse
+import logging
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+
+def _worker(data_dir: str, backend: str, compact: int, user_id: int, ops: int) -> int:
+    # настройки читаются при первом обращении, поэтому окружение задаём заранее
+    os.environ["VALUTATRADE_DATA_DIR"] = data_dir
+    os.environ["VALUTATRADE_LOGS_DIR"] = os.path.join(data_dir, "logs")
+    os.environ["VALUTATRADE_STORAGE"] = backend
+    os.environ["VALUTATRADE_JOURNAL_COMPACT"] = str(compact)
+
+    from valutatrade_hub.core.usecases import buy, sell
+
+    logging.disable(logging.CRITICAL)
+
+    failures = 0
+    for _ in range(ops):
+        try:
+            buy(user_id, "BTC", 1.0)
+            sell(user_id, "BTC", 0.5)
+        except Exception:
+            failures += 1
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=200)
+    parser.add_argument(
+        "--backend", choices=("json", "sharded", "sqlite"), default="json"
+    )
+    parser.add_argument(
+        "--compact", type=int, default=50, help="порог сворачивания журнала"
+    )
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="valutatrade_hammer_")
+    user_id = 1
+
+    ctx = mp.get_context("spawn")
+    started = time.perf_counter()
+    with ctx.Pool(args.workers) as pool:
+        failures = pool.starmap(
+            _worker,
+            [(data_dir, args.backend, args.compact, user_id, args.ops)]
+            * args.workers,
+        )
+    elapsed = time.perf_counter() - started
+
+    os.environ["VALUTATRADE_DATA_DIR"] = data_dir
+    os.environ["VALUTATRADE_LOGS_DIR"] = os.path.join(data_dir, "logs")
+    os.environ["VALUTATRADE_STORAGE"] = args.backend
+    from valutatrade_hub.infra.repository import get_repository
+
+    portfolio = get_repository().get_portfolio(user_id) or {"wallets": {}}
+    balance = portfolio["wallets"].get("BTC", {}).get("balance", 0.0)
+    expected = args.workers * args.ops * 0.5
+    trades = args.workers * args.ops * 2
+
+    print(f"data dir:  {data_dir}")
+    print(f"trades:    {trades} за {elapsed:.2f} с ({trades / elapsed:.0f} сделок/с)")
+    print(f"failures:  {sum(failures)}")
+    print(f"balance:   {balance} (ожидается {expected})")
+
+    if sum(failures) or balance != expected:
+        print("FAIL: потерянные обновления или ошибки сделок")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Бюджет времени запуска CLI.
+
+Импортирует точку входа в чистом процессе под `python -X importtime` и
+проверяет три вещи:
+- суммарное время импорта модуля (лучший из N прогонов) не превышает бюджет;
+- тяжёлые зависимости (requests, sqlite3, ...) не загружаются при импорте;
+- импорт не создаёт каталогов данных и логов.
+Код возврата 1, если хоть одна проверка не прошла.
+
+Бюджет задаётся абсолютно (--budget-ms или VALUTATRADE_IMPORT_BUDGET_MS) либо
+относительно базового замера (--save / --baseline). Вместе с модулем меряется
+импорт эталонного набора стандартной библиотеки, и базовое время
+пересчитывается на скорость текущей машины, так что один базовый файл годится
+и для разработки, и для медленного CI. Без бюджета и базового замера время
+только выводится.
+
+Запуск:
+    python benchmarks/importtime.py --save benchmarks/importtime.json
+    python benchmarks/importtime.py --baseline benchmarks/importtime.json
+    python benchmarks/importtime.py --budget-ms 25 --runs 5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# модули, которые нужны только отдельным командам и грузятся по требованию
+FORBIDDEN = (
+    "requests",
+    "urllib3",
+    "sqlite3",
+    "concurrent.futures",
+    "prettytable",
+    "tempfile",
+)
+
+# эталон скорости машины: стандартная библиотека без кода проекта
+REFERENCE = "logging"
+
+
+def measure(module: str) -> tuple[float, dict[str, int], list[str]]:
+    """Один импорт: (время модуля в мс, {модуль: собственное время мкс}, созданное)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp) / "data"
+        env = dict(os.environ, VALUTATRADE_DATA_DIR=str(data_dir))
+        # меряем импорт с готовым байт-кодом, а не компиляцию исходников
+        env.pop("PYTHONDONTWRITEBYTECODE", None)
+        env["PYTHONPATH"] = os.pathsep.join(
+            filter(None, [str(ROOT), env.get("PYTHONPATH")])
+        )
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=tmp,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        created = sorted(p.name for p in Path(tmp).iterdir())
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        try:
+            own, cumulative, name = line[len("import time:") :].split("|")
+            rows.append((int(own), int(cumulative), name))
+        except ValueError:
+            continue  # заголовок таблицы
+    # модули, загруженные самим module: строки перед ним с большим отступом
+    # (то, что импортировал site до него, не считается)
+    end = max(i for i, row in enumerate(rows) if row[2].strip() == module)
+    depth = len(rows[end][2]) - len(rows[end][2].lstrip())
+    start = end
+    while start > 0:
+        name = rows[start - 1][2]
+        if len(name) - len(name.lstrip()) <= depth:
+            break
+        start -= 1
+    self_times = {name.strip(): own for own, _, name in rows[start : end + 1]}
+    return rows[end][1] / 1000, self_times, created
+
+
+def _best(module: str, runs: int) -> tuple[float, dict[str, int], list[str]]:
+    measure(module)  # прогрев: запись байт-кода
+    return min((measure(module) for _ in range(runs)), key=lambda r: r[0])
+
+
+def _budget(args, reference_ms: float) -> float | None:
+    """Бюджет в мс: явный или базовый замер, пересчитанный на эту машину."""
+    if args.budget_ms is not None:
+        return args.budget_ms
+    if not args.baseline:
+        return None
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+    scale = reference_ms / baseline["reference_ms"]
+    expected = baseline["ms"] * scale
+    print(
+        f"базовый замер: {baseline['ms']:.1f} ms, эталон {scale:.2f}x "
+        f"-> ожидается {expected:.1f} ms"
+    )
+    return max(expected * (1 + args.threshold), expected + args.min_delta_ms)
+
+
+def main() -> int:
+    env_budget = os.environ.get("VALUTATRADE_IMPORT_BUDGET_MS")
+    parser = argparse.ArgumentParser(description="Бюджет времени импорта CLI")
+    parser.add_argument("--module", default="valutatrade_hub.main")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(env_budget) if env_budget else None,
+        help="абсолютный бюджет, мс (VALUTATRADE_IMPORT_BUDGET_MS)",
+    )
+    parser.add_argument("--save", help="сохранить замер как базовый (JSON)")
+    parser.add_argument("--baseline", help="сравнить с базовым замером (JSON)")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="допустимое замедление, доля"
+    )
+    parser.add_argument(
+        "--min-delta-ms", type=float, default=2.0, help="игнорируемая разница, мс"
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="самые дорогие модули")
+    args = parser.parse_args()
+
+    best_ms, self_times, created = _best(args.module, args.runs)
+    reference_ms = _best(REFERENCE, args.runs)[0]
+    budget = _budget(args, reference_ms)
+    ok = True
+
+    limit = f"бюджет {budget:.1f} ms" if budget is not None else "без бюджета"
+    print(f"{args.module}: {best_ms:.1f} ms ({limit}; эталон {reference_ms:.1f} ms)")
+    for name, own_us in sorted(self_times.items(), key=lambda kv: -kv[1])[: args.top]:
+        print(f"  {own_us / 1000:7.2f} ms  {name}")
+    if budget is not None and best_ms > budget:
+        print("FAIL: превышен бюджет времени импорта")
+        ok = False
+
+    loaded = [m for m in FORBIDDEN if m in self_times]
+    if loaded:
+        print(f"FAIL: при импорте загружены {', '.join(loaded)}")
+        ok = False
+    if created:
+        print(f"FAIL: импорт создал {', '.join(created)}")
+        ok = False
+
+    if args.save:
+        report = {"module": args.module, "ms": best_ms, "reference_ms": reference_ms}
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Базовый замер сохранён: {args.save}")
+
+    if ok:
+        print("OK")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+"""
+Сквозная нагрузка: много процессов-трейдеров на одной директории данных.
+
+Каждый рабочий процесс регистрирует своих пользователей, входит под ними
+через CLI и выполняет случайные buy / sell / get-rate — как собственными
+пользователями, так и одним общим «горячим» пользователем, за которого
+торгуют все процессы. Параллельно отдельный процесс переписывает курсы
+через RatesUpdater с клиентами-заглушками (без сети).
+
+Каждый процесс ведёт журнал исполненных сделок. После прогона проверяются
+инварианты сохранения: баланс каждого кошелька равен сумме исполненных по
+нему сделок, отрицательных балансов нет, все пользователи на месте с
+уникальными id, а portfolios.json и rates.json читаются. Суммы сделок —
+двоичные дроби (0.25, 0.5, ...), поэтому балансы сравниваются точно.
+С --migrate данные затем переносятся командой migrate в SQLite, и те же
+инварианты проверяются уже по перенесённой базе.
+
+Запуск:
+    python benchmarks/loadgen.py --workers 8 --users 4 --ops 500 --backend json
+    python benchmarks/loadgen.py --backend sharded --migrate
+"""
+
+import argparse
+import io
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from pathlib import Path
+
+CODES = ("USD", "EUR", "RUB", "BTC", "ETH")
+USD_RATES = {"EUR": 1.0786, "RUB": 0.01016, "BTC": 59337.21, "ETH": 3720.0}
+AMOUNTS = (0.25, 0.5, 1.0, 2.0, 4.0)
+PASSWORD = "load1234"
+HOT_USER = "hot"
+
+
+def _setup_env(data_dir: str, backend: str) -> None:
+    # настройки читаются при первом обращении, поэтому окружение задаём заранее
+    os.environ["VALUTATRADE_DATA_DIR"] = data_dir
+    os.environ["VALUTATRADE_LOGS_DIR"] = os.path.join(data_dir, "logs")
+    os.environ["VALUTATRADE_STORAGE"] = backend
+    os.environ["VALUTATRADE_RATES_TTL"] = str(10**9)  # без обращений к сети
+    os.environ["VALUTATRADE_RATES_MAX_STALE"] = str(10**9)
+
+
+def _rates(rng: random.Random) -> dict:
+    stamp = datetime.now(timezone.utc).isoformat()
+    return {
+        f"{code}_USD": {
+            "rate": rate * (1 + rng.uniform(-0.01, 0.01)),
+            "updated_at": stamp,
+            "source": "loadgen",
+        }
+        for code, rate in USD_RATES.items()
+    }
+
+
+def _quiet(func, *args) -> str:
+    out = io.StringIO()
+    with redirect_stdout(out):
+        func(*args)
+    return out.getvalue()
+
+
+def _updater(data_dir: str, backend: str, interval: float, stop, cycles) -> None:
+    """Фоновое обновление курсов, пока не выставлен stop; cycles — счётчик."""
+    _setup_env(data_dir, backend)
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    from valutatrade_hub.parser_service.api_clients import BaseApiClient
+    from valutatrade_hub.parser_service.updater import RatesUpdater
+
+    rng = random.Random(os.getpid())
+
+    class StubClient(BaseApiClient):
+        def fetch_rates(self) -> dict:
+            return _rates(rng)
+
+    updater = RatesUpdater(clients=[StubClient()])
+    while not stop.wait(interval):
+        updater.run_update()
+        cycles.value += 1
+
+
+def _worker(
+    data_dir: str, backend: str, worker: int, users: int, ops: int, hot_id: int
+) -> dict:
+    _setup_env(data_dir, backend)
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    from valutatrade_hub.cli import interface
+    from valutatrade_hub.core.usecases import buy, get_rate, sell
+
+    rng = random.Random(worker)
+    latencies: dict[str, list[float]] = {"buy": [], "sell": [], "get_rate": []}
+    errors: dict[str, int] = {}
+    # исполненные сделки этого процесса: (user_id, валюта) -> сумма
+    ledger: dict[tuple[int, str], float] = {}
+    user_ids: dict[str, int] = {}
+
+    for i in range(users):
+        username = f"w{worker}u{i}"
+        _quiet(interface.register, ["--username", username, "--password", PASSWORD])
+        _quiet(interface.login, ["--username", username, "--password", PASSWORD])
+        user = interface.CURRENT_USER
+        if not user or user["username"] != username:
+            errors["LoginFailed"] = errors.get("LoginFailed", 0) + 1
+            continue
+        user_ids[username] = user["user_id"]
+    traders = list(user_ids.values()) + [hot_id]
+
+    for _ in range(ops):
+        user_id = rng.choice(traders)
+        kind = rng.choices(("buy", "sell", "get_rate"), weights=(4, 3, 3))[0]
+        code = rng.choice(CODES)
+        amount = rng.choice(AMOUNTS)
+        if kind == "sell":
+            # продаём не больше купленного этим процессом: чужие сделки
+            # горячего пользователя не могут сделать продажу невозможной
+            held = ledger.get((user_id, code), 0.0)
+            if held < AMOUNTS[0]:
+                kind = "buy"
+            else:
+                amount = min(amount, held)
+
+        started = time.perf_counter()
+        try:
+            if kind == "buy":
+                buy(user_id, code, amount)
+            elif kind == "sell":
+                sell(user_id, code, amount)
+            else:
+                rate, _ = get_rate(*rng.sample(CODES, 2))
+                if not (rate > 0 and math.isfinite(rate)):
+                    raise ValueError(f"некорректный курс {rate}")
+        except Exception as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            continue
+        finally:
+            latencies[kind].append(time.perf_counter() - started)
+        if kind != "get_rate":
+            sign = 1 if kind == "buy" else -1
+            ledger[(user_id, code)] = ledger.get((user_id, code), 0.0) + sign * amount
+
+    return {
+        "latencies": latencies,
+        "errors": errors,
+        "ledger": list(ledger.items()),
+        "users": user_ids,
+    }
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)]
+
+
+def _check(results: list[dict], hot_id: int, repository=None) -> list[str]:
+    """Проверка инвариантов (по умолчанию — в текущем хранилище)."""
+    from valutatrade_hub.infra.repository import get_repository
+    from valutatrade_hub.infra.settings import SettingsLoader
+
+    settings = SettingsLoader()
+    repository = repository or get_repository()
+    problems = []
+
+    for key in ("PORTFOLIOS_FILE", "RATES_FILE", "USERS_FILE"):
+        path = Path(settings.get(key))
+        if path.suffix == ".json" and path.exists():
+            try:
+                json.loads(path.read_text(encoding="utf-8"))
+            except ValueError as e:
+                problems.append(f"{path.name} повреждён: {e}")
+
+    registered = {name: uid for r in results for name, uid in r["users"].items()}
+    if len(set(registered.values())) != len(registered):
+        problems.append("у разных пользователей совпали user_id")
+    for username, user_id in registered.items():
+        user = repository.find_user(username)
+        if not user or user["user_id"] != user_id:
+            problems.append(f"пользователь {username} потерян или сменил id")
+
+    expected: dict[tuple[int, str], float] = {}
+    for r in results:
+        for (user_id, code), amount in r["ledger"]:
+            expected[(user_id, code)] = expected.get((user_id, code), 0.0) + amount
+    for user_id in set(registered.values()) | {hot_id}:
+        portfolio = repository.get_portfolio(user_id) or {"wallets": {}}
+        wallets = portfolio["wallets"]
+        for code, wallet in wallets.items():
+            if wallet["balance"] < 0:
+                problems.append(f"user_id={user_id} {code}: баланс {wallet['balance']}")
+        codes = set(wallets) | {c for (u, c) in expected if u == user_id}
+        for code in codes:
+            actual = wallets.get(code, {}).get("balance", 0.0)
+            want = expected.get((user_id, code), 0.0)
+            if actual != want:
+                problems.append(
+                    f"user_id={user_id} {code}: баланс {actual}, по сделкам {want}"
+                )
+
+    rates = repository.load_rates()
+    for code in USD_RATES:
+        if f"{code}_USD" not in rates:
+            problems.append(f"в rates.json нет пары {code}_USD")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=8, help="процессов-трейдеров")
+    parser.add_argument("--users", type=int, default=4, help="пользователей на процесс")
+    parser.add_argument("--ops", type=int, default=500, help="операций на процесс")
+    parser.add_argument(
+        "--backend", choices=("json", "sharded", "sqlite"), default="json"
+    )
+    parser.add_argument(
+        "--update-interval", type=float, default=0.05, help="пауза обновлений, с"
+    )
+    parser.add_argument(
+        "--migrate",
+        action="store_true",
+        help="после прогона перенести данные в SQLite и проверить их там",
+    )
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="valutatrade_loadgen_")
+    _setup_env(data_dir, args.backend)
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    from valutatrade_hub.cli import interface
+    from valutatrade_hub.parser_service.storage import RatesStorage
+
+    RatesStorage().update_rates_cache(_rates(random.Random(0)))
+    _quiet(interface.register, ["--username", HOT_USER, "--password", PASSWORD])
+    _quiet(interface.login, ["--username", HOT_USER, "--password", PASSWORD])
+    hot_id = interface.CURRENT_USER["user_id"]
+
+    ctx = mp.get_context("spawn")
+    stop, cycles = ctx.Event(), ctx.Value("i", 0)
+    updater = ctx.Process(
+        target=_updater,
+        args=(data_dir, args.backend, args.update_interval, stop, cycles),
+    )
+    updater.start()
+    deadline = time.monotonic() + 30
+    while not cycles.value and updater.is_alive() and time.monotonic() < deadline:
+        time.sleep(0.01)  # трейдеры стартуют, когда курсы уже обновляются
+    with ctx.Pool(args.workers) as pool:
+        started = time.perf_counter()
+        results = pool.starmap(
+            _worker,
+            [
+                (data_dir, args.backend, w, args.users, args.ops, hot_id)
+                for w in range(args.workers)
+            ],
+        )
+        elapsed = time.perf_counter() - started
+    stop.set()
+    updater.join()
+
+    print(f"data dir:  {data_dir}")
+    print(f"процессов: {args.workers}, пользователей: {args.workers * args.users}")
+    print(f"обновлений курсов: {cycles.value}")
+    trades = 0
+    print(
+        f"{'операция':<10}{'всего':>8}{'оп/с':>9}{'p50, мс':>10}{'p99, мс':>10}"
+        f"{'p99.9, мс':>11}"
+    )
+    for kind in ("buy", "sell", "get_rate"):
+        values = sorted(v for r in results for v in r["latencies"][kind])
+        if kind != "get_rate":
+            trades += len(values)
+        print(
+            f"{kind:<10}{len(values):>8}{len(values) / elapsed:>9.0f}"
+            f"{_percentile(values, 0.5) * 1000:>10.3f}"
+            f"{_percentile(values, 0.99) * 1000:>10.3f}"
+            f"{_percentile(values, 0.999) * 1000:>11.3f}"
+        )
+    print(f"сделок:    {trades} за {elapsed:.2f} с ({trades / elapsed:.0f} сделок/с)")
+
+    errors: dict[str, int] = {}
+    for r in results:
+        for name, count in r["errors"].items():
+            errors[name] = errors.get(name, 0) + count
+    problems = [f"ошибки операций: {errors}"] if errors else []
+    problems += _check(results, hot_id)
+
+    if args.migrate and args.backend != "sqlite":
+        from valutatrade_hub.infra.settings import SettingsLoader
+        from valutatrade_hub.infra.sqlite_repository import SqliteRepository
+
+        print(_quiet(interface.migrate, ["--to", "sqlite"]).strip())
+        migrated = SqliteRepository(SettingsLoader().get("SQLITE_FILE"))
+        problems += [f"sqlite: {p}" for p in _check(results, hot_id, migrated)]
+
+    if problems:
+        print("FAIL:")
+        for problem in problems[:20]:
+            print(f"- {problem}")
+        if len(problems) > 20:
+            print(f"... и ещё {len(problems) - 20}")
+        return 1
+    print("OK: балансы совпадают с исполненными сделками")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,46 +1,58 @@
-import hashlib
+import io
 import json
 import random
 import shlex
 import string
+import sys
+import time
+from contextlib import nullcontext, redirect_stdout
 from datetime import datetime
-from pathlib import Path
 
+from valutatrade_hub.core.currencies import is_known
 from valutatrade_hub.core.exceptions import (
     ApiRequestError,
     CurrencyNotFoundError,
     InsufficientFundsError,
 )
-from valutatrade_hub.core.usecases import buy, get_rate, sell
+from valutatrade_hub.core.rates_cache import get_rates_cache, to_iso
+from valutatrade_hub.core.usecases import (
+    buy,
+    execute_orders,
+    get_rate,
+    get_rates,
+    get_user_portfolio,
+    population_report,
+    sell,
+)
+from valutatrade_hub.infra.repository import get_repository
+from valutatrade_hub.infra.sessions import get_session_store
 from valutatrade_hub.infra.settings import SettingsLoader
+from valutatrade_hub.profiling import profiled
 
 settings = SettingsLoader()
-USERS_FILE = settings.get("USERS_FILE")
-PORTFOLIOS_FILE = settings.get("PORTFOLIOS_FILE")
 CURRENT_USER: dict | None = None
+# команда сообщила об ошибке (отказ, неверный ввод) — для --exec и --script
+_failed = False
 
 
-def load_json(file_path) -> list | dict:
-    file_path = Path(file_path)
-    if not file_path.exists():
-        if file_path.name in ("users.json", "portfolios.json"):
-            return []
-        return {}
-    with file_path.open("r", encoding="utf-8") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            if file_path.name in ("users.json", "portfolios.json"):
-                return []
-            return {}
+def _fail(message: str) -> None:
+    """Печатает сообщение об ошибке и отмечает команду как неуспешную."""
+    global _failed
+    _failed = True
+    print(message)
+
 
+def command_failed() -> bool:
+    """Сообщила ли об ошибке последняя команда execute()."""
+    return _failed
 
-def save_json(file_path, data) -> None:
-    file_path = Path(file_path)
-    file_path.parent.mkdir(parents=True, exist_ok=True)
 
-    with file_path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+def current_user() -> dict | None:
+    """Вошедший пользователь: из памяти процесса или из сохранённой сессии."""
+    global CURRENT_USER
+    if CURRENT_USER is None:
+        CURRENT_USER = get_session_store().current_user()
+    return CURRENT_USER
 
 
 def register(args: list[str]) -> None:
@@ -55,7 +67,7 @@ def register(args: list[str]) -> None:
             key, value = args[i], args[i + 1]
             args_dict[key] = value
     except (IndexError, ValueError):
-        print(
+        _fail(
             "Ошибка: неправильный формат. "
             "Пример: register --username alice --password 1234"
         )
@@ -66,40 +78,32 @@ def register(args: list[str]) -> None:
 
     # --- Проверки ---
     if not username:
-        print("Ошибка: имя пользователя не указано.")
+        _fail("Ошибка: имя пользователя не указано.")
         return
     if not password or len(password) < 4:
-        print("Ошибка: пароль должен быть не короче 4 символов.")
+        _fail("Ошибка: пароль должен быть не короче 4 символов.")
         return
 
-    # --- Загрузка существующих пользователей ---
-    users = load_json(USERS_FILE)
-
     # --- Проверка уникальности ---
-    if any(u["username"] == username for u in users):
-        print(f"Имя пользователя '{username}' уже занято.")
+    if get_repository().find_user(username):
+        _fail(f"Имя пользователя '{username}' уже занято.")
         return
 
-    # --- Генерация id и соли ---
-    new_id = max((u["user_id"] for u in users), default=0) + 1
+    # --- Генерация соли ---
     salt = "".join(random.choices(string.ascii_letters + string.digits, k=8))
-    hashed_password = hashlib.sha256((password + salt).encode()).hexdigest()
+    import hashlib
 
-    # --- Создание пользователя ---
-    user = {
-        "user_id": new_id,
-        "username": username,
-        "hashed_password": hashed_password,
-        "salt": salt,
-        "registration_date": datetime.now().isoformat(),
-    }
-    users.append(user)
-    save_json(USERS_FILE, users)
+    hashed_password = hashlib.sha256((password + salt).encode()).hexdigest()
 
-    # --- Создание пустого портфеля ---
-    portfolios = load_json(PORTFOLIOS_FILE)
-    portfolios.append({"user_id": new_id, "wallets": {}})
-    save_json(PORTFOLIOS_FILE, portfolios)
+    # --- Создание пользователя вместе с пустым портфелем ---
+    try:
+        user = get_repository().add_user(
+            username, hashed_password, salt, datetime.now().isoformat()
+        )
+    except ValueError as e:
+        _fail(str(e))
+        return
+    new_id = user["user_id"]
 
     print(
         f"Пользователь '{username}' зарегистрирован (id={new_id}). "
@@ -119,7 +123,7 @@ def login(args: list[str]) -> None:
             key, value = args[i], args[i + 1]
             args_dict[key] = value
     except (IndexError, ValueError):
-        print(
+        _fail(
             "Ошибка: неправильный формат. "
             "Пример: login --username alice --password 1234"
         )
@@ -129,39 +133,71 @@ def login(args: list[str]) -> None:
     password = args_dict.get("--password")
 
     if not username or not password:
-        print("Ошибка: укажите и имя пользователя, и пароль.")
+        _fail("Ошибка: укажите и имя пользователя, и пароль.")
         return
 
-    # --- Загрузка пользователей ---
-    users = load_json(USERS_FILE)
-    user = next((u for u in users if u["username"] == username), None)
+    # --- Поиск пользователя ---
+    user = get_repository().find_user(username)
 
     if not user:
-        print(f"Пользователь '{username}' не найден.")
+        _fail(f"Пользователь '{username}' не найден.")
         return
 
     # --- Проверка пароля ---
+    import hashlib
+
     hashed_input = hashlib.sha256((password + user["salt"]).encode()).hexdigest()
     if hashed_input != user["hashed_password"]:
-        print("Неверный пароль.")
+        _fail("Неверный пароль.")
         return
 
-    # --- Если всё ок ---
+    # --- Если всё ок: сессия для следующих команд и процессов ---
+    store = get_session_store()
+    store.save_current(store.create(user))
     print(f"Вы вошли как '{username}'")
 
     global CURRENT_USER
     CURRENT_USER = user
 
 
+def logout(args: list[str]) -> None:
+    """
+    Завершает текущую сессию (--all — все сессии пользователя).
+    Пример: logout --all
+    """
+    global CURRENT_USER
+    store = get_session_store()
+    user = current_user()
+    if not user:
+        _fail("Вы не вошли в систему.")
+        return
+
+    if "--all" in args:
+        closed = store.revoke_user(user["user_id"])
+        print(f"Закрыто сессий пользователя '{user['username']}': {closed}")
+    else:
+        token = store.current_token()
+        if token:
+            store.revoke(token)
+        print(f"Вы вышли из '{user['username']}'")
+    store.clear_current()
+    CURRENT_USER = None
+
+
+def cleanup_sessions(args: list[str]) -> None:
+    """Удаляет истёкшие сессии. Пример: cleanup-sessions"""
+    removed = get_session_store().cleanup()
+    print(f"Удалено истёкших сессий: {removed}")
+
+
 def show_portfolio(args: list[str]) -> None:
     """
     Показывает портфель пользователя.
     Пример: show-portfolio --base USD
     """
-    global CURRENT_USER
-
-    if not CURRENT_USER:
-        print("Сначала выполните login.")
+    user = current_user()
+    if not user:
+        _fail("Сначала выполните login.")
         return
 
     # --- Парсинг аргументов ---
@@ -170,48 +206,41 @@ def show_portfolio(args: list[str]) -> None:
         try:
             base_currency = args[args.index("--base") + 1].upper()
         except IndexError:
-            print("Ошибка: не указана базовая валюта после --base.")
+            _fail("Ошибка: не указана базовая валюта после --base.")
             return
 
     # --- Проверка известной валюты ---
-    known_currencies = ["USD", "EUR", "BTC", "ETH", "RUB"]
-    if base_currency not in known_currencies:
-        print(f"Неизвестная базовая валюта '{base_currency}'.")
+    if not is_known(base_currency):
+        _fail(f"Неизвестная базовая валюта '{base_currency}'.")
         return
 
-    # --- Загрузка портфелей и курсов ---
-    portfolios = load_json(PORTFOLIOS_FILE)
-    # rates = load_json(os.path.join(DATA_DIR, "rates.json")) #пока не используется
-
-    portfolio = next(
-        (p for p in portfolios if p["user_id"] == CURRENT_USER["user_id"]),
-        None,
-    )
+    # --- Загрузка портфеля и курсов ---
+    portfolio = get_user_portfolio(user["user_id"])
 
     if not portfolio or not portfolio["wallets"]:
         print("У вас пока нет кошельков.")
         return
 
-    # --- Заглушка для курсов ---
-    exchange_rates = {
-        "USD": 1.0,
-        "EUR": 1.07,
-        "BTC": 59337.21,
-        "ETH": 3720.00,
-        "RUB": 0.01016,
-    }
+    # курсы к USD из общего кэша (кросс-курсы — через матрицу)
+    exchange_rates = get_rates_cache().usd_rates()
+    base_rate = exchange_rates.get(base_currency)
+    if not base_rate:
+        _fail(f"Нет курса для '{base_currency}'. Выполните 'update-rates'.")
+        return
 
     total_value = 0.0
     print(
-        f"Портфель пользователя '{CURRENT_USER['username']}' "
+        f"Портфель пользователя '{user['username']}' "
         f"(база: {base_currency}):"
     )
 
     for code, data in portfolio["wallets"].items():
         balance = data.get("balance", 0.0)
-        rate = exchange_rates.get(code, 0)
-        base_rate = exchange_rates.get(base_currency, 1)
-        value_in_base = (balance * rate) / base_rate if base_rate != 0 else 0
+        rate = exchange_rates.get(code)
+        if rate is None:
+            print(f"- {code}: {balance:.4f}  →  нет курса")
+            continue
+        value_in_base = balance * rate / base_rate
 
         print(f"- {code}: {balance:.4f}  →  {value_in_base:.2f} {base_currency}")
         total_value += value_in_base
@@ -220,6 +249,468 @@ def show_portfolio(args: list[str]) -> None:
     print(f"ИТОГО: {total_value:,.2f} {base_currency}")
 
 
+def rate_pairs(from_arg: str, to_arg: str) -> list[tuple[str, str]]:
+    """
+    Пары для get-rate: --from/--to принимают список через запятую
+    (USD,EUR,RUB) или ALL — все валюты, для которых известны курсы.
+    """
+
+    def codes(arg: str) -> list[str]:
+        if arg.upper() == "ALL":
+            return [code for code in get_rates_cache().currencies() if is_known(code)]
+        return [code.strip().upper() for code in arg.split(",") if code.strip()]
+
+    pairs = [(src, dst) for src in codes(from_arg) for dst in codes(to_arg)]
+    if len(pairs) > 1:
+        # в списках курс валюты к самой себе не нужен
+        pairs = [(src, dst) for src, dst in pairs if src != dst]
+    return pairs
+
+
+def leaderboard(args: list[str]) -> None:
+    """
+    Оценка портфелей всех пользователей: top-N и позиция по валютам.
+    Пример: leaderboard --base USD --top 10
+    """
+    try:
+        args_dict = {args[i]: args[i + 1] for i in range(0, len(args), 2)}
+        top_n = int(args_dict.get("--top", 10))
+    except (IndexError, ValueError):
+        _fail("Ошибка: неправильный формат. Пример: leaderboard --base USD --top 10")
+        return
+    base_currency = args_dict.get("--base", "USD").upper()
+
+    report = population_report(base_currency, top_n)
+
+    print(
+        f"Пользователей: {report['users']}, суммарная стоимость: "
+        f"{report['total']:,.2f} {base_currency}"
+    )
+    print(f"Топ-{top_n}:")
+    for place, (user_id, value) in enumerate(report["top"], start=1):
+        user = get_repository().get_user(user_id)
+        name = user["username"] if user else f"id={user_id}"
+        print(f"{place:>3}. {name}: {value:,.2f} {base_currency}")
+
+    print("Позиция по валютам:")
+    for code, value in sorted(report["exposure"].items(), key=lambda kv: -kv[1]):
+        print(f"- {code}: {value:,.2f} {base_currency}")
+    if report["unpriced"]:
+        print(f"Без курса (не учтены): {', '.join(sorted(report['unpriced']))}")
+
+
+def rate_history(args: list[str]) -> None:
+    """
+    История курса из хранилища Parser Service.
+    Примеры:
+        rate-history --from BTC --to USD --since 24h --interval 1h
+        rate-history --from BTC --to USD --at 2026-01-13T21:40
+    """
+    from valutatrade_hub.parser_service.history import (
+        RateHistory,
+        parse_interval,
+        parse_time,
+    )
+
+    try:
+        args_dict = {args[i]: args[i + 1] for i in range(0, len(args), 2)}
+    except IndexError:
+        _fail(
+            "Ошибка: неправильный формат. "
+            "Пример: rate-history --from BTC --to USD --since 24h --interval 1h"
+        )
+        return
+
+    from_code = (args_dict.get("--from") or "").upper()
+    to_code = (args_dict.get("--to") or "").upper()
+    if not from_code or not to_code:
+        _fail("Ошибка: укажите валюты через --from и --to.")
+        return
+
+    try:
+        since = parse_time(args_dict["--since"]) if "--since" in args_dict else None
+        until = parse_time(args_dict["--until"]) if "--until" in args_dict else None
+        at = parse_time(args_dict["--at"]) if "--at" in args_dict else None
+        interval = (
+            parse_interval(args_dict["--interval"])
+            if "--interval" in args_dict
+            else None
+        )
+    except ValueError as e:
+        _fail(f"Ошибка ввода: {e}")
+        return
+
+    # границы запроса: для --at нужен последний курс не позже at
+    if at is not None:
+        series = RateHistory().series(from_code, to_code, until=at)
+    else:
+        series = RateHistory().series(from_code, to_code, since, until)
+    if series is None or not len(series):
+        print(f"История курса {from_code}→{to_code} пуста. Выполните 'update-rates'.")
+        return
+
+    def fmt_time(ts: float) -> str:
+        return datetime.fromtimestamp(ts).isoformat(timespec="seconds")
+
+    if at is not None:
+        found = series.rate_at(at)
+        if found is None:
+            _fail(f"Нет курса {from_code}→{to_code} на {fmt_time(at)}.")
+            return
+        rate, rate_ts = found
+        print(f"Курс {from_code}→{to_code} на {fmt_time(at)}: {rate:.8f} "
+              f"(зафиксирован {fmt_time(rate_ts)})")
+        return
+
+    if interval is not None:
+        bars = series.ohlc(interval, since, until)
+        print(f"{from_code}→{to_code}, свечи {args_dict['--interval']} ({len(bars)}):")
+        for bar in bars:
+            print(
+                f"- {fmt_time(bar.start)}  O {bar.open:.6f}  H {bar.high:.6f}  "
+                f"L {bar.low:.6f}  C {bar.close:.6f}  ({bar.count})"
+            )
+        return
+
+    points = series.range(since, until)
+    print(f"{from_code}→{to_code}, точек: {len(points)}")
+    for ts, rate in points:
+        print(f"- {fmt_time(ts)}: {rate:.8f}")
+
+
+def stats(args: list[str]) -> None:
+    """
+    Метрики текущего процесса: задержки операций, кэш курсов, объём
+    чтения/записи хранилища и источники курсов.
+    Примеры: stats, stats --format prometheus
+    """
+    from valutatrade_hub.metrics import get_metrics
+
+    metrics = get_metrics()
+    if "--format" in args and "prometheus" in args:
+        print(metrics.to_prometheus(), end="")
+        return
+
+    def ms(seconds: float) -> str:
+        return f"{seconds * 1000:.2f}"
+
+    # --- Операции ---
+    errors: dict[str, float] = {}
+    for labels, n in metrics.counters("valutatrade_action_errors_total").items():
+        action = dict(labels)["action"]
+        errors[action] = errors.get(action, 0) + n
+
+    actions = metrics.histograms("valutatrade_action_seconds")
+    if not actions:
+        print("Операций ещё не было.")
+    else:
+        print(
+            f"{'Операция':<12}{'вызовов':>8}{'ошибок':>8}"
+            f"{'p50, мс':>10}{'p99, мс':>10}{'ср., мс':>10}"
+        )
+        for labels, h in sorted(actions.items()):
+            action = dict(labels)["action"]
+            print(
+                f"{action:<12}{h.count:>8}{errors.get(action, 0):>8.0f}"
+                f"{ms(h.quantile(0.5)):>10}{ms(h.quantile(0.99)):>10}"
+                f"{ms(h.sum / h.count):>10}"
+            )
+
+    # --- Кэш курсов ---
+    requests = {
+        dict(labels)["result"]: n
+        for labels, n in metrics.counters("valutatrade_rates_requests_total").items()
+    }
+    reloads = sum(metrics.counters("valutatrade_rates_cache_reloads_total").values())
+    counts = ", ".join(
+        f"{k} {requests.get(k, 0):.0f}" for k in ("fresh", "stale", "miss")
+    )
+    print(f"Курсы: {counts}; перечитываний кэша {reloads:.0f}")
+
+    # --- Хранилище ---
+    traffic = metrics.counters("valutatrade_store_bytes_total")
+    if traffic:
+        print("Хранилище:")
+        for labels, n in sorted(traffic.items()):
+            info = dict(labels)
+            print(f"- {info['file']} ({info['op']}): {n / 1024:,.1f} КБ")
+
+    # --- Источники курсов ---
+    providers = metrics.histograms("valutatrade_provider_fetch_seconds")
+    results = metrics.counters("valutatrade_provider_results_total")
+    names = {dict(labels)["provider"] for labels in [*providers, *results]}
+    if names:
+        print("Источники курсов:")
+    for name in sorted(names):
+        h = providers.get((("provider", name),))
+        timing = (
+            f"p50 {ms(h.quantile(0.5))} мс, p99 {ms(h.quantile(0.99))} мс"
+            if h
+            else "нет ответов"
+        )
+        outcome = ", ".join(
+            f"{dict(labels)['result']} {n:.0f}"
+            for labels, n in sorted(results.items())
+            if dict(labels)["provider"] == name
+        )
+        print(f"- {name}: {timing}; {outcome}")
+
+
+def batch(args: list[str]) -> None:
+    """
+    Исполняет заявки из файла (.csv или .jsonl) и печатает результат каждой.
+    Пример: batch --file orders.csv --atomic
+    """
+    from valutatrade_hub.core.orders import load_orders
+
+    if "--file" not in args or args.index("--file") + 1 >= len(args):
+        _fail("Ошибка: укажите файл. Пример: batch --file orders.csv [--atomic]")
+        return
+    path = args[args.index("--file") + 1]
+
+    counts: dict[str, int] = {}
+    for result in execute_orders(load_orders(path), atomic="--atomic" in args):
+        order = result.order
+        who = order.username or order.user_id or "?"
+        line = (
+            f"[{order.line}] {order.side} {order.amount} {order.currency} "
+            f"({who}): {result.status}"
+        )
+        if result.balance is not None:
+            line += f", баланс {result.balance:.4f}"
+        if result.message:
+            line += f" — {result.message}"
+        print(line)
+        counts[result.status] = counts.get(result.status, 0) + 1
+
+    summary = ", ".join(f"{status}: {n}" for status, n in counts.items())
+    print(f"Итого заявок {sum(counts.values())} ({summary or 'нет'})")
+
+
+def migrate(args: list[str]) -> None:
+    """
+    Переносит JSON-данные в SQLite-хранилище.
+    Пример: migrate --to sqlite
+    """
+    target = "sqlite"
+    if "--to" in args:
+        try:
+            target = args[args.index("--to") + 1].lower()
+        except IndexError:
+            _fail("Ошибка: не указан бэкенд после --to.")
+            return
+    if target != "sqlite":
+        _fail(f"Перенос в '{target}' не поддерживается. Доступно: sqlite.")
+        return
+
+    from valutatrade_hub.infra.migrate import migrate_json_to_sqlite
+
+    counts = migrate_json_to_sqlite(
+        settings.get("USERS_FILE"),
+        settings.get("PORTFOLIOS_FILE"),
+        settings.get("RATES_FILE"),
+        settings.get("SQLITE_FILE"),
+        settings.get("JOURNAL_FILE"),
+        settings.get("PORTFOLIOS_DIR"),
+        settings.get("LOCKS_DIR"),
+    )
+    print(
+        f"Перенесено в {settings.get('SQLITE_FILE')}: "
+        f"пользователей {counts['users']}, кошельков {counts['wallets']}, "
+        f"курсов {counts['rates']}. "
+        "Включите: VALUTATRADE_STORAGE=sqlite"
+    )
+
+
+def execute(command: str, args: list[str]) -> bool:
+    """
+    Выполняет одну команду CLI. Возвращает False, если это exit;
+    об отказе команды сообщает command_failed().
+    """
+    global _failed
+    _failed = False
+    with profiled(command):
+        return _execute(command, args)
+
+
+def _execute(command: str, args: list[str]) -> bool:
+    if command == "exit":
+        print("Выход из программы.")
+        return False
+
+    elif command == "help":
+        print(
+            "Доступные команды: "
+            "register, login, logout, show-portfolio, buy, sell, "
+            "get-rate, update-rates, show-rates, rate-history, "
+            "leaderboard, batch, stats, migrate, cleanup-sessions, exit"
+        )
+
+    elif command == "register":
+        register(args)
+
+    elif command == "login":
+        login(args)
+
+    elif command == "logout":
+        logout(args)
+
+    elif command == "cleanup-sessions":
+        cleanup_sessions(args)
+
+    elif command == "show-portfolio":
+        show_portfolio(args)
+
+    elif command == "buy":
+        try:
+            args_dict = {args[i]: args[i + 1] for i in range(0, len(args), 2)}
+            currency = args_dict.get("--currency")
+            amount = float(args_dict.get("--amount", 0))
+
+            user = current_user()
+            if not user:
+                _fail("Сначала выполните login.")
+                return True
+
+            buy(user["user_id"], currency, amount)
+            print(f"Покупка {amount:.4f} {currency} успешно выполнена.")
+
+        except ValueError as e:
+            _fail(f"Ошибка ввода: {e}")
+        except CurrencyNotFoundError as e:
+            _fail(str(e))
+        except ApiRequestError as e:
+            _fail(f"Не удалось получить курс: {e}")
+        except Exception as e:
+            _fail(f"Неожиданная ошибка: {e}")
+
+    elif command == "sell":
+        try:
+            args_dict = {args[i]: args[i + 1] for i in range(0, len(args), 2)}
+            currency = args_dict.get("--currency")
+            amount = float(args_dict.get("--amount", 0))
+
+            user = current_user()
+            if not user:
+                _fail("Сначала выполните login.")
+                return True
+
+            sell(user["user_id"], currency, amount)
+            print(f"Продажа {amount:.4f} {currency} успешно выполнена.")
+
+        except InsufficientFundsError as e:
+            _fail(str(e))
+        except CurrencyNotFoundError as e:
+            _fail(str(e))
+        except ApiRequestError as e:
+            _fail(f"Ошибка получения курса: {e}")
+        except ValueError as e:
+            _fail(f"Ошибка ввода: {e}")
+        except Exception as e:
+            _fail(f"Неожиданная ошибка: {e}")
+
+    elif command == "get-rate":
+        try:
+            args_dict = {args[i]: args[i + 1] for i in range(0, len(args), 2)}
+            from_code = args_dict.get("--from")
+            to_code = args_dict.get("--to")
+
+            if not from_code or not to_code:
+                _fail("Ошибка: укажите валюты через --from и --to.")
+                return True
+
+            pairs = rate_pairs(from_code, to_code)
+            if len(pairs) == 1:
+                rate, updated_at = get_rate(*pairs[0])
+                print(
+                    f"Курс {from_code}→{to_code}: {rate:.8f} "
+                    f"(обновлено: {updated_at})"
+                )
+                return True
+
+            # несколько пар — одним пакетным запросом
+            for (src, dst), quote in get_rates(pairs).items():
+                if quote is None:
+                    print(f"Курс {src}→{dst}: недоступен")
+                else:
+                    print(
+                        f"Курс {src}→{dst}: {quote[0]:.8f} "
+                        f"(обновлено: {quote[1]})"
+                    )
+
+        except CurrencyNotFoundError as e:
+            _fail(str(e))
+            print(
+                "Попробуйте команду help "
+                "или проверьте список доступных валют."
+            )
+        except ApiRequestError as e:
+            _fail(f"Ошибка API: {e}. Повторите попытку позже.")
+        except Exception as e:
+            _fail(f"Неожиданная ошибка: {e}")
+
+    elif command == "update-rates":
+        from valutatrade_hub.parser_service.updater import RatesUpdater
+        try:
+            updater = RatesUpdater()
+            result = updater.run_update()
+            if result.failed:
+                _fail(f"Ошибка обновления: нет ответа от {', '.join(result.failed)}")
+        except Exception as e:
+            _fail(f"Ошибка обновления: {e}")
+
+    elif command == "show-rates":
+        try:
+            cache = get_rates_cache()
+            pairs = cache.snapshot()
+
+            if not pairs:
+                print("Локальный кеш курсов пуст. Выполните 'update-rates'.")
+                return True
+
+            print(
+                f"Rates from cache (updated at {to_iso(cache.last_refresh())}):"
+            )
+            for pair, (rate, _ts, source) in pairs.items():
+                print(f"- {pair}: {rate:.5f} ({source})")
+
+        except Exception as e:
+            _fail(f"Ошибка при чтении кеша: {e}")
+
+    elif command == "leaderboard":
+        try:
+            leaderboard(args)
+        except CurrencyNotFoundError as e:
+            _fail(str(e))
+        except ValueError as e:
+            _fail(f"Ошибка: {e}")
+
+    elif command == "rate-history":
+        try:
+            rate_history(args)
+        except Exception as e:
+            _fail(f"Ошибка при чтении истории: {e}")
+
+    elif command == "batch":
+        try:
+            batch(args)
+        except (OSError, ValueError) as e:
+            _fail(f"Ошибка чтения заявок: {e}")
+
+    elif command == "stats":
+        stats(args)
+
+    elif command == "migrate":
+        try:
+            migrate(args)
+        except Exception as e:
+            _fail(f"Ошибка переноса: {e}. База не изменена.")
+
+    else:
+        _fail(f"Неизвестная команда: {command}")
+    return True
+
+
 def run_app() -> None:
     """Главный цикл CLI."""
     print("ValutaTrade CLI — введите команду (help для справки).")
@@ -231,135 +722,84 @@ def run_app() -> None:
                 continue
 
             parts = shlex.split(command_line)
-            command, args = parts[0], parts[1:]
-
-            if command == "exit":
-                print("Выход из программы.")
+            if not execute(parts[0], parts[1:]):
                 break
 
-            elif command == "help":
-                print(
-                    "Доступные команды: "
-                    "register, login, show-portfolio, buy, sell, "
-                    "get-rate, update-rates, show-rates, exit"
-                )
-
-            elif command == "register":
-                register(args)
-
-            elif command == "login":
-                login(args)
-
-            elif command == "show-portfolio":
-                show_portfolio(args)
-
-            elif command == "buy":
-                try:
-                    args_dict = {args[i]: args[i + 1] for i in range(0, len(args), 2)}
-                    currency = args_dict.get("--currency")
-                    amount = float(args_dict.get("--amount", 0))
-
-                    if not CURRENT_USER:
-                        print("Сначала выполните login.")
-                        continue
-
-                    buy(CURRENT_USER["user_id"], currency, amount)
-                    print(f"Покупка {amount:.4f} {currency} успешно выполнена.")
-
-                except ValueError as e:
-                    print(f"Ошибка ввода: {e}")
-                except CurrencyNotFoundError as e:
-                    print(str(e))
-                except ApiRequestError as e:
-                    print(f"Не удалось получить курс: {e}")
-                except Exception as e:
-                    print(f"Неожиданная ошибка: {e}")
-
-            elif command == "sell":
-                try:
-                    args_dict = {args[i]: args[i + 1] for i in range(0, len(args), 2)}
-                    currency = args_dict.get("--currency")
-                    amount = float(args_dict.get("--amount", 0))
-
-                    if not CURRENT_USER:
-                        print("Сначала выполните login.")
-                        continue
-
-                    sell(CURRENT_USER["user_id"], currency, amount)
-                    print(f"Продажа {amount:.4f} {currency} успешно выполнена.")
-
-                except InsufficientFundsError as e:
-                    print(str(e))
-                except CurrencyNotFoundError as e:
-                    print(str(e))
-                except ApiRequestError as e:
-                    print(f"Ошибка получения курса: {e}")
-                except ValueError as e:
-                    print(f"Ошибка ввода: {e}")
-                except Exception as e:
-                    print(f"Неожиданная ошибка: {e}")
-
-            elif command == "get-rate":
-                try:
-                    args_dict = {args[i]: args[i + 1] for i in range(0, len(args), 2)}
-                    from_code = args_dict.get("--from")
-                    to_code = args_dict.get("--to")
-
-                    if not from_code or not to_code:
-                        print("Ошибка: укажите валюты через --from и --to.")
-                        continue
-
-                    rate, updated_at = get_rate(from_code, to_code)
-                    print(
-                        f"Курс {from_code}→{to_code}: {rate:.8f} "
-                        f"(обновлено: {updated_at})"
-                    )
-
-                except CurrencyNotFoundError as e:
-                    print(str(e))
-                    print(
-                        "Попробуйте команду help "
-                        "или проверьте список доступных валют."
-                    )
-                except ApiRequestError as e:
-                    print(f"Ошибка API: {e}. Повторите попытку позже.")
-                except Exception as e:
-                    print(f"Неожиданная ошибка: {e}")
-
-            elif command == "update-rates":
-                from valutatrade_hub.parser_service.updater import RatesUpdater
-                try:
-                    updater = RatesUpdater()
-                    updater.run_update()
-                except Exception as e:
-                    print(f"Ошибка обновления: {e}")
-
-            elif command == "show-rates":
-                from valutatrade_hub.parser_service.storage import RatesStorage
-
-                try:
-                    storage = RatesStorage()
-                    data = storage.read_json(storage.config.RATES_FILE_PATH)
-
-                    if not data or "pairs" not in data or not data["pairs"]:
-                        print("Локальный кеш курсов пуст. Выполните 'update-rates'.")
-                        continue
-
-                    print(f"Rates from cache (updated at {data['last_refresh']}):")
-                    for pair, info in data["pairs"].items():
-                        print(f"- {pair}: {info['rate']:.5f} ({info['source']})")
-
-                except FileNotFoundError:
-                    print("Файл кеша не найден. Выполните 'update-rates'.")
-                except Exception as e:
-                    print(f"Ошибка при чтении кеша: {e}")
-
-            else:
-                print(f"Неизвестная команда: {command}")
-
         except (KeyboardInterrupt, EOFError):
             print("\nВыход из программы.")
             break
-        
+
+
+def run_command(command_line: str) -> int:
+    """Выполняет одну команду без интерактивного цикла (project --exec)."""
+    parts = shlex.split(command_line)
+    if not parts:
+        return 0
+    try:
+        execute(parts[0], parts[1:])
+    except Exception as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    return 1 if command_failed() else 0
+
+
+def _masked(parts: list[str]) -> str:
+    """Команда для вывода: значение --password скрыто."""
+    shown = list(parts)
+    for i, part in enumerate(shown[:-1]):
+        if part == "--password":
+            shown[i + 1] = "****"
+    return shlex.join(shown)
+
+
+def _masked_text(text: str) -> str:
+    """
+    Строка, которую не удалось разобрать: границы значения --password
+    неизвестны (например, незакрытая кавычка), поэтому скрыт весь хвост.
+    """
+    head, found, _ = text.partition("--password")
+    return f"{head}--password ****" if found else text
+
+
+def run_script(path: str) -> int:
+    """
+    Выполняет команды из файла ('-' — stdin) в одном процессе: вход (login),
+    репозиторий и кэш курсов сохраняются между командами. Пустые строки и
+    строки с # пропускаются. На каждую команду печатается строка JSON:
+    {"line", "command", "ok", "output", "ms"}; ok=false — команда отказала
+    (сообщение об ошибке — в "output") или упала с необработанной ошибкой
+    (текст в "error"). Код возврата 1, если такие были.
+    """
+    failed = 0
+    source = nullcontext(sys.stdin) if path == "-" else open(path, encoding="utf-8")
+    with source as lines:
+        for number, text in enumerate(lines, start=1):
+            text = text.strip()
+            if not text or text.startswith("#"):
+                continue
+
+            record: dict = {"line": number}
+            buffer = io.StringIO()
+            started = time.perf_counter()
+            keep_going = True
+            try:
+                parts = shlex.split(text)
+                record["command"] = _masked(parts)
+                with redirect_stdout(buffer):
+                    keep_going = execute(parts[0], parts[1:])
+                record["ok"] = not command_failed()
+                failed += command_failed()
+            except Exception as e:
+                failed += 1
+                record.setdefault("command", _masked_text(text))
+                record.update(ok=False, error=str(e))
+            record["output"] = buffer.getvalue().splitlines()
+            record["ms"] = round((time.perf_counter() - started) * 1000, 3)
+            print(json.dumps(record, ensure_ascii=False))
+            if not keep_going:
+                break
+    return 1 if failed else 0
+
+
 if __name__ == "__main__":
     run_app()
\ No newline at end of file
@@ -1,10 +1,26 @@
+"""
+Валюты и их реестр.
+
+Список валют — данные, а не код: core/currencies.json (или файл из
+VALUTATRADE_CURRENCIES_FILE). Реестр читается один раз при первом обращении,
+дальше get_currency — поиск в словаре без создания объектов. Тот же реестр
+задаёт, какие курсы запрашивает Parser Service.
+"""
+
+import json
 from abc import ABC, abstractmethod
+from collections.abc import Mapping
 from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
 
 from valutatrade_hub.core.exceptions import CurrencyNotFoundError
+from valutatrade_hub.infra.settings import SettingsLoader
 
+CURRENCIES_FILE = Path(__file__).with_name("currencies.json")
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class Currency(ABC):
     """
     Абстрактный базовый класс валюты.
@@ -25,7 +41,7 @@ class Currency(ABC):
         pass
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class FiatCurrency(Currency):
     """
     Фиатная валюта (USD, EUR, RUB и т.д.)
@@ -37,14 +53,15 @@ class FiatCurrency(Currency):
         return f"[FIAT] {self.code} — {self.name} (Issuing: {self.issuing_country})"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CryptoCurrency(Currency):
     """
-    Криптовалюта (BTC, ETH и т.д.)
+    Криптовалюта (BTC, ETH и т.д.); coingecko_id — id монеты в CoinGecko.
     """
 
     algorithm: str
     market_cap: float
+    coingecko_id: str = ""
 
     def get_display_info(self) -> str:
         return (
@@ -53,23 +70,71 @@ class CryptoCurrency(Currency):
         )
 
 
-# Реестр валют
+_KINDS = {"fiat": FiatCurrency, "crypto": CryptoCurrency}
+
+
+def load_currencies(path: str | Path) -> Mapping[str, Currency]:
+    """Читает файл валют: [{"code", "type": "fiat"|"crypto", "name", ...}]."""
+    with open(path, encoding="utf-8") as f:
+        records = json.load(f)
+
+    registry: dict[str, Currency] = {}
+    for record in records:
+        fields = dict(record)
+        kind = fields.pop("type", None)
+        if kind not in _KINDS:
+            raise ValueError(f"Неизвестный тип валюты {kind!r} в {path}")
+        try:
+            currency = _KINDS[kind](**fields)
+        except TypeError as e:
+            raise ValueError(f"Некорректная запись валюты {record} в {path}: {e}")
+        registry[currency.code] = currency
+    return MappingProxyType(registry)
+
+
+_registry: Mapping[str, Currency] | None = None
+
+
+def currency_registry() -> Mapping[str, Currency]:
+    """Реестр валют {код: валюта}; загружается один раз."""
+    global _registry
+    if _registry is None:
+        path = SettingsLoader().get("CURRENCIES_FILE") or CURRENCIES_FILE
+        _registry = load_currencies(path)
+    return _registry
+
+
 def get_currency(code: str) -> Currency:
     """
     Возвращает экземпляр валюты по коду.
     Если код неизвестен — выбрасывает CurrencyNotFoundError.
     """
-
-    code = code.upper()
-    registry = {
-        "USD": FiatCurrency("US Dollar", "USD", "United States"),
-        "EUR": FiatCurrency("Euro", "EUR", "Eurozone"),
-        "RUB": FiatCurrency("Russian Ruble", "RUB", "Russia"),
-        "BTC": CryptoCurrency("Bitcoin", "BTC", "SHA-256", 1.12e12),
-        "ETH": CryptoCurrency("Ethereum", "ETH", "Ethash", 4.45e11),
-    }
-
-    if code not in registry:
-        raise CurrencyNotFoundError(f"Неизвестная валюта: {code}")
-
-    return registry[code]
\ No newline at end of file
+    registry = _registry if _registry is not None else currency_registry()
+    currency = registry.get(code)
+    if currency is None:
+        code = str(code).upper()
+        currency = registry.get(code)
+        if currency is None:
+            raise CurrencyNotFoundError(code)
+    return currency
+
+
+def is_known(code: str) -> bool:
+    """Есть ли валюта в реестре."""
+    try:
+        get_currency(code)
+    except CurrencyNotFoundError:
+        return False
+    return True
+
+
+def fiat_codes() -> tuple[str, ...]:
+    return tuple(
+        code for code, c in currency_registry().items() if isinstance(c, FiatCurrency)
+    )
+
+
+def crypto_codes() -> tuple[str, ...]:
+    return tuple(
+        code for code, c in currency_registry().items() if isinstance(c, CryptoCurrency)
+    )
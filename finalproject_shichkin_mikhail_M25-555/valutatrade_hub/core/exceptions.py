@@ -1,8 +1,8 @@
 class CurrencyNotFoundError(Exception):
     """Выбрасывается, если код валюты не найден в реестре."""
 
-    def __init__(self, code: str):
-        super().__init__(f"Неизвестная валюта '{code}'")
+    def __init__(self, code: str, message: str | None = None):
+        super().__init__(message or f"Неизвестная валюта '{code}'")
         self.code = code
 
 
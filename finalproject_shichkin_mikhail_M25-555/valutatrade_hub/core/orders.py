@@ -0,0 +1,94 @@
+"""
+Пакетные заявки на покупку и продажу из файла.
+
+Формат — CSV с заголовком или JSON Lines (по расширению файла), поля:
+user_id или username, side (buy/sell), currency, amount. Ошибки разбора
+не прерывают чтение: такая заявка помечается и отклоняется при исполнении.
+"""
+
+import csv
+import json
+import math
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+# статусы исполнения заявки
+OK = "ok"
+REJECTED = "rejected"  # не прошла проверку, к портфелю не применялась
+FAILED = "failed"  # не исполнена (например, не хватило средств)
+ROLLED_BACK = "rolled_back"  # отменена вместе с остальными заявками пользователя
+
+SIDES = ("buy", "sell")
+
+
+@dataclass
+class Order:
+    """Заявка из файла; line — номер строки для сообщений."""
+
+    line: int
+    side: str
+    currency: str
+    amount: float | None
+    user_id: int | None = None
+    username: str | None = None
+    error: str | None = None  # ошибка разбора строки
+
+
+@dataclass
+class OrderResult:
+    order: Order
+    status: str
+    message: str = ""
+    balance: float | None = None  # баланс кошелька после заявки
+
+
+def _parse(line: int, record: dict) -> Order:
+    order = Order(
+        line=line,
+        side=str(record.get("side") or "").strip().lower(),
+        currency=str(record.get("currency") or "").strip().upper(),
+        amount=None,
+        username=(str(record.get("username") or "").strip() or None),
+    )
+    try:
+        order.amount = float(record.get("amount"))
+        if not math.isfinite(order.amount):  # nan, inf
+            raise ValueError(order.amount)
+    except (TypeError, ValueError):
+        order.amount = None
+        order.error = f"некорректная сумма: {record.get('amount')!r}"
+    user_id = record.get("user_id")
+    if user_id not in (None, ""):
+        try:
+            order.user_id = int(user_id)
+        except (TypeError, ValueError):
+            order.error = f"некорректный user_id: {user_id!r}"
+    return order
+
+
+def load_orders(path: str | Path) -> Iterator[Order]:
+    """Читает заявки из .csv или .jsonl (.ndjson) файла."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    with open(path, encoding="utf-8", newline="") as f:
+        if suffix == ".csv":
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield _parse(reader.line_num, record)
+        elif suffix in (".jsonl", ".ndjson"):
+            for line, text in enumerate(f, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    record = json.loads(text)
+                    if not isinstance(record, dict):
+                        raise ValueError("ожидается объект")
+                except ValueError as e:
+                    yield Order(line, "", "", None, error=f"некорректный JSON: {e}")
+                    continue
+                yield _parse(line, record)
+        else:
+            raise ValueError(
+                f"Неподдерживаемый формат '{path.suffix}'. Ожидается .csv или .jsonl"
+            )
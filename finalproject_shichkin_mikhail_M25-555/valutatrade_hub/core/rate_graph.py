@@ -0,0 +1,114 @@
+"""
+Граф курсов и предрасчитанная матрица кросс-курсов N×N.
+
+Вершины — валюты, рёбра — известные пары (в обе стороны, обратное ребро
+с курсом 1/rate). Курс любой пары находится триангуляцией по кратчайшему
+(по числу звеньев) пути через промежуточные валюты; при равной длине
+выбирается путь с более свежим самым старым звеном. Время кросс-курса —
+время самого старого звена пути.
+
+Матрица строится один раз после обновления курсов и сохраняется вместе
+с кэшем; после этого любой курс — поиск по индексу за O(1).
+"""
+
+from datetime import datetime
+
+
+def _epoch(timestamp: str) -> float:
+    return datetime.fromisoformat(timestamp).timestamp()
+
+
+class CrossRates:
+    """Матрица кросс-курсов: rates[i][j] — сколько j дают за 1 единицу i."""
+
+    def __init__(
+        self,
+        currencies: list[str],
+        rates: list[list[float | None]],
+        updated_at: list[list[float | None]],
+    ) -> None:
+        self.currencies = currencies
+        self.index = {code: i for i, code in enumerate(currencies)}
+        self.rates = rates
+        self.updated_at = updated_at
+
+    @classmethod
+    def from_pairs(cls, pairs: dict) -> "CrossRates":
+        """Строит матрицу из пар {"BTC_USD": {"rate", "updated_at"}, ...}."""
+        graph: dict[str, dict[str, tuple[float, float]]] = {}
+        for pair, info in pairs.items():
+            try:
+                from_code, to_code = pair.split("_")
+                rate = float(info["rate"])
+                ts = _epoch(info["updated_at"])
+            except (ValueError, KeyError, TypeError):
+                continue
+            if rate <= 0:
+                continue
+            for a, b, r in ((from_code, to_code, rate), (to_code, from_code, 1 / rate)):
+                # из двух котировок одного ребра берём более свежую
+                known = graph.setdefault(a, {}).get(b)
+                if known is None or known[1] < ts:
+                    graph[a][b] = (r, ts)
+
+        currencies = sorted(graph)
+        index = {code: i for i, code in enumerate(currencies)}
+        n = len(currencies)
+        rates: list[list[float | None]] = [[None] * n for _ in range(n)]
+        stamps: list[list[float | None]] = [[None] * n for _ in range(n)]
+
+        for src in currencies:
+            row, row_ts = rates[index[src]], stamps[index[src]]
+            row[index[src]] = 1.0
+            # поиск в ширину по слоям: пути из 1 звена, затем из 2 и т.д.
+            frontier = {src: (1.0, float("inf"))}
+            while frontier:
+                layer: dict[str, tuple[float, float]] = {}
+                for node, (rate, oldest) in frontier.items():
+                    for nxt, (edge_rate, edge_ts) in graph[node].items():
+                        if row[index[nxt]] is not None:
+                            continue
+                        candidate = (rate * edge_rate, min(oldest, edge_ts))
+                        best = layer.get(nxt)
+                        if best is None or best[1] < candidate[1]:
+                            layer[nxt] = candidate
+                for node, (rate, oldest) in layer.items():
+                    row[index[node]] = rate
+                    row_ts[index[node]] = oldest
+                frontier = layer
+
+        return cls(currencies, rates, stamps)
+
+    def lookup(self, from_code: str, to_code: str) -> tuple[float, float] | None:
+        """(курс, время epoch самого старого звена) или None, если пути нет."""
+        i = self.index.get(from_code)
+        j = self.index.get(to_code)
+        if i is None or j is None or self.rates[i][j] is None:
+            return None
+        ts = self.updated_at[i][j]
+        if ts is None:  # диагональ: X -> X
+            ts = datetime.now().timestamp()
+        return self.rates[i][j], ts
+
+    def column(self, to_code: str) -> dict[str, float]:
+        """Курсы всех достижимых валют к to_code: {код: курс}."""
+        j = self.index.get(to_code)
+        if j is None:
+            return {to_code: 1.0}
+        return {
+            code: row[j]
+            for code, row in zip(self.currencies, self.rates)
+            if row[j] is not None
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "currencies": self.currencies,
+            "rates": self.rates,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CrossRates":
+        return cls(data["currencies"], data["rates"], data["updated_at"])
+
@@ -0,0 +1,101 @@
+"""
+Общий для процесса кэш курсов.
+
+Курсы и матрица кросс-курсов разбираются один раз и хранятся в памяти,
+время курсов — в секундах epoch. Хранилище перечитывается, только когда
+меняется его метка версии (mtime rates.json или счётчик версии в SQLite),
+а саму метку кэш проверяет не чаще раза в CHECK_INTERVAL секунд —
+повторные котировки в одной сессии не обращаются к диску.
+"""
+
+import time
+from datetime import datetime, timezone
+
+from valutatrade_hub.core.rate_graph import CrossRates
+from valutatrade_hub.infra.repository import Repository, get_repository
+from valutatrade_hub.metrics import get_metrics
+
+# как часто (сек.) сверяться с меткой версии хранилища
+CHECK_INTERVAL = 1.0
+
+
+class RatesCache:
+    """Курсы в памяти: пары, матрица кросс-курсов и время обновления."""
+
+    def __init__(self, repository: Repository) -> None:
+        self.repository = repository
+        self._version: object = object()
+        self._checked_at = float("-inf")
+        self.pairs: dict[str, tuple[float, float, str]] = {}
+        self.cross = CrossRates([], [], [])
+
+    def invalidate(self) -> None:
+        """Заставляет перечитать хранилище при следующем обращении."""
+        self._checked_at = float("-inf")
+
+    def _ensure_loaded(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        version = self.repository.rates_version()
+        if version == self._version:
+            return
+
+        get_metrics().inc("valutatrade_rates_cache_reloads_total")
+        pairs = {}
+        raw, saved = self.repository.load_rates_and_cross()
+        for pair, info in raw.items():
+            try:
+                ts = datetime.fromisoformat(info["updated_at"]).timestamp()
+                pairs[pair] = (float(info["rate"]), ts, info.get("source", ""))
+            except (KeyError, TypeError, ValueError):
+                continue
+        self.pairs = pairs
+        self.cross = (
+            CrossRates.from_dict(saved) if saved else CrossRates.from_pairs(raw)
+        )
+        self._version = version
+
+    def get(self, from_code: str, to_code: str) -> tuple[float, float] | None:
+        """(курс, время epoch) для пары — прямой или кросс-курс; None, если нет."""
+        self._ensure_loaded()
+        direct = self.pairs.get(f"{from_code}_{to_code}")
+        if direct is not None:
+            return direct[0], direct[1]
+        return self.cross.lookup(from_code, to_code)
+
+    def usd_rates(self) -> dict[str, float]:
+        """Курсы всех известных валют к USD (столбец матрицы кросс-курсов)."""
+        self._ensure_loaded()
+        return self.cross.column("USD")
+
+    def currencies(self) -> list[str]:
+        """Валюты, для которых известен хотя бы один курс."""
+        self._ensure_loaded()
+        return list(self.cross.currencies)
+
+    def snapshot(self) -> dict[str, tuple[float, float, str]]:
+        """Все сохранённые пары: {пара: (курс, время epoch, источник)}."""
+        self._ensure_loaded()
+        return dict(self.pairs)
+
+    def last_refresh(self) -> float | None:
+        """Время самого свежего курса (epoch) или None, если курсов нет."""
+        self._ensure_loaded()
+        return max((ts for _, ts, _ in self.pairs.values()), default=None)
+
+
+def to_iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat(timespec="seconds")
+
+
+_rates_cache: RatesCache | None = None
+
+
+def get_rates_cache() -> RatesCache:
+    """Возвращает общий для процесса кэш курсов."""
+    global _rates_cache
+    if _rates_cache is None:
+        _rates_cache = RatesCache(get_repository())
+    return _rates_cache
@@ -1,6 +1,8 @@
-import json
-import os
-from datetime import datetime
+import math
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from pathlib import Path
 
 from valutatrade_hub.core.currencies import get_currency
 from valutatrade_hub.core.exceptions import (
@@ -8,73 +10,153 @@ from valutatrade_hub.core.exceptions import (
     CurrencyNotFoundError,
     InsufficientFundsError,
 )
+from valutatrade_hub.core.orders import (
+    FAILED,
+    OK,
+    REJECTED,
+    ROLLED_BACK,
+    SIDES,
+    Order,
+    OrderResult,
+)
+from valutatrade_hub.core.rates_cache import get_rates_cache, to_iso
+from valutatrade_hub.core.valuation import PortfolioMatrix
 from valutatrade_hub.decorators import log_action
+from valutatrade_hub.infra.locks import file_lock, try_file_lock
+from valutatrade_hub.infra.repository import get_repository
 from valutatrade_hub.infra.settings import SettingsLoader
-from valutatrade_hub.logging_config import setup_logger
+from valutatrade_hub.logging_config import get_logger
+from valutatrade_hub.metrics import get_metrics
 
-logger = setup_logger()
+logger = get_logger("usecases")
 settings = SettingsLoader()
 
-USERS_FILE = settings.get("USERS_FILE")
-PORTFOLIOS_FILE = settings.get("PORTFOLIOS_FILE")
-RATES_FILE = settings.get("RATES_FILE")
-
 
 # вспомогательные функции
-def load_json(file_path: str) -> list | dict:
-    if not os.path.exists(file_path):
-        name = os.path.basename(file_path)
-        if name in ("users.json", "portfolios.json"):
-            return []
-        if name == "rates.json":
-            return {}
-        return {}
-    with open(file_path, "r", encoding="utf-8") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            name = os.path.basename(file_path)
-            if name in ("users.json", "portfolios.json"):
-                return []
-            if name == "rates.json":
-                return {}
-            return {}
+def get_user_portfolio(user_id: int) -> dict | None:
+    return get_repository().get_portfolio(user_id)
 
 
-def save_json(file_path: str, data) -> None:
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+def _run_refresh() -> None:
+    """Запускает обновление курсов Parser Service; результат попадает в кэш."""
+    try:
+        from valutatrade_hub.parser_service.updater import RatesUpdater
+    except ImportError as e:
+        raise ApiRequestError(f"Parser Service недоступен: {e}") from e
+    RatesUpdater().run_update()
 
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
 
+def _age(quote: tuple[float, float] | None) -> float:
+    return time.time() - quote[1] if quote else float("inf")
+
+
+def _count_quote(age: float, ttl: float, max_stale: float) -> None:
+    """Метрика запроса курса: fresh, stale или miss."""
+    result = "fresh" if age <= ttl else "stale" if age <= max_stale else "miss"
+    get_metrics().inc("valutatrade_rates_requests_total", result=result)
+
+
+# Обновление курсов выполняется в одном экземпляре: внутри процесса — под
+# _refresh_mutex, между процессами — под rates_refresh.lock. Получивший
+# блокировку сначала перечитывает кэш: если курс уже обновил другой, запроса
+# к API и записи не будет.
+_refresh_mutex = threading.Lock()
+
+
+def _refresh_lock_path() -> Path:
+    return Path(settings.get("LOCKS_DIR")) / "rates_refresh.lock"
 
-def get_user_portfolio(user_id: int) -> dict | None:
-    portfolios = load_json(PORTFOLIOS_FILE)
-    return next((p for p in portfolios if p["user_id"] == user_id), None)
-
-
-def _refresh_rate(pair_key: str) -> dict | None:
-    """Фейтовое обновление курса (вместо Parser Service). Возвращает dict или None."""
-    now = datetime.now().isoformat(timespec="seconds")
-    fake_rates = {
-        "USD_BTC": {"rate": 1 / 59337.21, "updated_at": now},
-        "BTC_USD": {"rate": 59337.21, "updated_at": now},
-        "EUR_USD": {"rate": 1.0786, "updated_at": now},
-        "USD_EUR": {"rate": 1 / 1.0786, "updated_at": now},
-        "RUB_USD": {"rate": 0.01016, "updated_at": now},
-        "USD_RUB": {"rate": 98.42, "updated_at": now},
-        "ETH_USD": {"rate": 3720.00, "updated_at": now},
-        "USD_ETH": {"rate": 1 / 3720.00, "updated_at": now},
-    }
-    return fake_rates.get(pair_key)
+
+def _needs_refresh(pairs: list[tuple[str, str]]) -> bool:
+    """Перечитывает кэш и проверяет, остались ли среди пар курсы старше TTL."""
+    get_rates_cache().invalidate()
+    ttl = settings.get("RATES_TTL_SECONDS")
+    return any(_age(get_rates_cache().get(*pair)) > ttl for pair in pairs)
+
+
+def _refresh_now(pairs: list[tuple[str, str]]) -> None:
+    """Синхронное обновление: ждёт уже идущее и обновляет, только если нужно."""
+    with _refresh_mutex, file_lock(_refresh_lock_path()):
+        if _needs_refresh(pairs):
+            _run_refresh()
+
+
+def _refresh_in_background(pairs: list[tuple[str, str]]) -> None:
+    """Фоновое обновление; если оно уже идёт (здесь или в другом процессе) — ничего."""
+    if not _refresh_mutex.acquire(blocking=False):
+        return
+
+    def worker() -> None:
+        try:
+            with try_file_lock(_refresh_lock_path()) as acquired:
+                if acquired and _needs_refresh(pairs):
+                    _run_refresh()
+        except Exception as e:
+            logger.warning("Фоновое обновление курсов не удалось: %s", e)
+        finally:
+            _refresh_mutex.release()
+
+    threading.Thread(target=worker, name="rates-refresh", daemon=True).start()
+
+
+def _quote(
+    from_code: str, to_code: str, wait: bool = True
+) -> tuple[float, float] | None:
+    """
+    Курс (курс, время epoch) по схеме stale-while-revalidate:
+    - моложе RATES_TTL_SECONDS — отдаётся как есть;
+    - моложе RATES_MAX_STALE_SECONDS — отдаётся сразу, обновление идёт в фоне;
+    - иначе (или курса нет) при wait=True курсы обновляются синхронно,
+      при wait=False запускается фоновое обновление и возвращается None.
+    """
+    ttl = settings.get("RATES_TTL_SECONDS")
+    max_stale = max(settings.get("RATES_MAX_STALE_SECONDS"), ttl)
+
+    quote = get_rates_cache().get(from_code, to_code)
+    age = _age(quote)
+    _count_quote(age, ttl, max_stale)
+    if age <= ttl:
+        return quote
+    if age <= max_stale or not wait:
+        _refresh_in_background([(from_code, to_code)])
+        return quote if age <= max_stale else None
+
+    _refresh_now([(from_code, to_code)])
+    quote = get_rates_cache().get(from_code, to_code)
+    if quote is None:
+        raise ApiRequestError(f"Курс {from_code}->{to_code} недоступен.")
+    if _age(quote) > max_stale:
+        raise ApiRequestError("Данные курсов устарели. Повторите попытку позже.")
+    return quote
 
 
 # основные операции
 
+def _log_trade(verb: str, user_id: int, currency_code: str, amount: float) -> None:
+    """Запись о сделке с оценкой в USD (текст собирается потоком логгера)."""
+    # оценка без ожидания сети: курса нет или он устарел — обновится в фоне
+    quote = _quote(currency_code, "USD", wait=False)
+    fields = {"user_id": user_id, "currency": currency_code, "amount": amount}
+    if quote is None:
+        logger.info(
+            "%s %s: %s, без оценки (user_id=%s)",
+            verb, currency_code, amount, user_id,
+            extra={"fields": fields},
+        )
+        return
+    rate = quote[0]
+    fields.update(rate=rate, estimate_usd=amount * rate)
+    logger.info(
+        "%s %s: %s @ %s → %.2f USD (user_id=%s)",
+        verb, currency_code, amount, rate, amount * rate, user_id,
+        extra={"fields": fields},
+    )
+
+
 @log_action("BUY")
 def buy(user_id: int, currency_code: str, amount: float) -> None:
     """Покупка валюты с логированием и валидацией."""
-    if amount <= 0:
+    if not (math.isfinite(amount) and amount > 0):
         raise ValueError("'amount' должен быть положительным числом")
 
     try:
@@ -83,52 +165,20 @@ def buy(user_id: int, currency_code: str, amount: float) -> None:
         logger.error(str(e))
         raise
 
+    with get_repository().portfolio_transaction(user_id, create=True) as portfolio:
+        wallets = portfolio["wallets"]
+        if currency_code not in wallets:
+            wallets[currency_code] = {"currency_code": currency_code, "balance": 0.0}
 
-    portfolios = load_json(PORTFOLIOS_FILE)
-
+        wallets[currency_code]["balance"] += amount
 
-    portfolio = next((p for p in portfolios if p["user_id"] == user_id), None)
-    if not portfolio:
-        portfolio = {"user_id": user_id, "wallets": {}}
-
-    wallets = portfolio["wallets"]
-    if currency_code not in wallets:
-        wallets[currency_code] = {"currency_code": currency_code, "balance": 0.0}
-
-    old_balance = wallets[currency_code]["balance"]
-    new_balance = old_balance + amount
-    wallets[currency_code]["balance"] = new_balance
-
-    # Загружаем курсы и рассчитываем стоимость
-    rate = None
-    estimated_value = None
-    try:
-        rate, _updated = get_rate(currency_code, "USD")
-        estimated_value = amount * rate
-    except ApiRequestError:
-        # курса нет — покупку не блокируем, просто без оценки
-        pass
-
-    portfolios = load_json(PORTFOLIOS_FILE)
-    if not isinstance(portfolios, list):
-        portfolios = []
-    existing = next((p for p in portfolios if p["user_id"] == user_id), None)
-    if existing:
-        existing.update(portfolio)
-    else:
-        portfolios.append(portfolio)
-    save_json(PORTFOLIOS_FILE, portfolios)
-
-    logger.info(
-        f"Покупка {currency_code}: {amount} @ {rate} → {estimated_value:.2f} USD "
-        f"(user_id={user_id})"
-    )
+    _log_trade("Покупка", user_id, currency_code, amount)
 
 
 @log_action("SELL")
 def sell(user_id: int, currency_code: str, amount: float) -> None:
     """Продажа валюты с валидацией и логированием."""
-    if amount <= 0:
+    if not (math.isfinite(amount) and amount > 0):
         raise ValueError("'amount' должен быть положительным числом")
 
     try:
@@ -137,36 +187,23 @@ def sell(user_id: int, currency_code: str, amount: float) -> None:
         logger.error(str(e))
         raise
 
-    portfolios = load_json(PORTFOLIOS_FILE)
-    portfolio = next((p for p in portfolios if p["user_id"] == user_id), None)
-    if not portfolio:
-        raise ValueError(f"Портфель для user_id={user_id} не найден")
-
-    wallets = portfolio["wallets"]
-    if currency_code not in wallets:
-        raise CurrencyNotFoundError(f"У вас нет кошелька '{currency_code}'")
-
-    balance = wallets[currency_code]["balance"]
-    if balance < amount:
-        raise InsufficientFundsError(balance, amount, currency_code)
+    with get_repository().portfolio_transaction(user_id) as portfolio:
+        if not portfolio:
+            raise ValueError(f"Портфель для user_id={user_id} не найден")
 
-    wallets[currency_code]["balance"] -= amount
+        wallets = portfolio["wallets"]
+        if currency_code not in wallets:
+            raise CurrencyNotFoundError(
+                currency_code, f"У вас нет кошелька '{currency_code}'"
+            )
 
-    rate = None
-    estimated_revenue = None
-    try:
-        rate, _updated = get_rate(currency_code, "USD")
-        estimated_revenue = amount * rate
-    except ApiRequestError:
-        # курса нет — продажу не блокируем, просто без оценки
-        pass
+        balance = wallets[currency_code]["balance"]
+        if balance < amount:
+            raise InsufficientFundsError(balance, amount, currency_code)
 
-    save_json(PORTFOLIOS_FILE, portfolios)
+        wallets[currency_code]["balance"] = balance - amount
 
-    logger.info(
-        f"Продажа {currency_code}: {amount} @ {rate} → {estimated_revenue:.2f} USD "
-        f"(user_id={user_id})"
-    )
+    _log_trade("Продажа", user_id, currency_code, amount)
 
 
 @log_action("GET_RATE")
@@ -174,35 +211,176 @@ def get_rate(from_code: str, to_code: str) -> tuple[float, str]:
     get_currency(from_code)
     get_currency(to_code)
 
-    rates = load_json(RATES_FILE)
-    key = f"{from_code}_{to_code}"
-    rate_info = rates.get(key)
-    ttl_seconds = settings.get("RATES_TTL_SECONDS")
-
-    def is_fresh(info: dict) -> bool:
+    quote = _quote(from_code, to_code)
+    rate, updated_at = quote
+    return rate, to_iso(updated_at)
+
+
+@log_action("GET_RATES")
+def get_rates(
+    pairs: list[tuple[str, str]],
+) -> dict[tuple[str, str], tuple[float, str] | None]:
+    """
+    Курсы многих пар сразу: валюты проверяются один раз, курсы берутся из
+    одного снимка кэша, а устаревшие обновляются одним обновлением на всех.
+    Возвращает {(from, to): (курс, время ISO)}; None — курс недоступен.
+    """
+    for code in {code for pair in pairs for code in pair}:
+        get_currency(code)
+
+    ttl = settings.get("RATES_TTL_SECONDS")
+    max_stale = max(settings.get("RATES_MAX_STALE_SECONDS"), ttl)
+    quotes = {pair: get_rates_cache().get(*pair) for pair in pairs}
+    for quote in quotes.values():
+        _count_quote(_age(quote), ttl, max_stale)
+
+    missing = [pair for pair, quote in quotes.items() if _age(quote) > max_stale]
+    stale = [pair for pair, quote in quotes.items() if ttl < _age(quote) <= max_stale]
+    if missing:
         try:
-            updated_at = datetime.fromisoformat(info["updated_at"])
-            return (datetime.now() - updated_at).total_seconds() <= ttl_seconds
-        except Exception:
-            return False
-
-    # если курса нет — пробуем обновить
-    if not rate_info:
-        new_info = _refresh_rate(key)
-        if not new_info:
-            raise ApiRequestError(f"Курс {from_code}->{to_code} недоступен.")
-        rates[key] = new_info
-        save_json(RATES_FILE, rates)
-        return new_info["rate"], new_info["updated_at"]
-
-    # если курс есть, но устарел — тоже пробуем обновить
-    if not is_fresh(rate_info):
-        new_info = _refresh_rate(key)
-        if not new_info:
-            raise ApiRequestError("Данные курсов устарели. Повторите попытку позже.")
-        rates[key] = new_info
-        save_json(RATES_FILE, rates)
-        return new_info["rate"], new_info["updated_at"]
-
-    # отдаём как есть
-    return rate_info["rate"], rate_info["updated_at"]
\ No newline at end of file
+            _refresh_now(missing + stale)
+        except ApiRequestError as e:
+            # отдаём то, что есть; недоступные курсы — None
+            logger.warning("Обновление курсов не удалось: %s", e)
+        quotes = {pair: get_rates_cache().get(*pair) for pair in pairs}
+    elif stale:
+        _refresh_in_background(stale)
+
+    return {
+        pair: (quote[0], to_iso(quote[1])) if _age(quote) <= max_stale else None
+        for pair, quote in quotes.items()
+    }
+
+
+def _validate_order(order: Order, users: dict) -> str | None:
+    """Текст ошибки заявки или None; users — кэш найденных пользователей."""
+    if order.error:
+        return order.error
+    if order.side not in SIDES:
+        return f"неизвестная операция '{order.side}'"
+    try:
+        get_currency(order.currency)
+    except CurrencyNotFoundError as e:
+        return str(e)
+    if order.amount is None or not (math.isfinite(order.amount) and order.amount > 0):
+        return "'amount' должен быть положительным числом"
+
+    key = order.user_id if order.user_id is not None else order.username
+    if key is None:
+        return "не указан пользователь (user_id или username)"
+    if key not in users:
+        if order.user_id is not None:
+            users[key] = get_repository().get_user(order.user_id)
+        else:
+            users[key] = get_repository().find_user(order.username)
+    user = users[key]
+    if user is None:
+        return f"пользователь '{key}' не найден"
+    order.user_id = user["user_id"]
+    order.username = user["username"]
+    return None
+
+
+def _apply_order(wallets: dict, order: Order) -> float:
+    """Применяет заявку к кошелькам в памяти; возвращает новый баланс."""
+    code = order.currency
+    if order.side == "buy":
+        wallet = wallets.setdefault(code, {"currency_code": code, "balance": 0.0})
+        wallet["balance"] += order.amount
+        return wallet["balance"]
+
+    if code not in wallets:
+        raise CurrencyNotFoundError(code, f"У вас нет кошелька '{code}'")
+    balance = wallets[code]["balance"]
+    if balance < order.amount:
+        raise InsufficientFundsError(balance, order.amount, code)
+    wallets[code]["balance"] = balance - order.amount
+    return wallets[code]["balance"]
+
+
+def execute_orders(
+    orders: Iterable[Order], atomic: bool = False
+) -> Iterator[OrderResult]:
+    """
+    Исполняет пакет заявок (генератор результатов).
+
+    Сначала все заявки проверяются, отклонённые отдаются сразу. Остальные
+    группируются по пользователю, применяются к портфелю в памяти в порядке
+    файла и записываются одним пакетом через update_portfolios; результаты
+    пользователя отдаются, как только его портфель записан. При atomic=True
+    заявки пользователя исполняются по принципу «всё или ничего»: после
+    первой ошибки его портфель остаётся прежним.
+    """
+    users: dict = {}
+    by_user: dict[int, list[Order]] = {}
+    counts = dict.fromkeys((OK, REJECTED, FAILED, ROLLED_BACK), 0)
+
+    for order in orders:
+        error = _validate_order(order, users)
+        if error:
+            counts[REJECTED] += 1
+            yield OrderResult(order, REJECTED, error)
+            continue
+        by_user.setdefault(order.user_id, []).append(order)
+
+    results: dict[int, list[OrderResult]] = {}
+
+    def update(portfolio: dict) -> None:
+        user_orders = by_user[portfolio["user_id"]]
+        wallets = portfolio["wallets"]
+        before = {code: dict(w) for code, w in wallets.items()}
+        done = results[portfolio["user_id"]] = []
+        for order in user_orders:
+            try:
+                balance = _apply_order(wallets, order)
+            except (CurrencyNotFoundError, InsufficientFundsError) as e:
+                done.append(OrderResult(order, FAILED, str(e)))
+                if atomic:
+                    break
+                continue
+            done.append(OrderResult(order, OK, balance=balance))
+
+        if atomic and done and done[-1].status == FAILED:
+            portfolio["wallets"] = before
+            for result in done[:-1]:
+                result.status, result.balance = ROLLED_BACK, None
+            done.extend(
+                OrderResult(order, ROLLED_BACK, "не исполнена")
+                for order in user_orders[len(done) :]
+            )
+
+    repository = get_repository()
+    for user_id in repository.update_portfolios(list(by_user), update, create=True):
+        for result in results.pop(user_id):
+            counts[result.status] += 1
+            yield result
+
+    logger.info(
+        "BATCH %s users=%s atomic=%s",
+        " ".join(f"{status}={n}" for status, n in counts.items()),
+        len(by_user),
+        atomic,
+        extra={"fields": {**counts, "users": len(by_user), "atomic": atomic}},
+    )
+
+
+def population_report(base_currency: str = "USD", top_n: int = 10) -> dict:
+    """
+    Оценка портфелей всех пользователей в базовой валюте:
+    общий итог, top-N портфелей и позиция по каждой валюте.
+    """
+    base_currency = base_currency.upper()
+    get_currency(base_currency)
+
+    matrix = PortfolioMatrix.from_portfolios(get_repository().iter_portfolios())
+    rates = get_rates_cache().usd_rates()
+    totals, unpriced = matrix.totals(rates, base_currency)
+
+    return {
+        "base": base_currency,
+        "users": len(matrix),
+        "total": sum(totals),
+        "top": matrix.top(totals, top_n),
+        "exposure": matrix.exposure(rates, base_currency),
+        "unpriced": unpriced,
+    }
@@ -0,0 +1,94 @@
+"""
+Пакетная оценка портфелей всех пользователей.
+
+Балансы загружаются один раз в матрицу «пользователи × валюты»,
+хранящуюся по столбцам (array('d') на валюту). Оценка — умножение
+столбцов на вектор курсов к USD и сложение столбцов; пересчёт в любую
+базовую валюту — умножение итогового вектора на скаляр. Поэлементные
+операции выполняются через map(operator.*) над массивами, без цикла
+Python по пользователям на уровне интерпретатора.
+"""
+
+import heapq
+import operator
+from array import array
+from collections.abc import Iterable
+from itertools import repeat
+
+
+class PortfolioMatrix:
+    """Балансы всех пользователей: строки — пользователи, столбцы — валюты."""
+
+    def __init__(self) -> None:
+        self.user_ids = array("q")
+        self.columns: dict[str, array] = {}
+
+    @classmethod
+    def from_portfolios(cls, portfolios: Iterable[dict]) -> "PortfolioMatrix":
+        matrix = cls()
+        columns = matrix.columns
+        for row, portfolio in enumerate(portfolios):
+            matrix.user_ids.append(portfolio["user_id"])
+            for code, wallet in portfolio["wallets"].items():
+                col = columns.get(code)
+                if col is None:
+                    col = columns[code] = array("d", bytes(8 * row))
+                # столбцы валют, которых у предыдущих пользователей не было,
+                # добиваются нулями до текущей строки
+                if len(col) < row:
+                    col.extend(repeat(0.0, row - len(col)))
+                col.append(wallet["balance"])
+        n = len(matrix.user_ids)
+        for col in columns.values():
+            if len(col) < n:
+                col.extend(repeat(0.0, n - len(col)))
+        return matrix
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    @property
+    def currencies(self) -> list[str]:
+        return sorted(self.columns)
+
+    def totals_usd(self, rates: dict[str, float]) -> tuple[array, list[str]]:
+        """
+        Стоимость каждого портфеля в USD.
+        Возвращает (вектор итогов, валюты без курса — они не учтены).
+        """
+        totals = array("d", bytes(8 * len(self)))
+        unpriced = []
+        for code, col in self.columns.items():
+            rate = rates.get(code)
+            if rate is None:
+                unpriced.append(code)
+                continue
+            weighted = map(operator.mul, col, repeat(rate))
+            totals = array("d", map(operator.add, totals, weighted))
+        return totals, unpriced
+
+    def totals(self, rates: dict[str, float], base: str) -> tuple[array, list[str]]:
+        """Стоимость каждого портфеля в базовой валюте base."""
+        base_rate = rates.get(base)
+        if not base_rate:
+            raise ValueError(f"Нет курса для базовой валюты {base}.")
+        usd, unpriced = self.totals_usd(rates)
+        if base == "USD":
+            return usd, unpriced
+        return array("d", map(operator.mul, usd, repeat(1 / base_rate))), unpriced
+
+    def exposure(self, rates: dict[str, float], base: str) -> dict[str, float]:
+        """Суммарная позиция всех пользователей по каждой валюте в базе base."""
+        base_rate = rates.get(base)
+        if not base_rate:
+            raise ValueError(f"Нет курса для базовой валюты {base}.")
+        return {
+            code: sum(col) * rates[code] / base_rate
+            for code, col in self.columns.items()
+            if code in rates
+        }
+
+    def top(self, totals: array, n: int) -> list[tuple[int, float]]:
+        """N крупнейших портфелей: [(user_id, стоимость), ...]."""
+        best = heapq.nlargest(n, range(len(totals)), key=totals.__getitem__)
+        return [(self.user_ids[i], totals[i]) for i in best]
@@ -1,45 +1,91 @@
-import datetime
 import functools
+import time
 
-from valutatrade_hub.logging_config import setup_logger
+from valutatrade_hub.logging_config import get_logger
+from valutatrade_hub.metrics import get_metrics
 
-logger = setup_logger()
+logger = get_logger("actions")
+
+_MESSAGE = "%s user='%s' currency='%s' amount=%s rate=%s base='%s' result=%s"
+_MESSAGE_FIELDS = ("action", "user", "currency", "amount", "rate", "base")
+
+
+def _positional_names(func) -> tuple[str, ...]:
+    """
+    Имена позиционных параметров функции.
+
+    Берутся из __code__, а не через inspect.signature: inspect тянет ast,
+    dis и tokenize и заметно удлиняет запуск CLI.
+    """
+    while hasattr(func, "__wrapped__"):
+        func = func.__wrapped__
+    code = getattr(func, "__code__", None)
+    return code.co_varnames[: code.co_argcount] if code else ()
+
+
+def _first(arguments: dict, *names: str):
+    return next((arguments[n] for n in names if n in arguments), "N/A")
 
 
 def log_action(action_name: str, verbose: bool = False):
     """
     Декоратор для логирования операций (BUY, SELL, REGISTER, LOGIN).
     Не подавляет исключения — только фиксирует их.
+
+    Поля берутся из аргументов вызова (в том числе позиционных) и уходят в
+    запись как структура; текст сообщения собирается только при выводе.
+    Длительность и ошибки операции попадают в метрики (команда stats).
     """
+    action = action_name.upper()
+
     def decorator(func):
+        names = _positional_names(func)
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            timestamp = datetime.datetime.now().isoformat(timespec="seconds")
-            username = kwargs.get("username") or getattr(args[0], "username", "N/A")
-            currency = kwargs.get("currency", "N/A")
-            amount = kwargs.get("amount", "N/A")
-            rate = kwargs.get("rate", "N/A")
-            base = kwargs.get("base", "USD")
+            arguments = dict(zip(names, args))
+            arguments.update(kwargs)
+            fields = {
+                "action": action,
+                "user": arguments.get("username", arguments.get("user_id", "N/A")),
+                "currency": _first(arguments, "currency_code", "currency", "from_code"),
+                "amount": arguments.get("amount", "N/A"),
+                "rate": arguments.get("rate", "N/A"),
+                "base": arguments.get("base", "USD"),
+            }
+            if verbose:
+                fields["context"] = dict(arguments)
+            values = tuple(fields[k] for k in _MESSAGE_FIELDS)
 
+            metrics = get_metrics()
+            started = time.perf_counter()
             try:
                 result = func(*args, **kwargs)
-                msg = (
-                    f"{action_name.upper()} user='{username}' currency='{currency}' "
-                    f"amount={amount} rate={rate} base='{base}' result=OK"
-                )
-                if verbose:
-                    msg += f" context={kwargs}"
-                logger.info(f"{timestamp} {msg}")
-                return result
-
             except Exception as e:
-                msg = (
-                    f"{action_name.upper()} user='{username}' currency='{currency}' "
-                    f"amount={amount} rate={rate} base='{base}' "
-                    f"result=ERROR error_type='{type(e).__name__}' error_message='{e}'"
+                metrics.inc(
+                    "valutatrade_action_errors_total",
+                    action=action,
+                    error=type(e).__name__,
+                )
+                fields.update(
+                    result="ERROR", error_type=type(e).__name__, error_message=str(e)
+                )
+                logger.error(
+                    _MESSAGE + " error_type='%s' error_message='%s'",
+                    *values,
+                    "ERROR",
+                    type(e).__name__,
+                    e,
+                    extra={"fields": fields},
                 )
-                logger.error(f"{timestamp} {msg}")
                 raise
+            finally:
+                elapsed = time.perf_counter() - started
+                metrics.observe("valutatrade_action_seconds", elapsed, action=action)
+
+            fields["result"] = "OK"
+            logger.info(_MESSAGE, *values, "OK", extra={"fields": fields})
+            return result
 
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,58 @@
+"""Общие операции с JSON-файлами данных."""
+
+import json
+import os
+from pathlib import Path
+
+from valutatrade_hub.metrics import get_metrics
+
+
+def store_name(path) -> str:
+    """
+    Метка файла для метрик. Файлы, которых много (шарды портфелей, файлы
+    сессий), сводятся в одну метку: иначе число серий метрики не ограничено.
+    """
+    path = Path(path)
+    if path.stem.isdigit():
+        return "portfolio_shard"
+    if path.parent.name == "sessions":
+        return "sessions"
+    return path.name
+
+
+def count_bytes(op: str, path, size: int) -> None:
+    get_metrics().inc(
+        "valutatrade_store_bytes_total", size, op=op, file=store_name(path)
+    )
+
+
+def read_json(path, default):
+    """Читает JSON-файл; при отсутствии или порче файла возвращает default."""
+    if not os.path.exists(path):
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        count_bytes("read", path, os.fstat(f.fileno()).st_size)
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            return default
+
+
+def atomic_write_json(file_path, data) -> None:
+    """Записывает JSON через временный файл и os.replace."""
+    import tempfile  # тяжёлый импорт (shutil, random) — только при записи
+
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=file_path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+            count_bytes("write", file_path, f.tell())
+        os.replace(tmp, file_path)
+    finally:
+        if os.path.exists(tmp):
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
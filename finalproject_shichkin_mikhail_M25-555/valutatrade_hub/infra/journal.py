@@ -0,0 +1,200 @@
+"""
+Журнал сделок (write-ahead log) поверх снимка portfolios.json.
+
+Каждая сделка дописывает в журнал одну компактную JSON-строку
+с новым балансом кошелька. Снимок переписывается только при
+сворачивании журнала (compaction), когда накопится достаточно записей.
+При чтении хвост журнала проигрывается поверх последнего снимка.
+
+Запись и чтение журнала идут под разделяемой межпроцессной блокировкой,
+сворачивание — под эксклюзивной, поэтому журнал не усекается посреди
+чужого дописывания.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+from valutatrade_hub.infra.fileio import atomic_write_json, count_bytes
+from valutatrade_hub.infra.locks import file_lock
+
+
+class PortfolioJournal:
+    """Портфели в памяти: снимок + проигранный хвост журнала."""
+
+    def __init__(
+        self,
+        snapshot_path: str,
+        journal_path: str | None = None,
+        compact_threshold: int = 1000,
+    ) -> None:
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = Path(
+            journal_path or self.snapshot_path.with_suffix(".journal")
+        )
+        self.compact_threshold = compact_threshold
+        self.lock_path = self.journal_path.with_name(self.journal_path.name + ".lock")
+
+        self._mutex = threading.RLock()
+        self._portfolios: dict[int, dict] = {}
+        self._snapshot_stamp: tuple[int, int, int] | None = None
+        self._offset = 0
+        self._records = 0
+        self._loaded = False
+
+    # чтение
+
+    @staticmethod
+    def _stamp(path: Path) -> tuple[int, int, int] | None:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _journal_size(self) -> int:
+        try:
+            return self.journal_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _load_snapshot(self) -> None:
+        self._portfolios = {}
+        self._snapshot_stamp = self._stamp(self.snapshot_path)
+        self._offset = 0
+        self._records = 0
+
+        if self._snapshot_stamp is None:
+            return
+        with self.snapshot_path.open("r", encoding="utf-8") as f:
+            count_bytes("read", self.snapshot_path, os.fstat(f.fileno()).st_size)
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError:
+                data = []
+        if not isinstance(data, list):
+            data = []
+        for item in data:
+            self._portfolios[item["user_id"]] = item
+
+    def _replay_tail(self) -> None:
+        """Проигрывает записи журнала, появившиеся после последнего чтения."""
+        if not self.journal_path.exists():
+            return
+        with self.journal_path.open("rb") as f:
+            f.seek(self._offset)
+            chunk = f.read()
+        if chunk:
+            count_bytes("read", self.journal_path, len(chunk))
+
+        # недописанную последнюю строку оставляем на следующий раз
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            self._apply(record)
+            self._records += 1
+        self._offset += end
+
+    def _apply(self, record: dict) -> None:
+        user_id = record["u"]
+        portfolio = self._portfolios.setdefault(
+            user_id, {"user_id": user_id, "wallets": {}}
+        )
+        code = record.get("c")
+        if code is not None:
+            portfolio["wallets"][code] = {
+                "currency_code": code,
+                "balance": record["b"],
+            }
+
+    def refresh(self) -> None:
+        """
+        Подтягивает изменения с диска.
+        Если снимок переписан или журнал усечён — перечитывает всё заново,
+        иначе дочитывает только новый хвост журнала.
+        """
+        with self._mutex, file_lock(self.lock_path, shared=True):
+            self._refresh()
+
+    def _refresh(self) -> None:
+        snapshot_changed = self._stamp(self.snapshot_path) != self._snapshot_stamp
+        if not self._loaded or snapshot_changed or self._journal_size() < self._offset:
+            self._load_snapshot()
+            self._loaded = True
+        self._replay_tail()
+
+    @staticmethod
+    def _copy(portfolio: dict) -> dict:
+        return {
+            "user_id": portfolio["user_id"],
+            "wallets": {
+                code: dict(wallet) for code, wallet in portfolio["wallets"].items()
+            },
+        }
+
+    def get(self, user_id: int) -> dict | None:
+        """Возвращает копию портфеля пользователя или None."""
+        with self._mutex:
+            self.refresh()
+            portfolio = self._portfolios.get(user_id)
+            return self._copy(portfolio) if portfolio is not None else None
+
+    def all(self) -> list[dict]:
+        """Возвращает все портфели (актуальное состояние)."""
+        with self._mutex:
+            self.refresh()
+            return [self._copy(p) for p in self._portfolios.values()]
+
+    # запись
+
+    def append(self, *records: dict) -> None:
+        """
+        Дописывает записи в журнал одним write.
+        Запись вида {"u": user_id, "c": код, "b": баланс} задаёт новый баланс
+        кошелька, {"u": user_id} — создаёт пустой портфель.
+        """
+        payload = "".join(
+            json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for r in records
+        ).encode("utf-8")
+
+        with self._mutex:
+            with file_lock(self.lock_path, shared=True):
+                self._refresh()
+                self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+                # O_APPEND: запись одним write не перемешивается с чужими
+                with self.journal_path.open("ab") as f:
+                    f.write(payload)
+                count_bytes("write", self.journal_path, len(payload))
+
+                # свои записи уже на диске — дочитываем их так же, как чужие
+                self._replay_tail()
+
+            if self._records >= self.compact_threshold:
+                self.compact()
+
+    def compact(self) -> None:
+        """Сворачивает журнал в новый снимок portfolios.json и обнуляет журнал."""
+        with self._mutex, file_lock(self.lock_path):
+            self._compact()
+
+    def _compact(self) -> None:
+        self._refresh()
+        data = [self._portfolios[user_id] for user_id in sorted(self._portfolios)]
+        atomic_write_json(self.snapshot_path, data)
+
+        # записи журнала задают абсолютные балансы, поэтому повторное
+        # проигрывание после сбоя между этими шагами ничего не ломает
+        with self.journal_path.open("wb"):
+            pass
+
+        self._snapshot_stamp = self._stamp(self.snapshot_path)
+        self._offset = 0
+        self._records = 0
+
@@ -0,0 +1,172 @@
+"""
+Потоковый перенос JSON-данных (users.json, portfolios.json + журнал или шарды
+portfolios/, rates.json) в SQLite-хранилище.
+
+Массивы читаются по элементам кусками фиксированного размера, поэтому
+файл целиком в память не загружается; вставка идёт пачками. Весь перенос —
+одна транзакция: при ошибке база остаётся в прежнем состоянии.
+"""
+
+import json
+from collections.abc import Iterator
+from pathlib import Path
+
+from valutatrade_hub.infra.fileio import read_json
+from valutatrade_hub.infra.sqlite_repository import SqliteRepository
+
+CHUNK_SIZE = 64 * 1024
+BATCH_SIZE = 1000
+
+
+def iter_json_array(path, chunk_size: int = CHUNK_SIZE) -> Iterator:
+    """Лениво перебирает элементы JSON-массива верхнего уровня."""
+    path = Path(path)
+    if not path.exists():
+        return
+
+    decoder = json.JSONDecoder()
+    buf = ""
+    started = False
+    with path.open("r", encoding="utf-8") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            buf += chunk
+            pos = 0
+            while True:
+                # пропускаем пробелы, открывающую скобку и запятые
+                while pos < len(buf) and buf[pos] in " \t\r\n,[":
+                    if buf[pos] == "[":
+                        if started:
+                            break
+                        started = True
+                    pos += 1
+                if pos >= len(buf) or buf[pos] == "]":
+                    break
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise
+                    break  # элемент не дочитан — ждём следующий кусок
+                if chunk and (end == len(buf) or buf[end] not in " \t\r\n,]"):
+                    break  # число на границе куска могло оборваться
+                yield item
+                pos = end
+            buf = buf[pos:]
+            if not chunk:
+                return
+
+
+def _batched(items: Iterator, size: int = BATCH_SIZE) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _iter_journal(path) -> Iterator[dict]:
+    path = Path(path)
+    if not path.exists():
+        return
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue  # недописанная строка
+
+
+def migrate_json_to_sqlite(
+    users_file: str,
+    portfolios_file: str,
+    rates_file: str,
+    db_path: str,
+    journal_file: str | None = None,
+    portfolios_dir: str | None = None,
+    locks_dir: str | None = None,
+) -> dict[str, int]:
+    """Переносит данные в SQLite и возвращает счётчики перенесённых записей."""
+    # rates.json — небольшой словарь; поддерживаем и формат Parser Service
+    rates, cross = {}, None
+    data = read_json(rates_file, {})
+    if isinstance(data, dict):
+        rates = {k: v for k, v in data.items() if isinstance(v, dict) and "rate" in v}
+        rates.update(data.get("pairs") or {})
+        cross = data.get("cross")
+
+    # шардированный бэкенд: актуальные портфели — в шардах portfolios/,
+    # снимок и журнал после перехода на шарды устарели
+    sharded = bool(portfolios_dir) and Path(portfolios_dir).exists()
+
+    def portfolios() -> Iterator[dict]:
+        if not sharded:
+            yield from iter_json_array(portfolios_file)
+            return
+        from valutatrade_hub.infra.sharded_repository import ShardedRepository
+
+        yield from ShardedRepository(
+            users_file,
+            portfolios_file,
+            rates_file,
+            journal_file,
+            locks_dir=locks_dir,
+            portfolios_dir=portfolios_dir,
+        ).iter_portfolios()
+
+    def wallet_rows() -> Iterator[tuple]:
+        for portfolio in portfolios():
+            yield portfolio["user_id"], None, None
+            for code, wallet in portfolio.get("wallets", {}).items():
+                yield portfolio["user_id"], code, wallet["balance"]
+        # хвост журнала сделок поверх снимка
+        if journal_file and not sharded:
+            for record in _iter_journal(journal_file):
+                yield record["u"], record.get("c"), record.get("b")
+
+    repo = SqliteRepository(db_path)
+    counts = {"users": 0, "wallets": 0, "rates": len(rates)}
+
+    with repo.transaction() as conn:
+        for batch in _batched(iter_json_array(users_file)):
+            conn.executemany(
+                "INSERT OR REPLACE INTO users "
+                "(user_id, username, hashed_password, salt, registration_date) "
+                "VALUES (:user_id, :username, :hashed_password, :salt, "
+                ":registration_date)",
+                batch,
+            )
+            counts["users"] += len(batch)
+
+        # ключи перенесённых кошельков: журнал повторяет кошельки снимка,
+        # а считать нужно различные — без множества в памяти
+        conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS migrated_wallets ("
+            "user_id INTEGER, currency_code TEXT, "
+            "PRIMARY KEY (user_id, currency_code)) WITHOUT ROWID"
+        )
+        conn.execute("DELETE FROM migrated_wallets")
+        for batch in _batched(wallet_rows()):
+            conn.executemany(
+                "INSERT OR IGNORE INTO portfolios (user_id) VALUES (?)",
+                [(user_id,) for user_id, _, _ in batch],
+            )
+            wallets = [row for row in batch if row[1] is not None]
+            conn.executemany(
+                "INSERT OR REPLACE INTO wallets (user_id, currency_code, balance) "
+                "VALUES (?, ?, ?)",
+                wallets,
+            )
+            counts["wallets"] += conn.executemany(
+                "INSERT OR IGNORE INTO migrated_wallets VALUES (?, ?)",
+                [(user_id, code) for user_id, code, _ in wallets],
+            ).rowcount
+        conn.execute("DROP TABLE migrated_wallets")
+
+        if rates:
+            repo.write_rates(conn, rates, cross)
+
+    return counts
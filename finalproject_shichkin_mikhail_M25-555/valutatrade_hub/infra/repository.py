@@ -0,0 +1,365 @@
+"""
+Слой хранения: единый интерфейс для пользователей, портфелей и курсов.
+
+Ядро (usecases) и CLI работают только через Repository и не знают,
+где лежат данные. Бэкенд выбирается настройкой STORAGE_BACKEND:
+- "json"   — users.json, portfolios.json + журнал сделок, rates.json;
+- "sharded" — как "json", но портфель каждого пользователя в своём файле
+  (см. sharded_repository);
+- "sqlite" — одна база SQLite с индексами (см. sqlite_repository).
+"""
+
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from valutatrade_hub.infra.fileio import atomic_write_json, read_json
+from valutatrade_hub.infra.journal import PortfolioJournal
+from valutatrade_hub.infra.locks import file_lock
+from valutatrade_hub.infra.settings import SettingsLoader
+
+
+class Repository(ABC):
+    """Абстрактное хранилище пользователей, портфелей и курсов."""
+
+    # пользователи
+
+    @abstractmethod
+    def find_user(self, username: str) -> dict | None:
+        """Возвращает запись пользователя по имени или None."""
+
+    @abstractmethod
+    def get_user(self, user_id: int) -> dict | None:
+        """Возвращает запись пользователя по id или None."""
+
+    @abstractmethod
+    def add_user(
+        self,
+        username: str,
+        hashed_password: str,
+        salt: str,
+        registration_date: str,
+    ) -> dict:
+        """Создаёт пользователя с пустым портфелем и возвращает его запись."""
+
+    # портфели
+
+    @abstractmethod
+    def get_portfolio(self, user_id: int) -> dict | None:
+        """Возвращает {"user_id", "wallets"} или None."""
+
+    @abstractmethod
+    def iter_portfolios(self) -> Iterator[dict]:
+        """Перебирает все портфели."""
+
+    @abstractmethod
+    def portfolio_transaction(self, user_id: int, create: bool = False):
+        """
+        Транзакция (контекстный менеджер) над портфелем одного пользователя.
+        Отдаёт изменяемую копию портфеля (или None, если его нет и create=False).
+        Изменённые балансы сохраняются при выходе без исключения.
+        """
+
+    def update_portfolios(
+        self,
+        user_ids: Iterable[int],
+        update: Callable[[dict], None],
+        create: bool = False,
+    ) -> Iterator[int]:
+        """
+        Пакетное изменение портфелей (генератор). update(portfolio) получает
+        изменяемую копию портфеля каждого пользователя; id пользователя
+        отдаётся, когда его изменения записаны. Портфели, которых нет
+        (при create=False), пропускаются. Базовая реализация — транзакция
+        на пользователя; бэкенды переопределяют её, чтобы писать пачкой.
+        """
+        for user_id in user_ids:
+            with self.portfolio_transaction(user_id, create) as portfolio:
+                if portfolio is None:
+                    continue
+                update(portfolio)
+            yield user_id
+
+    # курсы
+
+    @abstractmethod
+    def load_rates(self) -> dict:
+        """Возвращает словарь курсов {"BTC_USD": {"rate", "updated_at"}, ...}."""
+
+    @abstractmethod
+    def load_cross(self) -> dict | None:
+        """Сохранённая матрица кросс-курсов (CrossRates.to_dict()) или None."""
+
+    def load_rates_and_cross(self) -> tuple[dict, dict | None]:
+        """Курсы и матрица кросс-курсов одним чтением хранилища."""
+        return self.load_rates(), self.load_cross()
+
+    @abstractmethod
+    def save_rates(self, rates: dict, cross: dict | None = None) -> None:
+        """
+        Добавляет или обновляет переданные курсы. Матрица cross сохраняется
+        вместе с ними; без неё прежняя матрица сбрасывается как устаревшая.
+        """
+
+    @abstractmethod
+    def rates_version(self) -> object:
+        """Метка версии курсов: меняется при каждом сохранении курсов."""
+
+
+def _copy_portfolio(portfolio: dict) -> dict:
+    return {
+        "user_id": portfolio["user_id"],
+        "wallets": {c: dict(w) for c, w in portfolio["wallets"].items()},
+    }
+
+
+def _wallet_records(user_id: int, before: dict, after: dict, created: bool) -> list:
+    """Записи журнала для изменившихся балансов (или создания портфеля)."""
+    records = [
+        {"u": user_id, "c": code, "b": balance}
+        for code, balance in _changed_wallets(before, after).items()
+    ]
+    if not records and created:
+        records = [{"u": user_id}]
+    return records
+
+
+def _changed_wallets(before: dict, after: dict) -> dict[str, float]:
+    """Возвращает {код: новый баланс} для изменившихся кошельков."""
+    changed = {}
+    for code, wallet in after["wallets"].items():
+        old = before["wallets"].get(code)
+        if old is None or old["balance"] != wallet["balance"]:
+            changed[code] = wallet["balance"]
+    return changed
+
+
+class JsonRepository(Repository):
+    """
+    Хранилище на JSON-файлах; портфели — через журнал сделок.
+    Цикл «прочитать — изменить — записать» защищён межпроцессными
+    блокировками: отдельной на каждого пользователя, на users.json и rates.json.
+    """
+
+    def __init__(
+        self,
+        users_file: str,
+        portfolios_file: str,
+        rates_file: str,
+        journal_file: str | None = None,
+        compact_threshold: int = 1000,
+        locks_dir: str | None = None,
+    ) -> None:
+        self.users_file = Path(users_file)
+        self.rates_file = Path(rates_file)
+        self.journal = PortfolioJournal(
+            portfolios_file, journal_file, compact_threshold
+        )
+        self.locks_dir = Path(locks_dir or self.users_file.parent / "locks")
+
+        self._users: list[dict] = []
+        self._by_name: dict[str, dict] = {}
+        self._by_id: dict[int, dict] = {}
+        self._users_stamp: tuple[int, int] | None = None
+
+    # пользователи
+
+    def _refresh_users(self) -> None:
+        """Перечитывает users.json, только если файл изменился."""
+        try:
+            st = self.users_file.stat()
+            stamp = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if stamp == self._users_stamp and self._users_stamp is not None:
+            return
+
+        users = read_json(self.users_file, [])
+        self._users = users if isinstance(users, list) else []
+        self._by_name = {u["username"]: u for u in self._users}
+        self._by_id = {u["user_id"]: u for u in self._users}
+        self._users_stamp = stamp
+
+    def find_user(self, username: str) -> dict | None:
+        self._refresh_users()
+        user = self._by_name.get(username)
+        return dict(user) if user else None
+
+    def get_user(self, user_id: int) -> dict | None:
+        self._refresh_users()
+        user = self._by_id.get(user_id)
+        return dict(user) if user else None
+
+    def add_user(self, username, hashed_password, salt, registration_date) -> dict:
+        with file_lock(self.locks_dir / "users.lock"):
+            self._refresh_users()
+            if username in self._by_name:
+                raise ValueError(f"Имя пользователя '{username}' уже занято.")
+
+            user = {
+                "user_id": max(self._by_id, default=0) + 1,
+                "username": username,
+                "hashed_password": hashed_password,
+                "salt": salt,
+                "registration_date": registration_date,
+            }
+            atomic_write_json(self.users_file, self._users + [user])
+            self._users_stamp = None
+
+        self._create_portfolio(user["user_id"])
+        return dict(user)
+
+    # портфели
+
+    def _user_lock(self, user_id: int):
+        return file_lock(self.locks_dir / f"user_{user_id}.lock")
+
+    def _create_portfolio(self, user_id: int) -> None:
+        self.journal.append({"u": user_id})
+
+    def get_portfolio(self, user_id: int) -> dict | None:
+        return self.journal.get(user_id)
+
+    def iter_portfolios(self) -> Iterator[dict]:
+        return iter(self.journal.all())
+
+    @contextmanager
+    def portfolio_transaction(self, user_id: int, create: bool = False):
+        # пока держим блокировку пользователя, его баланс никто не изменит,
+        # поэтому прочитанное состояние остаётся актуальным до записи
+        with self._user_lock(user_id):
+            before = self.journal.get(user_id)
+            created = before is None
+            if created:
+                if not create:
+                    yield None
+                    return
+                before = {"user_id": user_id, "wallets": {}}
+
+            portfolio = _copy_portfolio(before)
+            yield portfolio
+
+            records = _wallet_records(user_id, before, portfolio, created)
+            if records:
+                self.journal.append(*records)
+
+    # сколько lock-файлов пользователей пакетная запись держит одновременно
+    BATCH_SIZE = 256
+
+    def update_portfolios(self, user_ids, update, create=False):
+        # блокировки берутся в порядке id, поэтому пакеты не блокируют
+        # друг друга взаимно; каждый пакет пишется в журнал одной записью
+        user_ids = sorted(set(user_ids))
+        for start in range(0, len(user_ids), self.BATCH_SIZE):
+            chunk = user_ids[start : start + self.BATCH_SIZE]
+            records, done = [], []
+            with ExitStack() as locks:
+                for user_id in chunk:
+                    locks.enter_context(self._user_lock(user_id))
+                for user_id in chunk:
+                    before = self.journal.get(user_id)
+                    created = before is None
+                    if created:
+                        if not create:
+                            continue
+                        before = {"user_id": user_id, "wallets": {}}
+                    portfolio = _copy_portfolio(before)
+                    update(portfolio)
+                    records.extend(_wallet_records(user_id, before, portfolio, created))
+                    done.append(user_id)
+                if records:
+                    self.journal.append(*records)
+            yield from done
+
+    # курсы
+
+    def _read_rates(self) -> dict:
+        """
+        Документ rates.json: {"pairs", "cross", "last_refresh", "version"}.
+        Старый плоский формат {"BTC_USD": {...}} читается как pairs.
+        """
+        data = read_json(self.rates_file, {})
+        if not isinstance(data, dict):
+            return {"pairs": {}}
+        if "pairs" not in data:
+            data = {
+                "pairs": {
+                    k: v for k, v in data.items() if isinstance(v, dict) and "rate" in v
+                }
+            }
+        return data
+
+    def load_rates(self) -> dict:
+        return self._read_rates()["pairs"]
+
+    def load_cross(self) -> dict | None:
+        return self._read_rates().get("cross")
+
+    def load_rates_and_cross(self) -> tuple[dict, dict | None]:
+        # rates.json разбирается один раз, и пары с матрицей согласованы
+        data = self._read_rates()
+        return data["pairs"], data.get("cross")
+
+    def save_rates(self, rates: dict, cross: dict | None = None) -> None:
+        with file_lock(self.locks_dir / "rates.lock"):
+            data = self._read_rates()
+            data["pairs"].update(rates)
+            data["last_refresh"] = datetime.now(timezone.utc).isoformat()
+            data["version"] = data.get("version", 0) + 1
+            if cross is not None:
+                data["cross"] = cross
+            else:
+                data.pop("cross", None)
+            atomic_write_json(self.rates_file, data)
+
+    def rates_version(self) -> object:
+        try:
+            st = self.rates_file.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+_repository: Repository | None = None
+
+
+def get_repository() -> Repository:
+    """Возвращает общий экземпляр хранилища согласно STORAGE_BACKEND."""
+    global _repository
+    if _repository is not None:
+        return _repository
+
+    settings = SettingsLoader()
+    backend = settings.get("STORAGE_BACKEND")
+
+    if backend == "sqlite":
+        from valutatrade_hub.infra.sqlite_repository import SqliteRepository
+
+        _repository = SqliteRepository(settings.get("SQLITE_FILE"))
+    elif backend == "sharded":
+        from valutatrade_hub.infra.sharded_repository import ShardedRepository
+
+        _repository = ShardedRepository(
+            settings.get("USERS_FILE"),
+            settings.get("PORTFOLIOS_FILE"),
+            settings.get("RATES_FILE"),
+            settings.get("JOURNAL_FILE"),
+            settings.get("JOURNAL_COMPACT_THRESHOLD"),
+            settings.get("LOCKS_DIR"),
+            settings.get("PORTFOLIOS_DIR"),
+        )
+    elif backend == "json":
+        _repository = JsonRepository(
+            settings.get("USERS_FILE"),
+            settings.get("PORTFOLIOS_FILE"),
+            settings.get("RATES_FILE"),
+            settings.get("JOURNAL_FILE"),
+            settings.get("JOURNAL_COMPACT_THRESHOLD"),
+            settings.get("LOCKS_DIR"),
+        )
+    else:
+        raise ValueError(f"Неизвестный STORAGE_BACKEND: {backend}")
+
+    return _repository
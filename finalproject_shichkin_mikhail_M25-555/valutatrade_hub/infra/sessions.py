@@ -0,0 +1,208 @@
+"""
+Сессии входа: login один раз, дальше — любые команды и процессы.
+
+Сессия — файл sessions/<id>.json с минимальной записью пользователя
+(user_id, username) и сроком действия. Токен — "<id>.<подпись>", где
+подпись — HMAC-SHA256 секретом приложения от id, пользователя и срока:
+подделанный токен или исправленный вручную файл сессии не принимаются.
+Проверка токена — чтение одного файла, users.json не нужен.
+
+Токен текущей сессии CLI хранится в файле current_session (или передаётся
+через VALUTATRADE_SESSION — для cron и скриптов). Секрет берётся из
+VALUTATRADE_SESSION_SECRET, иначе создаётся один раз в session.key.
+"""
+
+import os
+import re
+import time
+from pathlib import Path
+
+from valutatrade_hub.infra.fileio import atomic_write_json, read_json
+from valutatrade_hub.infra.settings import SettingsLoader
+
+_SESSION_ID = re.compile(r"[0-9a-f]{32}")
+
+
+def _read_private(path: Path) -> str | None:
+    try:
+        return path.read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _write_private(path: Path, text: str) -> None:
+    """Записывает файл с правами 0600 (секрет, токен)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+class SessionStore:
+    """Хранилище сессий в каталоге: один файл на сессию."""
+
+    def __init__(
+        self,
+        sessions_dir: str,
+        key_file: str,
+        current_file: str,
+        ttl_seconds: int,
+        secret: str | None = None,
+    ) -> None:
+        self.sessions_dir = Path(sessions_dir)
+        self.key_file = Path(key_file)
+        self.current_file = Path(current_file)
+        self.ttl_seconds = ttl_seconds
+        self._secret = secret.encode() if secret else None
+
+    def _key(self) -> bytes:
+        if self._secret is None:
+            key = _read_private(self.key_file)
+            if key is None:
+                key = self._create_key()
+            self._secret = key.encode()
+        return self._secret
+
+    def _create_key(self) -> str:
+        """
+        Создаёт session.key; при гонке процессов побеждает первый.
+
+        Секрет пишется во временный файл и появляется под своим именем
+        жёсткой ссылкой уже целиком: другой процесс не увидит пустой ключ,
+        а os.link, в отличие от rename, не затирает ключ победителя.
+        """
+        import secrets
+
+        key = secrets.token_hex(32)
+        tmp = self.key_file.with_name(f"{self.key_file.name}.{secrets.token_hex(8)}")
+        _write_private(tmp, key)
+        try:
+            os.link(tmp, self.key_file)
+        except FileExistsError:
+            key = _read_private(self.key_file)
+        finally:
+            tmp.unlink()
+        return key
+
+    def _sign(self, session_id: str, record: dict) -> str:
+        import hashlib
+        import hmac
+
+        message = (
+            f"{session_id}:{record['user_id']}:{record['username']}:"
+            f"{record['expires_at']}"
+        )
+        return hmac.new(self._key(), message.encode(), hashlib.sha256).hexdigest()
+
+    def _path(self, session_id: str) -> Path:
+        return self.sessions_dir / f"{session_id}.json"
+
+    def _parse(self, token: str) -> tuple[str, str] | None:
+        session_id, _, signature = token.partition(".")
+        # id проверяется до обращения к диску: токен не может указать на чужой путь
+        if not _SESSION_ID.fullmatch(session_id) or not signature:
+            return None
+        return session_id, signature
+
+    def create(self, user: dict, ttl_seconds: int | None = None) -> str:
+        """Открывает сессию пользователя и возвращает её токен."""
+        import secrets
+
+        session_id = secrets.token_hex(16)
+        now = time.time()
+        record = {
+            "user_id": user["user_id"],
+            "username": user["username"],
+            "issued_at": round(now),
+            "expires_at": round(now + (ttl_seconds or self.ttl_seconds)),
+        }
+        atomic_write_json(self._path(session_id), record)
+        return f"{session_id}.{self._sign(session_id, record)}"
+
+    def resolve(self, token: str) -> dict | None:
+        """Пользователь сессии {"user_id", "username"} или None."""
+        import hmac
+
+        parsed = self._parse(token)
+        if parsed is None:
+            return None
+        session_id, signature = parsed
+        record = read_json(self._path(session_id), None)
+        if not isinstance(record, dict):
+            return None
+        try:
+            expected = self._sign(session_id, record)
+        except KeyError:
+            return None
+        if not hmac.compare_digest(signature, expected):
+            return None
+        if record["expires_at"] <= time.time():
+            self._remove(session_id)
+            return None
+        return {"user_id": record["user_id"], "username": record["username"]}
+
+    def revoke(self, token: str) -> bool:
+        """Закрывает сессию; False — такой сессии нет."""
+        if self.resolve(token) is None:
+            return False
+        return self._remove(self._parse(token)[0])
+
+    def revoke_user(self, user_id: int) -> int:
+        """Закрывает все сессии пользователя; возвращает их число."""
+        return self._sweep(lambda record: record.get("user_id") == user_id)
+
+    def cleanup(self) -> int:
+        """Удаляет истёкшие и повреждённые сессии; возвращает их число."""
+        now = time.time()
+        return self._sweep(lambda record: record.get("expires_at", 0) <= now)
+
+    def _sweep(self, matches) -> int:
+        removed = 0
+        for path in self.sessions_dir.glob("*.json"):
+            record = read_json(path, None)
+            if not isinstance(record, dict) or matches(record):
+                removed += self._remove(path.stem)
+        return removed
+
+    def _remove(self, session_id: str) -> bool:
+        try:
+            os.remove(self._path(session_id))
+            return True
+        except FileNotFoundError:
+            return False
+
+    # текущая сессия CLI
+
+    def current_token(self) -> str | None:
+        return os.getenv("VALUTATRADE_SESSION") or _read_private(self.current_file)
+
+    def current_user(self) -> dict | None:
+        token = self.current_token()
+        return self.resolve(token) if token else None
+
+    def save_current(self, token: str) -> None:
+        _write_private(self.current_file, token)
+
+    def clear_current(self) -> None:
+        try:
+            os.remove(self.current_file)
+        except FileNotFoundError:
+            pass
+
+
+_store: SessionStore | None = None
+
+
+def get_session_store() -> SessionStore:
+    """Возвращает общее хранилище сессий."""
+    global _store
+    if _store is None:
+        settings = SettingsLoader()
+        _store = SessionStore(
+            settings.get("SESSIONS_DIR"),
+            settings.get("SESSION_KEY_FILE"),
+            settings.get("CURRENT_SESSION_FILE"),
+            settings.get("SESSION_TTL_SECONDS"),
+            secret=os.getenv("VALUTATRADE_SESSION_SECRET"),
+        )
+    return _store
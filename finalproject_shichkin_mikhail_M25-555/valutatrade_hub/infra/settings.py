@@ -6,14 +6,17 @@ from typing import Any
 
 
 class SettingsLoader:
-    """Singleton: хранит конфиг путей и TTL и выдаёт их всем слоям."""
+    """
+    Singleton: хранит конфиг путей и TTL и выдаёт их всем слоям.
+    Значения (и каталог данных) вычисляются при первом get(), а не при импорте.
+    """
 
     _instance: "SettingsLoader | None" = None
 
     def __new__(cls) -> "SettingsLoader":
         if cls._instance is None:
-            cls._instance = super().__new__(cls) 
-            cls._instance._init_values()
+            cls._instance = super().__new__(cls)
+            cls._instance._values = None
         return cls._instance
 
     def _init_values(self) -> None:
@@ -28,8 +31,56 @@ class SettingsLoader:
             "PORTFOLIOS_FILE": str(data_dir / "portfolios.json"),
             "RATES_FILE": str(data_dir / "rates.json"),
 
+            # бэкенд хранилища: "json", "sharded" или "sqlite"
+            "STORAGE_BACKEND": os.getenv("VALUTATRADE_STORAGE", "json"),
+            "SQLITE_FILE": str(data_dir / "valutatrade.db"),
+            "PORTFOLIOS_DIR": str(data_dir / "portfolios"),
+
+            # журнал сделок поверх снимка portfolios.json
+            "JOURNAL_FILE": str(data_dir / "portfolios.journal"),
+            # после скольких записей журнал сворачивается в снимок
+            "JOURNAL_COMPACT_THRESHOLD": int(
+                os.getenv("VALUTATRADE_JOURNAL_COMPACT", "1000")
+            ),
+
+            # lock-файлы межпроцессных блокировок
+            "LOCKS_DIR": str(data_dir / "locks"),
+
+            # сессии входа: файлы сессий, секрет подписи токенов,
+            # токен текущей сессии CLI и срок жизни сессии в секундах
+            "SESSIONS_DIR": str(data_dir / "sessions"),
+            "SESSION_KEY_FILE": str(data_dir / "session.key"),
+            "CURRENT_SESSION_FILE": str(data_dir / "current_session"),
+            "SESSION_TTL_SECONDS": int(os.getenv("VALUTATRADE_SESSION_TTL", "86400")),
+
+            # логи: каталог, общий уровень и уровни компонентов
+            # ("parser=DEBUG,actions=WARNING"), ротация logs/app.log по размеру
+            "LOGS_DIR": os.getenv("VALUTATRADE_LOGS_DIR", "logs"),
+            "LOG_LEVEL": os.getenv("VALUTATRADE_LOG_LEVEL", "INFO").upper(),
+            "LOG_LEVELS": os.getenv("VALUTATRADE_LOG_LEVELS", ""),
+            "LOG_MAX_BYTES": int(os.getenv("VALUTATRADE_LOG_MAX_BYTES", "5000000")),
+            "LOG_BACKUP_COUNT": int(os.getenv("VALUTATRADE_LOG_BACKUPS", "5")),
+
+            # метрики в формате Prometheus для node exporter (пусто — не писать)
+            "METRICS_FILE": os.getenv("VALUTATRADE_METRICS_FILE", ""),
+            "METRICS_INTERVAL": float(os.getenv("VALUTATRADE_METRICS_INTERVAL", "15")),
+
+            # профилирование (--profile): каталог, доля профилируемых команд
+            # и их список через запятую (пусто — все)
+            "PROFILE_DIR": os.getenv("VALUTATRADE_PROFILE_DIR", "profiles"),
+            "PROFILE_RATE": float(os.getenv("VALUTATRADE_PROFILE_RATE", "1.0")),
+            "PROFILE_COMMANDS": os.getenv("VALUTATRADE_PROFILE_COMMANDS", ""),
+
+            # файл реестра валют (пусто — core/currencies.json из пакета)
+            "CURRENCIES_FILE": os.getenv("VALUTATRADE_CURRENCIES_FILE", ""),
+
             # TTL курсов в секундах
             "RATES_TTL_SECONDS": int(os.getenv("VALUTATRADE_RATES_TTL", "600")),
+            # предельный возраст курса (сек.): курс старше TTL, но моложе
+            # предела отдаётся сразу, а обновляется в фоне
+            "RATES_MAX_STALE_SECONDS": int(
+                os.getenv("VALUTATRADE_RATES_MAX_STALE", "3600")
+            ),
         }
 
     def _resolve_data_dir(self) -> Path:
@@ -56,4 +107,6 @@ class SettingsLoader:
         return home_data
 
     def get(self, key: str, default: Any | None = None) -> Any:
+        if self._values is None:
+            self._init_values()
         return self._values.get(key, default)
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""
+Шардированное хранение портфелей: один JSON-файл на пользователя.
+
+Файлы раскладываются по 256 корзинам по user_id:
+    DATA_DIR/portfolios/<user_id % 256 в hex>/<user_id>.json
+Сделка, show-portfolio и register читают и пишут только файл своего
+пользователя, поэтому их стоимость не зависит от числа пользователей.
+Пользователи и курсы хранятся как в JsonRepository.
+"""
+
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from valutatrade_hub.infra.fileio import atomic_write_json, read_json
+from valutatrade_hub.infra.locks import file_lock
+from valutatrade_hub.infra.repository import JsonRepository, Repository
+
+BUCKETS = 256
+MIGRATED_MARKER = ".migrated"
+
+
+class ShardedRepository(JsonRepository):
+    """JsonRepository с портфелями в отдельных файлах-шардах."""
+
+    def __init__(
+        self,
+        users_file: str,
+        portfolios_file: str,
+        rates_file: str,
+        journal_file: str | None = None,
+        compact_threshold: int = 1000,
+        locks_dir: str | None = None,
+        portfolios_dir: str | None = None,
+    ) -> None:
+        super().__init__(
+            users_file,
+            portfolios_file,
+            rates_file,
+            journal_file,
+            compact_threshold,
+            locks_dir,
+        )
+        self.portfolios_dir = Path(
+            portfolios_dir or Path(portfolios_file).parent / "portfolios"
+        )
+        self._migrated = False
+
+    def shard_path(self, user_id: int) -> Path:
+        return self.portfolios_dir / f"{user_id % BUCKETS:02x}" / f"{user_id}.json"
+
+    # перенос из общего portfolios.json
+
+    def _ensure_migrated(self) -> None:
+        """
+        При первом обращении раскладывает портфели из portfolios.json
+        (с учётом журнала сделок) по шардам. Выполняется один раз:
+        по завершении создаётся файл-маркер.
+        """
+        if self._migrated:
+            return
+        marker = self.portfolios_dir / MIGRATED_MARKER
+        if not marker.exists():
+            with file_lock(self.locks_dir / "portfolios_migration.lock"):
+                if not marker.exists():
+                    for portfolio in self.journal.all():
+                        path = self.shard_path(portfolio["user_id"])
+                        # шард уже мог быть создан сделкой — он новее снимка
+                        if not path.exists():
+                            atomic_write_json(path, portfolio)
+                    marker.parent.mkdir(parents=True, exist_ok=True)
+                    marker.touch()
+        self._migrated = True
+
+    # портфели
+
+    def _create_portfolio(self, user_id: int) -> None:
+        self._ensure_migrated()
+        with self._user_lock(user_id):
+            path = self.shard_path(user_id)
+            if not path.exists():
+                atomic_write_json(path, {"user_id": user_id, "wallets": {}})
+
+    def get_portfolio(self, user_id: int) -> dict | None:
+        self._ensure_migrated()
+        return read_json(self.shard_path(user_id), None)
+
+    def iter_portfolios(self) -> Iterator[dict]:
+        """Перебирает все шарды по одному, не загружая их разом."""
+        self._ensure_migrated()
+        if not self.portfolios_dir.exists():
+            return
+        for bucket in sorted(os.scandir(self.portfolios_dir), key=lambda e: e.name):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(".json"):
+                    portfolio = read_json(entry.path, None)
+                    if portfolio is not None:
+                        yield portfolio
+
+    @contextmanager
+    def portfolio_transaction(self, user_id: int, create: bool = False):
+        self._ensure_migrated()
+        path = self.shard_path(user_id)
+        with self._user_lock(user_id):
+            portfolio = read_json(path, None)
+            if portfolio is None:
+                if not create:
+                    yield None
+                    return
+                portfolio = {"user_id": user_id, "wallets": {}}
+
+            yield portfolio
+            atomic_write_json(path, portfolio)
+
+    def update_portfolios(self, user_ids, update, create=False):
+        # у каждого пользователя свой файл: пишем по транзакции на портфель
+        return Repository.update_portfolios(self, user_ids, update, create)
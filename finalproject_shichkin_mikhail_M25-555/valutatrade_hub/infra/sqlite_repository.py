@@ -0,0 +1,285 @@
+"""
+SQLite-бэкенд хранилища.
+
+Пользователи ищутся по индексам username / user_id, портфель читается
+и пишется по первичному ключу (user_id, currency_code), сделки выполняются
+в транзакции BEGIN IMMEDIATE. База работает в режиме WAL, поэтому
+читатели не блокируются писателями.
+"""
+
+import json
+import sqlite3
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from valutatrade_hub.infra.repository import Repository
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL,
+    hashed_password TEXT NOT NULL,
+    salt TEXT NOT NULL,
+    registration_date TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username ON users(username);
+
+CREATE TABLE IF NOT EXISTS portfolios (
+    user_id INTEGER PRIMARY KEY
+);
+
+CREATE TABLE IF NOT EXISTS wallets (
+    user_id INTEGER NOT NULL,
+    currency_code TEXT NOT NULL,
+    balance REAL NOT NULL,
+    PRIMARY KEY (user_id, currency_code)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS rates (
+    pair TEXT PRIMARY KEY,
+    rate REAL NOT NULL,
+    updated_at TEXT NOT NULL,
+    source TEXT
+);
+
+-- служебные значения курсов: version (счётчик сохранений), cross (матрица)
+CREATE TABLE IF NOT EXISTS rates_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+USER_COLUMNS = "user_id, username, hashed_password, salt, registration_date"
+
+
+class SqliteRepository(Repository):
+    """Хранилище в одной базе SQLite (отдельное соединение на поток)."""
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self.conn.executescript(SCHEMA)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: транзакциями управляем явно
+            conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT; при исключении — ROLLBACK."""
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+    # пользователи
+
+    def find_user(self, username: str) -> dict | None:
+        row = self.conn.execute(
+            f"SELECT {USER_COLUMNS} FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def get_user(self, user_id: int) -> dict | None:
+        row = self.conn.execute(
+            f"SELECT {USER_COLUMNS} FROM users WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def add_user(self, username, hashed_password, salt, registration_date) -> dict:
+        try:
+            with self.transaction() as conn:
+                cur = conn.execute(
+                    "INSERT INTO users "
+                    "(username, hashed_password, salt, registration_date) "
+                    "VALUES (?, ?, ?, ?)",
+                    (username, hashed_password, salt, registration_date),
+                )
+                user_id = cur.lastrowid
+                conn.execute("INSERT INTO portfolios (user_id) VALUES (?)", (user_id,))
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Имя пользователя '{username}' уже занято.")
+
+        return {
+            "user_id": user_id,
+            "username": username,
+            "hashed_password": hashed_password,
+            "salt": salt,
+            "registration_date": registration_date,
+        }
+
+    # портфели
+
+    @staticmethod
+    def _read_portfolio(conn: sqlite3.Connection, user_id: int) -> dict | None:
+        exists = conn.execute(
+            "SELECT 1 FROM portfolios WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if not exists:
+            return None
+        rows = conn.execute(
+            "SELECT currency_code, balance FROM wallets WHERE user_id = ?",
+            (user_id,),
+        ).fetchall()
+        return {
+            "user_id": user_id,
+            "wallets": {
+                r["currency_code"]: {
+                    "currency_code": r["currency_code"],
+                    "balance": r["balance"],
+                }
+                for r in rows
+            },
+        }
+
+    def get_portfolio(self, user_id: int) -> dict | None:
+        return self._read_portfolio(self.conn, user_id)
+
+    def iter_portfolios(self) -> Iterator[dict]:
+        # один проход по wallets, отсортированным по первичному ключу
+        cur = self.conn.execute(
+            "SELECT p.user_id, w.currency_code, w.balance "
+            "FROM portfolios p LEFT JOIN wallets w ON w.user_id = p.user_id "
+            "ORDER BY p.user_id"
+        )
+        current = None
+        for user_id, code, balance in cur:
+            if current is None or current["user_id"] != user_id:
+                if current is not None:
+                    yield current
+                current = {"user_id": user_id, "wallets": {}}
+            if code is not None:
+                current["wallets"][code] = {"currency_code": code, "balance": balance}
+        if current is not None:
+            yield current
+
+    @contextmanager
+    def portfolio_transaction(self, user_id: int, create: bool = False):
+        with self.transaction() as conn:
+            portfolio = self._read_portfolio(conn, user_id)
+            if portfolio is None:
+                if not create:
+                    yield None
+                    return
+                conn.execute("INSERT INTO portfolios (user_id) VALUES (?)", (user_id,))
+                portfolio = {"user_id": user_id, "wallets": {}}
+
+            before = {c: w["balance"] for c, w in portfolio["wallets"].items()}
+            yield portfolio
+
+            changed = [
+                (user_id, code, wallet["balance"])
+                for code, wallet in portfolio["wallets"].items()
+                if before.get(code) != wallet["balance"]
+            ]
+            conn.executemany(
+                "INSERT INTO wallets (user_id, currency_code, balance) "
+                "VALUES (?, ?, ?) ON CONFLICT (user_id, currency_code) "
+                "DO UPDATE SET balance = excluded.balance",
+                changed,
+            )
+
+    def update_portfolios(self, user_ids, update, create=False):
+        # все портфели пакета — в одной транзакции и одном executemany
+        done, changed = [], []
+        with self.transaction() as conn:
+            for user_id in dict.fromkeys(user_ids):
+                portfolio = self._read_portfolio(conn, user_id)
+                if portfolio is None:
+                    if not create:
+                        continue
+                    conn.execute(
+                        "INSERT INTO portfolios (user_id) VALUES (?)", (user_id,)
+                    )
+                    portfolio = {"user_id": user_id, "wallets": {}}
+                before = {c: w["balance"] for c, w in portfolio["wallets"].items()}
+                update(portfolio)
+                changed.extend(
+                    (user_id, code, wallet["balance"])
+                    for code, wallet in portfolio["wallets"].items()
+                    if before.get(code) != wallet["balance"]
+                )
+                done.append(user_id)
+            conn.executemany(
+                "INSERT INTO wallets (user_id, currency_code, balance) "
+                "VALUES (?, ?, ?) ON CONFLICT (user_id, currency_code) "
+                "DO UPDATE SET balance = excluded.balance",
+                changed,
+            )
+        yield from done
+
+    # курсы
+
+    def load_rates(self) -> dict:
+        rows = self.conn.execute(
+            "SELECT pair, rate, updated_at, source FROM rates"
+        ).fetchall()
+        rates = {}
+        for r in rows:
+            info = {"rate": r["rate"], "updated_at": r["updated_at"]}
+            if r["source"] is not None:
+                info["source"] = r["source"]
+            rates[r["pair"]] = info
+        return rates
+
+    def _meta(self, key: str) -> str | None:
+        row = self.conn.execute(
+            "SELECT value FROM rates_meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row["value"] if row else None
+
+    def load_cross(self) -> dict | None:
+        value = self._meta("cross")
+        return json.loads(value) if value else None
+
+    def rates_version(self) -> object:
+        return self._meta("version")
+
+    def save_rates(self, rates: dict, cross: dict | None = None) -> None:
+        with self.transaction() as conn:
+            self.write_rates(conn, rates, cross)
+
+    @staticmethod
+    def write_rates(
+        conn: sqlite3.Connection, rates: dict, cross: dict | None = None
+    ) -> None:
+        """Записывает курсы в уже открытой транзакции."""
+        conn.execute(
+            "INSERT INTO rates_meta (key, value) VALUES ('version', '1') "
+            "ON CONFLICT (key) DO UPDATE SET "
+            "value = CAST(value AS INTEGER) + 1"
+        )
+        if cross is not None:
+            conn.execute(
+                "INSERT INTO rates_meta (key, value) VALUES ('cross', ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (json.dumps(cross, separators=(",", ":")),),
+            )
+        else:
+            conn.execute("DELETE FROM rates_meta WHERE key = 'cross'")
+        conn.executemany(
+            "INSERT INTO rates (pair, rate, updated_at, source) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT (pair) DO UPDATE SET "
+            "rate = excluded.rate, updated_at = excluded.updated_at, "
+            "source = excluded.source",
+            [
+                (pair, info["rate"], info["updated_at"], info.get("source"))
+                for pair, info in rates.items()
+            ],
+        )
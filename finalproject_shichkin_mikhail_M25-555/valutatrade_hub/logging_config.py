@@ -1,24 +1,137 @@
-import logging
+"""
+Единый логгер приложения.
+
+Запись в лог не блокирует вызывающий код: обработчик логгера только кладёт
+запись в очередь, а форматирование (JSON в файл, текст в консоль) и запись
+на диск выполняет фоновый поток QueueListener. Файл logs/app.log
+ротируется по размеру.
+
+Компоненты пишут в дочерние логгеры ("ValutaTrade.<компонент>"), их уровни
+задаются отдельно: VALUTATRADE_LOG_LEVELS="parser=DEBUG,actions=WARNING".
+
+Модули берут логгер через get_logger(): модуль logging, каталог и файл
+логов загружаются и создаются при первой записи, а не при импорте.
+"""
+
 import os
+import threading
+from typing import TYPE_CHECKING
 
 from valutatrade_hub.infra.settings import SettingsLoader
 
+if TYPE_CHECKING:
+    import logging
+
+ROOT_LOGGER = "ValutaTrade"
+
+_configured = False
+_setup_lock = threading.Lock()
+
+
+def _json_formatter() -> "logging.Formatter":
+    import json
+    import logging
+    from datetime import datetime, timezone
+
+    class JsonFormatter(logging.Formatter):
+        """Запись лога — одна строка JSON; поля из extra={"fields": {...}}."""
+
+        def format(self, record: logging.LogRecord) -> str:
+            data = {
+                "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                    timespec="milliseconds"
+                ),
+                "level": record.levelname,
+                "logger": record.name,
+                "msg": record.getMessage(),
+            }
+            data.update(getattr(record, "fields", None) or {})
+            if record.exc_info:
+                data["exc"] = self.formatException(record.exc_info)
+            return json.dumps(data, ensure_ascii=False, default=str)
+
+    return JsonFormatter()
+
+
+def _parse_levels(spec: str) -> dict[str, str]:
+    """'parser=DEBUG,actions=WARNING' -> {"parser": "DEBUG", "actions": "WARNING"}."""
+    levels = {}
+    for item in spec.split(","):
+        component, _, level = item.partition("=")
+        if component.strip() and level.strip():
+            levels[component.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logger() -> "logging.Logger":
+    """Настраивает единый логгер приложения (один раз) и возвращает его."""
+    import atexit
+    import logging
+    import queue
+    from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+    global _configured
+    with _setup_lock:
+        logger = logging.getLogger(ROOT_LOGGER)
+        if _configured:
+            return logger
+
+        settings = SettingsLoader()
+        logs_dir = settings.get("LOGS_DIR") or "logs"
+        os.makedirs(logs_dir, exist_ok=True)
+
+        file_handler = RotatingFileHandler(
+            os.path.join(logs_dir, "app.log"),
+            maxBytes=settings.get("LOG_MAX_BYTES"),
+            backupCount=settings.get("LOG_BACKUP_COUNT"),
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(_json_formatter())
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(
+            logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
+        )
+
+        class _QueueHandler(QueueHandler):
+            # очередь внутри процесса: запись не нужно заранее форматировать
+            # и упрощать для pickle — это сделает поток слушателя
+            def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+                return record
+
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        listener = QueueListener(
+            records, file_handler, console_handler, respect_handler_level=True
+        )
+        listener.start()
+        # при выходе дописываем всё, что осталось в очереди
+        atexit.register(listener.stop)
+
+        logger.handlers[:] = [_QueueHandler(records)]
+        logger.setLevel(settings.get("LOG_LEVEL"))
+        logger.propagate = False
+        for component, level in _parse_levels(settings.get("LOG_LEVELS")).items():
+            logger.getChild(component).setLevel(level)
+
+        _configured = True
+        return logger
+
+
+class _LazyLogger:
+    """Заместитель логгера: настраивает его при первом обращении."""
 
-def setup_logger():
-    """Настраивает единый логгер приложения."""
-    settings = SettingsLoader()
-    logs_dir = settings.get("LOGS_DIR") or "logs"
-    os.makedirs(logs_dir, exist_ok=True)
+    def __init__(self, component: str | None) -> None:
+        self._component = component
+        self._logger = None
 
-    log_file = os.path.join(logs_dir, "app.log")
+    def __getattr__(self, name: str):
+        if self._logger is None:
+            logger = setup_logger()
+            if self._component:
+                logger = logger.getChild(self._component)
+            self._logger = logger
+        return getattr(self._logger, name)
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(message)s",
-        handlers=[
-            logging.FileHandler(log_file, encoding="utf-8"),
-            logging.StreamHandler(),
-        ],
-    )
 
-    return logging.getLogger("ValutaTrade")
\ No newline at end of file
+def get_logger(component: str | None = None) -> "logging.Logger":
+    """Логгер для уровня модуля; component — имя для настройки уровня."""
+    return _LazyLogger(component)
@@ -2,16 +2,54 @@
 """
 ValutaTrade — основной вход в приложение.
 Запускает CLI-интерфейс для управления валютными операциями.
+
+Без аргументов — интерактивный режим. Неинтерактивно:
+    project --exec "get-rate --from BTC --to USD"   # одна команда
+    project --script commands.txt                   # файл команд, вывод JSON Lines
+    project --profile --profile-rate 0.1 --exec "buy ..."   # профилирование
 """
 
-from valutatrade_hub.cli.interface import run_app
+import argparse
+import sys
+
+from valutatrade_hub.cli.interface import run_app, run_command, run_script
 
 
-def main():
+def main(argv: list[str] | None = None):
     """Точка входа в приложение."""
+    parser = argparse.ArgumentParser(prog="project", description="ValutaTrade CLI")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--exec", metavar="КОМАНДА", help="выполнить одну команду")
+    mode.add_argument(
+        "--script",
+        metavar="ФАЙЛ",
+        help="выполнить команды из файла ('-' — stdin), вывод в JSON Lines",
+    )
+    parser.add_argument(
+        "--profile", action="store_true", help="профилировать команды (cProfile)"
+    )
+    parser.add_argument("--profile-dir", help="каталог профилей")
+    parser.add_argument(
+        "--profile-rate", type=float, help="доля профилируемых команд (0..1)"
+    )
+    parser.add_argument(
+        "--profile-commands", help="профилировать только эти команды (через запятую)"
+    )
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        from valutatrade_hub.profiling import enable_profiling
+
+        enable_profiling(args.profile_dir, args.profile_rate, args.profile_commands)
+
+    if args.exec is not None:
+        sys.exit(run_command(args.exec))
+    if args.script is not None:
+        sys.exit(run_script(args.script))
+
     print("ValutaTrade запущен.")
     run_app()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
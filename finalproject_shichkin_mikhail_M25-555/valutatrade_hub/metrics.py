@@ -0,0 +1,202 @@
+"""
+Метрики процесса: счётчики и гистограммы задержек.
+
+Реестр живёт в памяти процесса (команда stats показывает его состояние).
+Если задан VALUTATRADE_METRICS_FILE, реестр раз в VALUTATRADE_METRICS_INTERVAL
+секунд (и при выходе) записывается в этот файл в текстовом формате
+Prometheus — его забирает node exporter (textfile collector), отдельный
+HTTP-сервер не нужен. Файл заменяется атомарно.
+"""
+
+import bisect
+import os
+import threading
+
+from valutatrade_hub.infra.settings import SettingsLoader
+
+# границы корзин гистограмм задержек, секунды
+BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# имя метрики -> (тип, описание)
+METRICS = {
+    "valutatrade_action_seconds": (
+        "histogram", "Длительность операций (BUY, SELL, GET_RATE, ...)"
+    ),
+    "valutatrade_action_errors_total": (
+        "counter", "Ошибки операций по типу исключения"
+    ),
+    "valutatrade_rates_requests_total": (
+        "counter", "Запросы курсов: fresh — из кэша, stale — из кэша с фоновым "
+        "обновлением, miss — курса нет или он слишком старый"
+    ),
+    "valutatrade_rates_cache_reloads_total": (
+        "counter", "Перечитывания курсов из хранилища"
+    ),
+    "valutatrade_store_bytes_total": (
+        "counter", "Байты, прочитанные и записанные файловыми хранилищами"
+    ),
+    "valutatrade_provider_fetch_seconds": (
+        "histogram", "Время ответа источников курсов"
+    ),
+    "valutatrade_provider_results_total": (
+        "counter", "Результаты опроса источников курсов (ok, not_modified, failed)"
+    ),
+}
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами (как в Prometheus)."""
+
+    __slots__ = ("bounds", "counts", "sum", "count", "min", "max")
+
+    def __init__(self, bounds: tuple[float, ...] = BUCKETS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # последняя — +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """
+        Оценка квантиля: линейная интерполяция внутри корзины,
+        ограниченная наблюдавшимися минимумом и максимумом.
+        """
+        if not self.count:
+            return 0.0
+        return min(max(self._interpolate(q), self.min), self.max)
+
+    def _interpolate(self, q: float) -> float:
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.bounds[i - 1] if i else 0.0
+                if i == len(self.bounds):  # корзина +Inf
+                    return self.max
+                return lower + (self.bounds[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+
+def _escape(value) -> str:
+    """Экранирование значения метки по текстовому формату Prometheus."""
+    text = str(value)
+    return text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(labels: tuple, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsRegistry:
+    """Потокобезопасный реестр: {имя: {метки: значение}}."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._histograms: dict[str, dict[tuple, Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def counters(self, name: str) -> dict[tuple, float]:
+        with self._lock:
+            return dict(self._counters.get(name, {}))
+
+    def histograms(self, name: str) -> dict[tuple, Histogram]:
+        with self._lock:
+            return dict(self._histograms.get(name, {}))
+
+    def to_prometheus(self) -> str:
+        """Все метрики в текстовом формате Prometheus 0.0.4."""
+        lines = []
+        with self._lock:
+            for name in sorted(set(self._counters) | set(self._histograms)):
+                kind, help_text = METRICS.get(name, ("untyped", name))
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(self._counters.get(name, {}).items()):
+                    lines.append(f"{name}{_label_str(labels)} {value:g}")
+                for labels, h in sorted(self._histograms.get(name, {}).items()):
+                    cumulative = 0
+                    for bound, n in zip(h.bounds + ("+Inf",), h.counts):
+                        cumulative += n
+                        le = _label_str(labels, f'le="{bound}"')
+                        lines.append(f"{name}_bucket{le} {cumulative}")
+                    lines.append(f"{name}_sum{_label_str(labels)} {h.sum:.6f}")
+                    lines.append(f"{name}_count{_label_str(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """Атомарно записывает метрики в файл для node exporter."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp, path)
+
+
+def _start_exporter(registry: MetricsRegistry, path: str, interval: float) -> None:
+    import atexit
+
+    def write() -> None:
+        try:
+            registry.write_textfile(path)
+        except OSError:
+            pass  # метрики не должны ломать работу приложения
+
+    def loop() -> None:
+        stop = threading.Event()
+        while not stop.wait(interval):
+            write()
+
+    threading.Thread(target=loop, name="metrics-textfile", daemon=True).start()
+    atexit.register(write)
+
+
+_registry: MetricsRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Возвращает общий для процесса реестр метрик."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                registry = MetricsRegistry()
+                settings = SettingsLoader()
+                if settings.get("METRICS_FILE"):
+                    _start_exporter(
+                        registry,
+                        settings.get("METRICS_FILE"),
+                        settings.get("METRICS_INTERVAL"),
+                    )
+                _registry = registry
+    return _registry
@@ -5,31 +5,50 @@ import requests
 
 from valutatrade_hub.core.exceptions import ApiRequestError
 from valutatrade_hub.parser_service.config import ParserConfig
+from valutatrade_hub.parser_service.http_client import HttpSession, get_session
 
 
 class BaseApiClient(ABC):
+    # значение поля source у курсов клиента: по нему на HTTP 304
+    # находятся подтверждённые источником курсы
+    source: str | None = None
+
     @abstractmethod
-    def fetch_rates(self) -> dict:
-        """Возвращает словарь пар: {'BTC_USD': {...}, ...}."""
+    def fetch_rates(self) -> dict | None:
+        """
+        Возвращает словарь пар: {'BTC_USD': {...}, ...}
+        или None, если данные источника не изменились (HTTP 304).
+        """
         pass
 
+    def confirmed_pairs(self) -> list[str]:
+        """Пары последнего успешного ответа: их и подтверждает HTTP 304."""
+        return []
+
 
 class CoinGeckoClient(BaseApiClient):
     """Получение криптокурсов из CoinGecko."""
 
-    def __init__(self, config: ParserConfig):
+    source = "CoinGecko"
+
+    def __init__(self, config: ParserConfig, session: HttpSession | None = None):
         self.config = config
+        self.session = session or get_session(config)
 
-    def fetch_rates(self) -> dict:
+    def _url(self) -> str:
         ids = ",".join(self.config.CRYPTO_ID_MAP.values())
-        url = f"{self.config.COINGECKO_URL}?ids={ids}&vs_currencies=usd"
+        return f"{self.config.COINGECKO_URL}?ids={ids}&vs_currencies=usd"
+
+    def fetch_rates(self) -> dict | None:
         try:
-            response = requests.get(url, timeout=self.config.REQUEST_TIMEOUT)
-            response.raise_for_status()
-            data = response.json()
+            return self.session.get_json(self._url(), parse=self._parse)
         except requests.RequestException as e:
             raise ApiRequestError(f"Ошибка при обращении к CoinGecko: {e}")
 
+    def confirmed_pairs(self) -> list[str]:
+        return self.session.confirmed_keys(self._url())
+
+    def _parse(self, data: dict) -> dict:
         result = {}
         now = datetime.now(timezone.utc).isoformat()
         for code, coin_id in self.config.CRYPTO_ID_MAP.items():
@@ -38,7 +57,7 @@ class CoinGeckoClient(BaseApiClient):
                 result[f"{code}_USD"] = {
                     "rate": float(usd_value),
                     "updated_at": now,
-                    "source": "CoinGecko",
+                    "source": self.source,
                 }
         return result
 
@@ -46,25 +65,32 @@ class CoinGeckoClient(BaseApiClient):
 class ExchangeRateApiClient(BaseApiClient):
     """Получение фиатных курсов из ExchangeRate-API."""
 
-    def __init__(self, config: ParserConfig):
-        self.config = config
+    source = "ExchangeRate-API"
 
-    def fetch_rates(self) -> dict:
-        if not self.config.EXCHANGERATE_API_KEY:
-            raise ApiRequestError("Не найден ключ EXCHANGERATE_API_KEY")
+    def __init__(self, config: ParserConfig, session: HttpSession | None = None):
+        self.config = config
+        self.session = session or get_session(config)
 
-        url = (
+    def _url(self) -> str:
+        return (
             f"{self.config.EXCHANGERATE_API_URL}/"
             f"{self.config.EXCHANGERATE_API_KEY}/latest/"
             f"{self.config.BASE_CURRENCY}"
         )
+
+    def fetch_rates(self) -> dict | None:
+        if not self.config.EXCHANGERATE_API_KEY:
+            raise ApiRequestError("Не найден ключ EXCHANGERATE_API_KEY")
         try:
-            response = requests.get(url, timeout=self.config.REQUEST_TIMEOUT)
-            response.raise_for_status()
-            data = response.json()
+            return self.session.get_json(self._url(), parse=self._parse)
         except requests.RequestException as e:
             raise ApiRequestError(f"Ошибка при обращении к ExchangeRate-API: {e}")
 
+    def confirmed_pairs(self) -> list[str]:
+        return self.session.confirmed_keys(self._url())
+
+    def _parse(self, data: dict) -> dict:
+        # ошибка API приходит и с кодом 200: такой ответ не запоминается
         if data.get("result") != "success":
             raise ApiRequestError(f"Некорректный ответ от API: {data}")
 
@@ -78,6 +104,6 @@ class ExchangeRateApiClient(BaseApiClient):
                 result[f"{code}_USD"] = {
                     "rate": float(rate),
                     "updated_at": timestamp,
-                    "source": "ExchangeRate-API",
+                    "source": self.source,
                 }
         return result
\ No newline at end of file
@@ -0,0 +1,218 @@
+"""
+Колоночное бинарное хранилище истории курсов.
+
+Каждая колонка — отдельный файл из записей фиксированной ширины:
+    pair.u16    — id пары (индекс в meta.json["pairs"])
+    ts.f64      — время курса, секунды Unix epoch (float64)
+    rate.f64    — курс (float64)
+    source.u8   — id источника (индекс в meta.json["sources"])
+
+Новые записи дописываются в конец файлов, ничего не переписывается.
+Чтение идёт через mmap: HistoryView отдаёт memoryview-колонки без копирования
+и без разбора JSON (их можно передать и в numpy.frombuffer).
+"""
+
+import json
+import mmap
+import sys
+from array import array
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+
+from valutatrade_hub.infra.fileio import atomic_write_json
+from valutatrade_hub.infra.locks import file_lock
+
+# имя колонки -> typecode array/memoryview
+COLUMNS = {
+    "pair": "H",
+    "ts": "d",
+    "rate": "d",
+    "source": "B",
+}
+FILE_NAMES = {
+    "pair": "pair.u16",
+    "ts": "ts.f64",
+    "rate": "rate.f64",
+    "source": "source.u8",
+}
+
+
+def to_epoch(timestamp: str) -> float:
+    """ISO-время -> секунды Unix epoch."""
+    return datetime.fromisoformat(timestamp).timestamp()
+
+
+class ColumnarHistory:
+    """Колоночная история курсов в директории path."""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self.meta_path = self.path / "meta.json"
+        self.lock_path = self.path / ".lock"
+
+    def exists(self) -> bool:
+        return self.meta_path.exists()
+
+    def _column_path(self, name: str) -> Path:
+        return self.path / FILE_NAMES[name]
+
+    def _read_meta(self) -> dict:
+        if not self.meta_path.exists():
+            return {
+                "version": 1,
+                "byteorder": sys.byteorder,
+                "pairs": [],
+                "sources": [],
+            }
+        with self.meta_path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _rows_on_disk(self) -> int:
+        """Число целых строк: минимум по колонкам (хвост после сбоя не считается)."""
+        counts = []
+        for name, code in COLUMNS.items():
+            try:
+                size = self._column_path(name).stat().st_size
+            except FileNotFoundError:
+                size = 0
+            counts.append(size // array(code).itemsize)
+        return min(counts)
+
+    def __len__(self) -> int:
+        return self._rows_on_disk()
+
+    def append(
+        self,
+        rows: list[tuple[str, float, float, str]],
+        initial: Callable[[], list[tuple[str, float, float, str]]] | None = None,
+    ) -> None:
+        """
+        Дописывает строки (pair, epoch_ts, rate, source).
+        initial() — строки, которые пишутся перед rows, если истории ещё нет;
+        проверка и запись идут под одной блокировкой (перенос старой истории
+        не выполнится дважды при гонке процессов).
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        with file_lock(self.lock_path):
+            if initial is not None and not self.exists():
+                rows = initial() + rows
+            if not rows:
+                return
+            meta = self._read_meta()
+            known = len(meta["pairs"]) + len(meta["sources"])
+            pair_ids = {p: i for i, p in enumerate(meta["pairs"])}
+            source_ids = {s: i for i, s in enumerate(meta["sources"])}
+
+            cols = {name: array(code) for name, code in COLUMNS.items()}
+            for pair, ts, rate, source in rows:
+                if pair not in pair_ids:
+                    pair_ids[pair] = len(meta["pairs"])
+                    meta["pairs"].append(pair)
+                if source not in source_ids:
+                    source_ids[source] = len(meta["sources"])
+                    meta["sources"].append(source)
+                cols["pair"].append(pair_ids[pair])
+                cols["ts"].append(ts)
+                cols["rate"].append(rate)
+                cols["source"].append(source_ids[source])
+
+            # словарь пар/источников меняется редко — пишем его только при росте
+            if not self.meta_path.exists() or len(pair_ids) + len(source_ids) > known:
+                atomic_write_json(self.meta_path, meta)
+
+            # обрезаем недописанный после сбоя хвост, чтобы колонки совпадали
+            rows_on_disk = self._rows_on_disk()
+            for name, code in COLUMNS.items():
+                path = self._column_path(name)
+                with path.open("ab") as f:
+                    f.truncate(rows_on_disk * array(code).itemsize)
+                    f.write(cols[name].tobytes())
+
+    def view(self) -> "HistoryView":
+        """Открывает колонки через mmap (только чтение)."""
+        return HistoryView(self)
+
+
+class HistoryView:
+    """
+    Снимок колонок на момент открытия. Используется как контекстный менеджер:
+        with history.view() as v:
+            v.rates[i], v.timestamps[i], v.pairs[v.pair_ids[i]]
+    """
+
+    def __init__(self, history: ColumnarHistory) -> None:
+        meta = history._read_meta()
+        self.pairs: list[str] = meta["pairs"]
+        self.sources: list[str] = meta["sources"]
+        self.length = history._rows_on_disk()
+
+        self._maps: list[mmap.mmap] = []
+        self._views: list[memoryview] = []
+        columns = {}
+        for name, code in COLUMNS.items():
+            columns[name] = self._map(history._column_path(name), code)
+
+        self.pair_ids: memoryview = columns["pair"]
+        self.timestamps: memoryview = columns["ts"]
+        self.rates: memoryview = columns["rate"]
+        self.source_ids: memoryview = columns["source"]
+
+    def _map(self, path: Path, code: str) -> memoryview:
+        nbytes = self.length * array(code).itemsize
+        if nbytes == 0:
+            return memoryview(array(code))
+        with path.open("rb") as f:
+            mm = mmap.mmap(f.fileno(), nbytes, access=mmap.ACCESS_READ)
+        self._maps.append(mm)
+        raw = memoryview(mm)
+        view = raw.cast(code)
+        # освобождаются в обратном порядке: сначала cast, затем исходный view
+        self._views.extend((view, raw))
+        return view
+
+    def __len__(self) -> int:
+        return self.length
+
+    def close(self) -> None:
+        for view in self._views:
+            view.release()
+        for mm in self._maps:
+            mm.close()
+        self._views.clear()
+        self._maps.clear()
+
+    def __enter__(self) -> "HistoryView":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def json_history_rows(entries: list) -> list[tuple[str, float, float, str]]:
+    """Записи старого exchange_rates.json -> строки колоночной истории."""
+    rows = []
+    if not isinstance(entries, list):
+        return rows
+    for entry in entries:
+        try:
+            rows.append(
+                (
+                    f"{entry['from_currency']}_{entry['to_currency']}",
+                    to_epoch(entry["timestamp"]),
+                    float(entry["rate"]),
+                    entry.get("source", ""),
+                )
+            )
+        except (KeyError, TypeError, ValueError):
+            continue
+    return rows
+
+
+def import_json_history(history: ColumnarHistory, entries: list[dict]) -> int:
+    """Переносит записи старого exchange_rates.json в колоночный формат."""
+    rows = json_history_rows(entries)
+    history.append(rows)
+    return len(rows)
+
@@ -1,7 +1,28 @@
 import os
 from dataclasses import dataclass, field
+from pathlib import Path
 from typing import Final
 
+from valutatrade_hub.core.currencies import (
+    crypto_codes,
+    currency_registry,
+    fiat_codes,
+)
+from valutatrade_hub.infra.settings import SettingsLoader
+
+
+def _data_path(name: str) -> str:
+    return str(Path(SettingsLoader().get("DATA_DIR")) / name)
+
+
+def _coingecko_ids() -> dict[str, str]:
+    registry = currency_registry()
+    return {
+        code: registry[code].coingecko_id
+        for code in crypto_codes()
+        if registry[code].coingecko_id
+    }
+
 
 @dataclass
 class ParserConfig:
@@ -12,19 +33,59 @@ class ParserConfig:
     COINGECKO_URL: Final[str] = "https://api.coingecko.com/api/v3/simple/price"
     EXCHANGERATE_API_URL: Final[str] = "https://v6.exchangerate-api.com/v6"
 
-    # Валюты
+    # Валюты — из реестра валют (core/currencies.json), общего с Core Service
     BASE_CURRENCY: Final[str] = "USD"
-    FIAT_CURRENCIES: tuple[str, ...] = ("EUR", "GBP", "RUB")
-    CRYPTO_CURRENCIES: tuple[str, ...] = ("BTC", "ETH", "SOL")
-    CRYPTO_ID_MAP: dict[str, str] = field(default_factory=lambda: {
-        "BTC": "bitcoin",
-        "ETH": "ethereum",
-        "SOL": "solana",
-    })
-
-    # Пути
-    RATES_FILE_PATH: Final[str] = "data/rates.json"
-    HISTORY_FILE_PATH: Final[str] = "data/exchange_rates.json"
+    FIAT_CURRENCIES: tuple[str, ...] = field(
+        default_factory=lambda: tuple(c for c in fiat_codes() if c != "USD")
+    )
+    CRYPTO_CURRENCIES: tuple[str, ...] = field(default_factory=crypto_codes)
+    CRYPTO_ID_MAP: dict[str, str] = field(default_factory=_coingecko_ids)
+
+    # Пути — в DATA_DIR из SettingsLoader, общем с Core Service
+    RATES_FILE_PATH: str = field(
+        default_factory=lambda: SettingsLoader().get("RATES_FILE")
+    )
+    HISTORY_FILE_PATH: str = field(
+        default_factory=lambda: _data_path("exchange_rates.json")
+    )
+    HISTORY_COLUMNAR_PATH: str = field(
+        default_factory=lambda: _data_path("exchange_rates.col")
+    )
+    HISTORY_SEGMENTS_PATH: str = field(
+        default_factory=lambda: _data_path("exchange_rates.segments")
+    )
+    # ETag/Last-Modified ответов API для условных запросов (общие для процессов)
+    HTTP_CACHE_FILE_PATH: str = field(
+        default_factory=lambda: _data_path("http_cache.json")
+    )
+
+    # Формат истории курсов: "columnar" (бинарные колонки),
+    # "jsonl" (ротируемые текстовые сегменты) или "json" (один массив)
+    HISTORY_FORMAT: str = os.getenv("VALUTATRADE_HISTORY_FORMAT", "columnar")
+    # Размер, после которого JSONL-сегмент закрывается (ротация также по суткам)
+    HISTORY_SEGMENT_MAX_BYTES: int = int(
+        os.getenv("VALUTATRADE_HISTORY_SEGMENT_BYTES", str(1024 * 1024))
+    )
 
     # Сетевые параметры
-    REQUEST_TIMEOUT: Final[int] = 10
\ No newline at end of file
+    REQUEST_TIMEOUT: Final[int] = 10
+    # Повторы запросов: число повторов, базовая и предельная задержка (сек.)
+    HTTP_RETRIES: int = int(os.getenv("VALUTATRADE_HTTP_RETRIES", "3"))
+    HTTP_BACKOFF: float = 0.5
+    HTTP_BACKOFF_MAX: float = 8.0
+    # Размер пула keep-alive соединений общего HTTP-сеанса
+    HTTP_POOL_SIZE: int = 10
+    # Общий срок (сек.) одного обновления: клиенты опрашиваются параллельно,
+    # ответившие позже срока в этот цикл не попадают
+    UPDATE_DEADLINE: float = float(os.getenv("VALUTATRADE_UPDATE_DEADLINE", "15"))
+
+    # Планировщик: интервалы (сек.) для криптовалют и фиатных валют,
+    # разброс сроков (доля интервала) и предельная задержка для сбойных источников
+    CRYPTO_INTERVAL: float = float(os.getenv("VALUTATRADE_CRYPTO_INTERVAL", "30"))
+    FIAT_INTERVAL: float = float(os.getenv("VALUTATRADE_FIAT_INTERVAL", "3600"))
+    SCHEDULER_JITTER: float = 0.1
+    SCHEDULER_MAX_BACKOFF: float = 900.0
+    # Адаптивный режим: средний сдвиг курса за опрос, выше которого интервал
+    # сокращается (не более чем в 1 / ADAPTIVE_MIN_FACTOR раз)
+    ADAPTIVE_TARGET_VOLATILITY: float = 0.001
+    ADAPTIVE_MIN_FACTOR: float = 0.25
@@ -0,0 +1,270 @@
+"""
+Запросы к истории курсов, которую пишет RatesStorage.
+
+История каждой пары раскладывается в два отсортированных по времени
+массива (array('d')): время (epoch) и курс. Поиск курса на момент времени —
+бинарный поиск (bisect), диапазон — два бинарных поиска и срез,
+OHLC-свечи — по одному bisect на границу свечи, а min/max/первый/последний
+считаются на срезах массивов (в C, без цикла Python по точкам).
+"""
+
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import compress, islice
+from operator import le
+
+from valutatrade_hub.parser_service.columnar import to_epoch
+from valutatrade_hub.parser_service.storage import RatesStorage
+
+INTERVAL_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def parse_interval(text: str) -> int:
+    """'30s', '1m', '4h', '1d', '1w' -> секунды."""
+    match = re.fullmatch(r"(\d+)([smhdw])", text.strip().lower())
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(f"Некорректный интервал '{text}'. Пример: 1m, 1h, 1d")
+    return int(match.group(1)) * INTERVAL_UNITS[match.group(2)]
+
+
+def parse_time(text: str, now: float | None = None) -> float:
+    """
+    ISO-время ('2026-01-13', '2026-01-13T21:00:00+00:00') или
+    относительное ('6h', '7d' — столько-то назад от now) -> epoch.
+    """
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        pass
+    try:
+        seconds = parse_interval(text)
+    except ValueError:
+        raise ValueError(
+            f"Некорректное время '{text}'. Пример: 2026-01-13T21:00 или 24h"
+        ) from None
+    return (now if now is not None else datetime.now().timestamp()) - seconds
+
+
+@dataclass
+class OhlcBar:
+    start: float
+    open: float
+    high: float
+    low: float
+    close: float
+    count: int
+
+
+class PairSeries:
+    """Отсортированная по времени история одной пары."""
+
+    def __init__(self, timestamps: array, rates: array) -> None:
+        self.timestamps = timestamps
+        self.rates = rates
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def inverted(self) -> "PairSeries":
+        return PairSeries(
+            self.timestamps, array("d", (1 / r if r else 0.0 for r in self.rates))
+        )
+
+    def rate_at(self, ts: float) -> tuple[float, float] | None:
+        """Последний известный курс на момент ts: (курс, время курса) или None."""
+        i = bisect_right(self.timestamps, ts)
+        if i == 0:
+            return None
+        return self.rates[i - 1], self.timestamps[i - 1]
+
+    def _bounds(self, since: float | None, until: float | None) -> tuple[int, int]:
+        lo = 0 if since is None else bisect_left(self.timestamps, since)
+        hi = len(self.timestamps) if until is None else bisect_right(
+            self.timestamps, until
+        )
+        return lo, hi
+
+    def range(
+        self, since: float | None = None, until: float | None = None
+    ) -> list[tuple[float, float]]:
+        """Точки (время, курс) в интервале [since, until]."""
+        lo, hi = self._bounds(since, until)
+        return list(zip(self.timestamps[lo:hi], self.rates[lo:hi]))
+
+    def ohlc(
+        self,
+        interval: int,
+        since: float | None = None,
+        until: float | None = None,
+    ) -> list[OhlcBar]:
+        """Свечи OHLC с шагом interval секунд; пустые интервалы пропускаются."""
+        lo, hi = self._bounds(since, until)
+        if lo >= hi:
+            return []
+
+        ts, rates = self.timestamps, self.rates
+        bars = []
+        # свечи выровнены по epoch: 1h -> начало часа, 1d -> полночь UTC
+        bucket = ts[lo] - ts[lo] % interval
+        i = lo
+        while i < hi:
+            j = bisect_left(ts, bucket + interval, i, hi)
+            if j > i:
+                window = rates[i:j]
+                bars.append(
+                    OhlcBar(
+                        start=bucket,
+                        open=window[0],
+                        high=max(window),
+                        low=min(window),
+                        close=window[-1],
+                        count=j - i,
+                    )
+                )
+                i = j
+            # следующая непустая свеча — прыжком через пустые интервалы
+            if i < hi:
+                bucket = ts[i] - ts[i] % interval
+        return bars
+
+
+class RateHistory:
+    """
+    Индекс истории курсов по парам поверх хранилища RatesStorage.
+
+    Колоночная история индексируется лениво: серия пары собирается при первом
+    запросе к ней отбором строк по колонке id пар (в C, без цикла Python по
+    всем точкам). JSONL-история на запрос с границами (since/until) читает
+    по индексу сегментов только сегменты пары и интервала; без границ она,
+    как и json, читается целиком один раз.
+    """
+
+    def __init__(self, storage: RatesStorage | None = None) -> None:
+        self.storage = storage or RatesStorage()
+        self._series: dict[str, PairSeries] = {}
+        self._pairs: list[str] | None = None
+        self._format = self.storage.config.HISTORY_FORMAT
+        self._segments_loaded = False
+
+    def _load(self) -> None:
+        if self._format == "columnar":
+            with self.storage.columnar.view() as view:
+                self._pairs = list(view.pairs)
+            return
+        if self._format == "jsonl":
+            # пары — из индекса сегментов, сами сегменты читаются по запросу
+            self._pairs = list(
+                dict.fromkeys(
+                    pair
+                    for seg in self.storage.segments.segments()
+                    for pair in seg["pairs"]
+                )
+            )
+            return
+
+        self._series.update(_collect(self._json_entries()))
+        self._pairs = list(self._series)
+
+    def _json_entries(self) -> Iterator[tuple[str, float, float]]:
+        for entry in self.storage.read_json(self.storage.config.HISTORY_FILE_PATH):
+            try:
+                pair = f"{entry['from_currency']}_{entry['to_currency']}"
+                yield pair, to_epoch(entry["timestamp"]), float(entry["rate"])
+            except (KeyError, TypeError, ValueError):
+                continue
+
+    def _load_pair(self, pair: str) -> PairSeries | None:
+        """Серия одной пары из колоночной истории."""
+        with self.storage.columnar.view() as view:
+            try:
+                pid = view.pairs.index(pair)
+            except ValueError:
+                return None
+            # маска строк пары: bytes из map/compress — без байткода на точку
+            mask = bytes(map(pid.__eq__, view.pair_ids))
+            ts = array("d", compress(view.timestamps, mask))
+            rates = array("d", compress(view.rates, mask))
+        if not ts:
+            return None
+        series = self._series[pair] = _sorted_series(ts, rates)
+        return series
+
+    def _load_segments(
+        self, pair: str, since: float | None, until: float | None
+    ) -> PairSeries | None:
+        """Серия пары из JSONL-сегментов: без границ — вся история сразу."""
+        if since is None and until is None:
+            if not self._segments_loaded:
+                entries = self.storage.segments.iter_entries()
+                self._series.update(
+                    _collect((e["pair"], e["ts"], e["rate"]) for e in entries)
+                )
+                self._segments_loaded = True
+            return self._series.get(pair)
+        # частичная серия по границам запроса в кэш не кладётся
+        entries = self.storage.segments.iter_entries(since, until, {pair})
+        return _collect((e["pair"], e["ts"], e["rate"]) for e in entries).get(pair)
+
+    def _get(
+        self, pair: str, since: float | None, until: float | None
+    ) -> PairSeries | None:
+        series = self._series.get(pair)
+        if series is not None or pair not in self._pairs:
+            return series
+        if self._format == "columnar":
+            return self._load_pair(pair)
+        if self._format == "jsonl":
+            return self._load_segments(pair, since, until)
+        return None
+
+    def pairs(self) -> list[str]:
+        if self._pairs is None:
+            self._load()
+        return sorted(self._pairs)
+
+    def series(
+        self,
+        from_code: str,
+        to_code: str,
+        since: float | None = None,
+        until: float | None = None,
+    ) -> PairSeries | None:
+        """
+        История пары; для обратной пары (USD->BTC) курс инвертируется.
+        since/until — границы запроса: серия гарантированно содержит точки
+        из [since, until] (для JSONL-истории — только их).
+        """
+        if self._pairs is None:
+            self._load()
+        direct = self._get(f"{from_code}_{to_code}", since, until)
+        if direct is not None:
+            return direct
+        reverse = self._get(f"{to_code}_{from_code}", since, until)
+        if reverse is not None:
+            return reverse.inverted()
+        return None
+
+
+def _collect(entries: Iterable[tuple[str, float, float]]) -> dict[str, PairSeries]:
+    """(пара, время, курс) -> отсортированные серии по парам."""
+    columns: dict[str, tuple[array, array]] = {}
+    for pair, ts, rate in entries:
+        col = columns.get(pair)
+        if col is None:
+            col = columns[pair] = (array("d"), array("d"))
+        col[0].append(ts)
+        col[1].append(rate)
+    return {pair: _sorted_series(ts, rates) for pair, (ts, rates) in columns.items()}
+
+
+def _sorted_series(ts: array, rates: array) -> PairSeries:
+    # история обычно уже упорядочена; сортируем только если нет
+    if not all(map(le, ts, islice(ts, 1, None))):
+        order = sorted(range(len(ts)), key=ts.__getitem__)
+        ts = array("d", (ts[k] for k in order))
+        rates = array("d", (rates[k] for k in order))
+    return PairSeries(ts, rates)
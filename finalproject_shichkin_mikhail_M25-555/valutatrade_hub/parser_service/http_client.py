@@ -0,0 +1,178 @@
+"""
+Общий HTTP-слой клиентов курсов.
+
+Один requests.Session на процесс: пул соединений и keep-alive, поэтому
+очередной тик планировщика не платит за новое TCP+TLS-рукопожатие.
+Временные сбои (обрыв соединения, таймаут, 429 и 5xx) повторяются с
+ограниченной экспоненциальной задержкой и случайным разбросом (full jitter).
+Успешно разобранный ответ запоминается по ETag/Last-Modified вместе со
+списком его ключей (пар): следующий запрос идёт условным, и на 304 Not
+Modified get_json возвращает None — без разбора и записи. Валидаторы
+хранятся в файле рядом с rates.json, поэтому условные запросы работают
+и у разовых процессов (--exec, cron).
+"""
+
+import random
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from valutatrade_hub.infra.fileio import atomic_write_json, read_json
+from valutatrade_hub.infra.locks import file_lock
+from valutatrade_hub.infra.settings import SettingsLoader
+from valutatrade_hub.parser_service.config import ParserConfig
+
+# статусы, которые имеет смысл повторить
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class HttpSession:
+    """requests.Session с пулом соединений, повторами и условными запросами."""
+
+    def __init__(
+        self,
+        timeout: float,
+        retries: int = 3,
+        backoff: float = 0.5,
+        backoff_max: float = 8.0,
+        pool_size: int = 10,
+        state_file: str | None = None,
+        lock_file: str | None = None,
+    ) -> None:
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # url -> {"headers": If-None-Match / If-Modified-Since, "keys": [...]}:
+        # заголовки условного запроса и ключи последнего успешного ответа
+        self._validators: dict[str, dict] | None = None
+        self._lock = threading.Lock()
+        self.state_file = Path(state_file) if state_file else None
+        self.lock_file = Path(lock_file) if lock_file else None
+
+    def _entries(self) -> dict[str, dict]:
+        """Валидаторы; из файла читаются один раз (вызывать под self._lock)."""
+        if self._validators is None:
+            data = read_json(self.state_file, {}) if self.state_file else {}
+            self._validators = data if isinstance(data, dict) else {}
+        return self._validators
+
+    def _save(self, url: str, entry: dict | None) -> None:
+        # файл общий для процессов: меняем только свою запись под блокировкой
+        if self.state_file is None:
+            return
+        with file_lock(self.lock_file or self.state_file.with_suffix(".lock")):
+            data = read_json(self.state_file, {})
+            if not isinstance(data, dict):
+                data = {}
+            if entry is None:
+                if data.pop(url, None) is None:
+                    return
+            else:
+                data[url] = entry
+            atomic_write_json(self.state_file, data)
+
+    def _delay(self, attempt: int, retry_after: str | None = None) -> float:
+        # Retry-After в секундах уважаем, но не дольше backoff_max
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2**attempt))
+
+    def get_json(
+        self,
+        url: str,
+        parse: Callable[[dict], dict] | None = None,
+        conditional: bool = True,
+    ) -> dict | None:
+        """
+        GET с повторами; возвращает JSON, разобранный parse (если задан), или
+        None, если сервер ответил 304 (данные не изменились). Валидаторы ответа
+        запоминаются, только если parse отработал без исключения: ответ с
+        ошибкой не должен подтверждаться последующими 304.
+        Ошибки сети и HTTP — requests.RequestException, ошибки parse — как есть.
+        """
+        with self._lock:
+            entry = self._entries().get(url) if conditional else None
+        headers = dict(entry["headers"]) if entry else {}
+
+        error: requests.RequestException | None = None
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            else:
+                if response.status_code == 304:
+                    return None
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    data = response.json()
+                    if parse is not None:
+                        data = parse(data)
+                    self._remember(url, response, data)
+                    return data
+                retry_after = response.headers.get("Retry-After")
+                error = requests.HTTPError(
+                    f"{response.status_code} {response.reason}", response=response
+                )
+            if attempt < self.retries:
+                time.sleep(self._delay(attempt, retry_after))
+        raise error
+
+    def _remember(self, url: str, response: requests.Response, data) -> None:
+        validators = {}
+        if response.headers.get("ETag"):
+            validators["If-None-Match"] = response.headers["ETag"]
+        if response.headers.get("Last-Modified"):
+            validators["If-Modified-Since"] = response.headers["Last-Modified"]
+        entry = None
+        if validators:
+            keys = sorted(data) if isinstance(data, dict) else []
+            entry = {"headers": validators, "keys": keys}
+        with self._lock:
+            entries = self._entries()
+            if entry == entries.get(url):
+                return
+            if entry is None:
+                entries.pop(url, None)
+            else:
+                entries[url] = entry
+        self._save(url, entry)
+
+    def confirmed_keys(self, url: str) -> list[str]:
+        """Ключи последнего успешного ответа url — то, что подтверждает 304."""
+        with self._lock:
+            entry = self._entries().get(url)
+        return list(entry["keys"]) if entry else []
+
+
+_session: HttpSession | None = None
+_session_lock = threading.Lock()
+
+
+def get_session(config: ParserConfig) -> HttpSession:
+    """Возвращает общий для процесса HttpSession."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = HttpSession(
+                timeout=config.REQUEST_TIMEOUT,
+                retries=config.HTTP_RETRIES,
+                backoff=config.HTTP_BACKOFF,
+                backoff_max=config.HTTP_BACKOFF_MAX,
+                pool_size=config.HTTP_POOL_SIZE,
+                state_file=config.HTTP_CACHE_FILE_PATH,
+                lock_file=str(Path(SettingsLoader().get("LOCKS_DIR")) / "http.lock"),
+            )
+        return _session
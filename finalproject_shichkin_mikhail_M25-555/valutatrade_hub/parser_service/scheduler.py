@@ -1,44 +1,276 @@
+import argparse
+import math
+import random
+import signal
+import threading
 import time
+from collections import deque
+from dataclasses import dataclass
 
+from valutatrade_hub.logging_config import get_logger
 from valutatrade_hub.parser_service.api_clients import (
+    BaseApiClient,
     CoinGeckoClient,
     ExchangeRateApiClient,
 )
 from valutatrade_hub.parser_service.config import ParserConfig
 from valutatrade_hub.parser_service.storage import RatesStorage
-from valutatrade_hub.parser_service.updater import RatesUpdater
+from valutatrade_hub.parser_service.updater import RatesUpdater, UpdateResult
 
+logger = get_logger("scheduler")
 
-def run_scheduler(interval_minutes: float = 0.1, one_time: bool = True) -> None:
+
+@dataclass
+class Source:
+    """Источник курсов со своим расписанием (сроки — по time.monotonic())."""
+
+    name: str
+    client: BaseApiClient
+    interval: float
+    effective: float = 0.0  # текущий интервал (в адаптивном режиме — короче)
+    due: float = 0.0  # срок по расписанию, без разброса
+    fire_at: float = 0.0  # фактический срок с учётом разброса
+    failures: int = 0
+
+
+class RatesScheduler:
+    """
+    Планировщик обновления курсов: у каждого источника свой интервал.
+
+    Сроки отсчитываются по монотонным часам от предыдущего срока, а не от
+    конца обновления, поэтому расписание не «уплывает» на длительность
+    запросов. Разброс (jitter) применяется к каждому сроку отдельно и не
+    накапливается. Сбойный источник опрашивается с экспоненциальной
+    задержкой: не дольше max_backoff, но и не чаще своего интервала. В
+    адаптивном режиме интервал источника сокращается, если его курсы в
+    последних опросах заметно менялись.
+    """
+
+    def __init__(
+        self,
+        updater: RatesUpdater,
+        sources: list[Source],
+        jitter: float = 0.1,
+        max_backoff: float = 900.0,
+        adaptive: bool = False,
+        target_volatility: float = 0.001,
+        min_factor: float = 0.25,
+        history_size: int = 30,
+    ) -> None:
+        self.updater = updater
+        self.sources = sources
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.adaptive = adaptive
+        self.target_volatility = target_volatility
+        self.min_factor = min_factor
+        self.history_size = history_size
+        # пара -> последние курсы (для оценки изменчивости)
+        self._recent: dict[str, deque] = {}
+        self._source_pairs: dict[str, list[str]] = {}
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Просит планировщик завершиться после текущего обновления."""
+        self._stop.set()
+
+    # расписание
+
+    def _fire_time(self, source: Source) -> float:
+        spread = self.jitter * source.effective
+        return source.due + random.uniform(-spread, spread)
+
+    def _reschedule(self, source: Source, result: UpdateResult, now: float) -> None:
+        name = source.client.__class__.__name__
+        if name in result.failed:
+            source.failures += 1
+            backoff = min(source.effective * 2**source.failures, self.max_backoff)
+            # потолок не делает повтор чаще обычного интервала источника
+            delay = max(source.effective, backoff)
+            source.due = now + delay
+            logger.warning(
+                "Scheduler: %s failed %d times, retry in %.0fs",
+                source.name,
+                source.failures,
+                delay,
+            )
+        else:
+            source.failures = 0
+            if name in result.pairs:
+                self._source_pairs[source.name] = result.pairs[name]
+            if self.adaptive:
+                source.effective = self._adaptive_interval(source)
+            source.due += source.effective
+            if source.due <= now:
+                # обновление заняло больше интервала: пропущенные сроки не
+                # догоняем, а переходим к ближайшему будущему
+                missed = math.ceil((now - source.due) / source.effective)
+                source.due += missed * source.effective
+        source.fire_at = self._fire_time(source)
+
+    # адаптивный интервал
+
+    def _observe(self, rates: dict) -> None:
+        for pair, info in rates.items():
+            recent = self._recent.get(pair)
+            if recent is None:
+                recent = self._recent[pair] = deque(maxlen=self.history_size)
+            recent.append(float(info["rate"]))
+
+    def _seed_recent(self) -> None:
+        """Заполняет окно последних курсов из истории (для адаптивного режима)."""
+        from valutatrade_hub.parser_service.history import RateHistory
+
+        try:
+            history = RateHistory(self.updater.storage)
+            for pair in history.pairs():
+                series = history.series(*pair.split("_"))
+                if series is not None:
+                    self._recent[pair] = deque(
+                        series.rates[-self.history_size :], maxlen=self.history_size
+                    )
+        except Exception as e:
+            logger.warning("Scheduler: history is unavailable: %s", e)
+
+    def _volatility(self, pair: str) -> float:
+        """Средний относительный сдвиг курса между соседними опросами."""
+        recent = self._recent.get(pair)
+        if not recent or len(recent) < 2:
+            return 0.0
+        values = list(recent)
+        changes = [abs(b / a - 1) for a, b in zip(values, values[1:]) if a]
+        return sum(changes) / len(changes) if changes else 0.0
+
+    def _adaptive_interval(self, source: Source) -> float:
+        pairs = self._source_pairs.get(source.name, ())
+        volatility = max((self._volatility(p) for p in pairs), default=0.0)
+        if volatility <= self.target_volatility:
+            return source.interval
+        factor = max(self.target_volatility / volatility, self.min_factor)
+        return source.interval * factor
+
+    # основной цикл
+
+    def run(self, max_cycles: int | None = None) -> None:
+        """Цикл обновлений до stop() (или до max_cycles обновлений)."""
+        if self.adaptive:
+            self._seed_recent()
+        now = time.monotonic()
+        for source in self.sources:
+            source.effective = source.interval
+            source.due = source.fire_at = now
+
+        cycles = 0
+        while not self._stop.is_set():
+            now = time.monotonic()
+            due = [s for s in self.sources if s.fire_at <= now]
+            if not due:
+                next_fire = min(s.fire_at for s in self.sources)
+                # ожидание прерывается сразу по stop()
+                self._stop.wait(next_fire - now)
+                continue
+
+            logger.info("Scheduler: updating %s", ", ".join(s.name for s in due))
+            result = self.updater.run_update(clients=[s.client for s in due])
+            self._observe(result.rates)
+            finished = time.monotonic()
+            for source in due:
+                self._reschedule(source, result, finished)
+
+            cycles += 1
+            if max_cycles is not None and cycles >= max_cycles:
+                break
+        logger.info("Scheduler stopped.")
+
+
+def build_scheduler(
+    config: ParserConfig | None = None,
+    interval_minutes: float | None = None,
+    adaptive: bool = False,
+) -> RatesScheduler:
+    """Планировщик с источниками crypto и fiat из конфигурации."""
+    config = config or ParserConfig()
+    crypto = CoinGeckoClient(config)
+    fiat = ExchangeRateApiClient(config)
+    crypto_interval, fiat_interval = config.CRYPTO_INTERVAL, config.FIAT_INTERVAL
+    # общий интервал (как раньше) перекрывает интервалы источников
+    if interval_minutes is not None:
+        crypto_interval = fiat_interval = interval_minutes * 60
+
+    return RatesScheduler(
+        RatesUpdater(clients=[crypto, fiat], storage=RatesStorage(config)),
+        [
+            Source("crypto", crypto, crypto_interval),
+            Source("fiat", fiat, fiat_interval),
+        ],
+        jitter=config.SCHEDULER_JITTER,
+        max_backoff=config.SCHEDULER_MAX_BACKOFF,
+        adaptive=adaptive,
+        target_volatility=config.ADAPTIVE_TARGET_VOLATILITY,
+        min_factor=config.ADAPTIVE_MIN_FACTOR,
+    )
+
+
+def run_scheduler(
+    interval_minutes: float | None = None,
+    one_time: bool = True,
+    adaptive: bool = False,
+    profile: bool = False,
+) -> None:
     """
     Планировщик обновления курсов валют.
 
     Args:
-        interval_minutes (float): Интервал между обновлениями (в минутах).
+        interval_minutes (float | None): Общий интервал (в минутах); по умолчанию
+            у криптовалют и фиата свои интервалы из ParserConfig.
         one_time (bool): Если True — выполняется только один цикл (для автотестов).
+        adaptive (bool): Чаще опрашивать источники с изменчивыми курсами.
+        profile (bool): Профилировать каждое обновление (см. profiling.py;
+            доля и каталог — VALUTATRADE_PROFILE_RATE / _DIR).
     """
-    mode = "одноразовый" if one_time else "цикличный"
-    print(f"Scheduler запущен. Интервал: {interval_minutes} мин. Режим: {mode}")
+    mode = "одноразовый" if one_time else "демон"
+    print(f"Scheduler запущен. Режим: {mode}")
 
-    config = ParserConfig()
-    updater = RatesUpdater(
-        clients=[CoinGeckoClient(config), ExchangeRateApiClient(config)],
-        storage=RatesStorage(),
-    )
+    if profile:
+        from valutatrade_hub.profiling import enable_profiling
+
+        enable_profiling()
+    scheduler = build_scheduler(interval_minutes=interval_minutes, adaptive=adaptive)
+    if one_time:
+        print("Запуск обновления курсов...")
+        scheduler.updater.run_update()
+        print("Обновление завершено.\n")
+        return
+
+    # SIGINT/SIGTERM: дожидаемся текущего обновления и выходим
+    if threading.current_thread() is threading.main_thread():
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: scheduler.stop())
+    scheduler.run()
 
-    # Выполняем цикл
-    print("Запуск обновления курсов...")
-    updater.run_update()
-    print("Обновление завершено.\n")
-    
-    
-    if not one_time:
-        while True:
-            time.sleep(interval_minutes * 60)
-            print("Запуск следующего обновления...")
-            updater.run_update()
-            print("Цикл завершён.\n")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Планировщик обновления курсов")
+    parser.add_argument(
+        "--daemon", action="store_true", help="работать непрерывно до SIGTERM/Ctrl+C"
+    )
+    parser.add_argument(
+        "--interval", type=float, help="общий интервал в минутах для всех источников"
+    )
+    parser.add_argument(
+        "--adaptive", action="store_true", help="чаще опрашивать изменчивые курсы"
+    )
+    parser.add_argument(
+        "--profile", action="store_true", help="профилировать обновления (cProfile)"
+    )
+    args = parser.parse_args()
+    run_scheduler(
+        interval_minutes=args.interval,
+        one_time=not args.daemon,
+        adaptive=args.adaptive,
+        profile=args.profile,
+    )
 
 
 if __name__ == "__main__":
-    run_scheduler(one_time=True)
\ No newline at end of file
+    main()
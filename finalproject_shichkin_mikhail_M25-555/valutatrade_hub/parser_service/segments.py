@@ -0,0 +1,224 @@
+"""
+Сегментированная история курсов в формате JSON Lines.
+
+Записи дописываются строками в активный сегмент
+    data/exchange_rates.segments/seg-<YYYYMMDD>-<NNNNNN>.jsonl
+Сегмент закрывается при превышении размера или смене суток (UTC).
+Рядом лежит index.json: для каждого сегмента — интервал времени, пары
+и число записей. По индексу читатель пропускает целые сегменты,
+а старые сегменты можно архивировать независимо от остальных.
+"""
+
+import json
+import shutil
+from collections.abc import Callable, Iterator
+from datetime import datetime, timezone
+from pathlib import Path
+
+from valutatrade_hub.infra.fileio import atomic_write_json, read_json
+from valutatrade_hub.infra.locks import file_lock
+from valutatrade_hub.parser_service.columnar import to_epoch
+
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y%m%d")
+
+
+def json_history_entries(items: list) -> list[dict]:
+    """Записи старого exchange_rates.json -> записи сегментов."""
+    entries = []
+    if not isinstance(items, list):
+        return entries
+    for item in items:
+        try:
+            entries.append(
+                {
+                    "pair": f"{item['from_currency']}_{item['to_currency']}",
+                    "ts": to_epoch(item["timestamp"]),
+                    "timestamp": item["timestamp"],
+                    "rate": float(item["rate"]),
+                    "source": item.get("source", ""),
+                }
+            )
+        except (KeyError, TypeError, ValueError):
+            continue
+    return entries
+
+
+class SegmentedHistory:
+    """История курсов из ротируемых JSONL-сегментов с индексом."""
+
+    def __init__(self, path: str, max_segment_bytes: int = 1024 * 1024) -> None:
+        self.path = Path(path)
+        self.index_path = self.path / "index.json"
+        self.lock_path = self.path / ".lock"
+        self.max_segment_bytes = max_segment_bytes
+
+    def exists(self) -> bool:
+        return self.index_path.exists()
+
+    def read_index(self) -> list[dict]:
+        index = read_json(self.index_path, [])
+        return index if isinstance(index, list) else []
+
+    # запись
+
+    def _new_segment(self, index: list[dict], day: str) -> dict:
+        # сквозной номер: активный сегмент не архивируется, поэтому
+        # номер последнего сегмента в индексе всегда максимальный
+        seq = index[-1]["seq"] + 1 if index else 0
+        segment = {
+            "file": f"seg-{day}-{seq:06d}.jsonl",
+            "seq": seq,
+            "day": day,
+            "start": None,
+            "end": None,
+            "pairs": [],
+            "count": 0,
+            "bytes": 0,
+        }
+        index.append(segment)
+        return segment
+
+    def append(
+        self,
+        entries: list[dict],
+        initial: Callable[[], list[dict]] | None = None,
+    ) -> None:
+        """
+        Дописывает записи {"pair", "ts", "timestamp", "rate", "source"}.
+        Записи одного вызова попадают в сегменты одним write на сегмент.
+        initial() — записи, которые пишутся перед entries, если истории ещё
+        нет; проверка и запись идут под одной блокировкой.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        with file_lock(self.lock_path):
+            if initial is not None and not self.exists():
+                entries = initial() + entries
+            if not entries:
+                return
+            index = self.read_index()
+            active = index[-1] if index else None
+
+            # группируем строки по сегментам с учётом ротации
+            pending: list[tuple[dict, list[bytes]]] = []
+            for entry in entries:
+                line = (
+                    json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+                    + "\n"
+                ).encode("utf-8")
+                day = _day(entry["ts"])
+                if (
+                    active is None
+                    or active["day"] != day
+                    or (
+                        active["count"] > 0
+                        and active["bytes"] + len(line) > self.max_segment_bytes
+                    )
+                ):
+                    active = self._new_segment(index, day)
+                if not pending or pending[-1][0] is not active:
+                    pending.append((active, []))
+                pending[-1][1].append(line)
+
+                active["bytes"] += len(line)
+                active["count"] += 1
+                ts = entry["ts"]
+                active["start"] = ts if active["start"] is None else min(
+                    active["start"], ts
+                )
+                active["end"] = ts if active["end"] is None else max(active["end"], ts)
+                if entry["pair"] not in active["pairs"]:
+                    active["pairs"].append(entry["pair"])
+
+            for segment, lines in pending:
+                with (self.path / segment["file"]).open("ab") as f:
+                    f.write(b"".join(lines))
+
+            # индекс пишется после данных, поэтому никогда не ссылается
+            # на строки, которых ещё нет на диске
+            atomic_write_json(self.index_path, index)
+
+    # чтение
+
+    def segments(
+        self,
+        since: float | None = None,
+        until: float | None = None,
+        pairs: set[str] | None = None,
+    ) -> list[dict]:
+        """Сегменты индекса, которые могут содержать подходящие записи."""
+        selected = []
+        for seg in self.read_index():
+            if seg["count"] == 0:
+                continue
+            if since is not None and seg["end"] < since:
+                continue
+            if until is not None and seg["start"] > until:
+                continue
+            if pairs is not None and not pairs.intersection(seg["pairs"]):
+                continue
+            selected.append(seg)
+        return selected
+
+    def iter_entries(
+        self,
+        since: float | None = None,
+        until: float | None = None,
+        pairs: set[str] | None = None,
+    ) -> Iterator[dict]:
+        """Перебирает записи в [since, until], читая только нужные сегменты."""
+        for seg in self.segments(since, until, pairs):
+            # сегмент целиком внутри интервала — фильтр по времени не нужен
+            inside = (since is None or seg["start"] >= since) and (
+                until is None or seg["end"] <= until
+            )
+            path = self.path / seg["file"]
+            if not path.exists():
+                continue
+            with path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # недописанная строка
+                    if pairs is not None and entry["pair"] not in pairs:
+                        continue
+                    if not inside and (
+                        (since is not None and entry["ts"] < since)
+                        or (until is not None and entry["ts"] > until)
+                    ):
+                        continue
+                    yield entry
+
+    # архивирование
+
+    def archive(self, before: float, archive_dir: str) -> list[str]:
+        """
+        Переносит в archive_dir сегменты, целиком закончившиеся раньше before.
+        Активный (последний) сегмент не трогается. Возвращает имена файлов.
+        """
+        target = Path(archive_dir)
+        target.mkdir(parents=True, exist_ok=True)
+        moved = []
+
+        with file_lock(self.lock_path):
+            index = self.read_index()
+            keep = []
+            for i, seg in enumerate(index):
+                is_active = i == len(index) - 1
+                if not is_active and seg["end"] is not None and seg["end"] < before:
+                    src = self.path / seg["file"]
+                    if src.exists():
+                        shutil.move(str(src), target / seg["file"])
+                    moved.append(seg["file"])
+                else:
+                    keep.append(seg)
+            if moved:
+                atomic_write_json(self.index_path, keep)
+                archived = read_json(target / "index.json", [])
+                archived.extend(seg for seg in index if seg["file"] in moved)
+                atomic_write_json(target / "index.json", archived)
+
+        return moved
@@ -3,7 +3,19 @@ import os
 import tempfile
 from datetime import datetime, timezone
 
+from valutatrade_hub.core.rate_graph import CrossRates
+from valutatrade_hub.core.rates_cache import get_rates_cache
+from valutatrade_hub.infra.repository import get_repository
+from valutatrade_hub.parser_service.columnar import (
+    ColumnarHistory,
+    json_history_rows,
+    to_epoch,
+)
 from valutatrade_hub.parser_service.config import ParserConfig
+from valutatrade_hub.parser_service.segments import (
+    SegmentedHistory,
+    json_history_entries,
+)
 
 
 class RatesStorage:
@@ -11,6 +23,11 @@ class RatesStorage:
 
     def __init__(self, config: ParserConfig | None = None):
         self.config = config or ParserConfig()
+        self.columnar = ColumnarHistory(self.config.HISTORY_COLUMNAR_PATH)
+        self.segments = SegmentedHistory(
+            self.config.HISTORY_SEGMENTS_PATH,
+            self.config.HISTORY_SEGMENT_MAX_BYTES,
+        )
 
 
     # чтение JSON
@@ -44,7 +61,14 @@ class RatesStorage:
   
     # Добавление в history
     def append_exchange_history(self, rates: dict):
-        """Добавляем новые записи в exchange_rates.json."""
+        """Добавляем новые записи в историю курсов (формат — HISTORY_FORMAT)."""
+        if self.config.HISTORY_FORMAT == "columnar":
+            self._append_columnar_history(rates)
+            return
+        if self.config.HISTORY_FORMAT == "jsonl":
+            self._append_segmented_history(rates)
+            return
+
         history = self.read_json(self.config.HISTORY_FILE_PATH)
         if not isinstance(history, list):
             history = []
@@ -63,13 +87,71 @@ class RatesStorage:
 
         self._atomic_write(self.config.HISTORY_FILE_PATH, history)
 
+    def _append_columnar_history(self, rates: dict):
+        """Дописываем записи в колоночную историю (без перезаписи файлов)."""
+        rows = [
+            (pair, to_epoch(info["updated_at"]), float(info["rate"]), info["source"])
+            for pair, info in rates.items()
+        ]
+        # при первом переходе переносим накопленный exchange_rates.json
+        self.columnar.append(
+            rows,
+            initial=lambda: json_history_rows(
+                self.read_json(self.config.HISTORY_FILE_PATH)
+            ),
+        )
+
+    def _append_segmented_history(self, rates: dict):
+        """Дописываем строки в активный JSONL-сегмент (O(1) write)."""
+        entries = []
+        for pair, info in rates.items():
+            entries.append(
+                {
+                    "pair": pair,
+                    "ts": to_epoch(info["updated_at"]),
+                    "timestamp": info["updated_at"],
+                    "rate": float(info["rate"]),
+                    "source": info["source"],
+                }
+            )
+        # при первом переходе переносим накопленный exchange_rates.json
+        self.segments.append(
+            entries,
+            initial=lambda: json_history_entries(
+                self.read_json(self.config.HISTORY_FILE_PATH)
+            ),
+        )
+
 
     # Обновление
     
     def update_rates_cache(self, rates: dict):
-        """Перезаписываем актуальный кэш rates.json."""
-        cache = {
-            "pairs": rates,
-            "last_refresh": datetime.now(timezone.utc).isoformat(),
+        """
+        Обновляем кэш курсов (rates.json или таблица rates — через общее
+        хранилище). Матрица кросс-курсов считается один раз на обновление
+        по всем известным курсам: пары клиентов, не ответивших в этот раз,
+        остаются в ней со своим (более старым) временем.
+        """
+        repository = get_repository()
+        pairs = repository.load_rates()
+        pairs.update(rates)
+        repository.save_rates(rates, CrossRates.from_pairs(pairs).to_dict())
+        # кэш этого процесса перечитает курсы при следующем обращении
+        get_rates_cache().invalidate()
+
+    def revalidate(self, confirmed: dict[str, str]) -> int:
+        """
+        Источники ответили 304: подтверждённые пары {пара: источник} по-прежнему
+        актуальны. Им обновляется время (и версия кэша курсов), если курс
+        в хранилище от того же источника; история курсов не дописывается.
+        Возвращает число обновлённых пар.
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        pairs = {
+            pair: {**info, "updated_at": now}
+            for pair, info in get_repository().load_rates().items()
+            if pair in confirmed and info.get("source") == confirmed[pair]
         }
-        self._atomic_write(self.config.RATES_FILE_PATH, cache)
\ No newline at end of file
+        if pairs:
+            self.update_rates_cache(pairs)
+        return len(pairs)
@@ -1,58 +1,148 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
 from valutatrade_hub.core.exceptions import ApiRequestError
-from valutatrade_hub.logging_config import setup_logger
+from valutatrade_hub.logging_config import get_logger
+from valutatrade_hub.metrics import get_metrics
 from valutatrade_hub.parser_service.api_clients import (
     CoinGeckoClient,
     ExchangeRateApiClient,
 )
 from valutatrade_hub.parser_service.config import ParserConfig
 from valutatrade_hub.parser_service.storage import (
-    RatesStorage,  
+    RatesStorage,
 )
+from valutatrade_hub.profiling import profiled
+
+logger = get_logger("parser")
+
+
+@dataclass
+class UpdateResult:
+    """
+    Итог одного обновления: курсы, время ответа клиентов, клиенты без
+    изменений (HTTP 304) и сбойные клиенты.
+    """
+
+    rates: dict = field(default_factory=dict)
+    # клиент -> пары, которые он вернул в этом обновлении
+    pairs: dict[str, list[str]] = field(default_factory=dict)
+    timings: dict[str, float] = field(default_factory=dict)
+    unchanged: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
 
-logger = setup_logger()
-config = ParserConfig()
+
+def _timed_fetch(client) -> tuple[dict, float]:
+    started = time.monotonic()
+    result = client.fetch_rates()
+    return result, time.monotonic() - started
 
 
 class RatesUpdater:
     """Координация обновления курсов валют."""
 
-    def __init__(self, clients=None, storage=None):
+    def __init__(self, clients=None, storage=None, deadline=None):
         """Инициализация обновления с возможностью передачи клиентов и хранилища."""
+        config = ParserConfig()
         self.clients = clients or [
             CoinGeckoClient(config),
             ExchangeRateApiClient(config),
         ]
-        self.storage = storage or RatesStorage()  
+        self.storage = storage or RatesStorage()
+        self.deadline = deadline if deadline is not None else config.UPDATE_DEADLINE
+
+    def run_update(self, clients=None) -> UpdateResult:
+        """
+        Опрашивает клиентов параллельно (по потоку на клиента) с общим сроком
+        self.deadline: длительность цикла — самый медленный ответ, а не сумма.
+        Курсы клиентов, не уложившихся в срок или упавших, пропускаются,
+        остальные сохраняются. clients — подмножество self.clients.
+        """
+        with profiled("update-rates"):
+            return self._run_update(clients)
 
-    def run_update(self):
+    def _run_update(self, clients=None) -> UpdateResult:
+        clients = clients or self.clients
         logger.info("Starting rates update...")
-        all_rates = {}
-        total = 0
-        errors = 0
+        result = UpdateResult()
+        started = time.monotonic()
 
-        for client in self.clients:
+        pool = ThreadPoolExecutor(
+            max_workers=len(clients), thread_name_prefix="rates-update"
+        )
+        futures = {}
+        by_name = {client.__class__.__name__: client for client in clients}
+        for client in clients:
             name = client.__class__.__name__
+            logger.info("Fetching from %s...", name)
+            futures[pool.submit(_timed_fetch, client)] = name
+        done, pending = wait(futures, timeout=self.deadline)
+        # зависшие запросы не ждём: их потоки завершатся по REQUEST_TIMEOUT
+        pool.shutdown(wait=False, cancel_futures=True)
+
+        metrics = get_metrics()
+        for future in done:
+            name = futures[future]
             try:
-                logger.info(f"Fetching from {name}...")
-                result = client.fetch_rates()
-                logger.info(f"{name}: OK ({len(result)} rates)")
-                all_rates.update(result)
-                total += len(result)
+                rates, elapsed = future.result()
+                result.timings[name] = elapsed
+                metrics.observe(
+                    "valutatrade_provider_fetch_seconds", elapsed, provider=name
+                )
+                if rates is None:
+                    logger.info("%s: not modified (%.2fs)", name, elapsed)
+                    result.unchanged.append(name)
+                    continue
+                logger.info("%s: OK (%d rates, %.2fs)", name, len(rates), elapsed)
+                result.rates.update(rates)
+                result.pairs[name] = list(rates)
             except ApiRequestError as e:
-                logger.error(f"{name} failed: {e}")
-                errors += 1
+                logger.error("%s failed: %s", name, e)
+                result.failed.append(name)
             except Exception as e:
-                logger.error(f"{name} unexpected error: {e}")
-                errors += 1
+                logger.error("%s unexpected error: %s", name, e)
+                result.failed.append(name)
+        for future in pending:
+            name = futures[future]
+            logger.error("%s failed: no response within %ss", name, self.deadline)
+            result.failed.append(name)
 
+        for names, status in (
+            (result.pairs, "ok"),
+            (result.unchanged, "not_modified"),
+            (result.failed, "failed"),
+        ):
+            for name in names:
+                metrics.inc(
+                    "valutatrade_provider_results_total", provider=name, result=status
+                )
+
+        all_rates = result.rates
         if all_rates:
             self.storage.append_exchange_history(all_rates)
             self.storage.update_rates_cache(all_rates)
-            logger.info(f"Updated {total} rates successfully.")
-        else:
+            logger.info(
+                "Updated %d rates successfully in %.2fs.",
+                len(all_rates),
+                time.monotonic() - started,
+            )
+        if result.unchanged:
+            # 304: источник подтвердил курсы последнего успешного ответа —
+            # они снова свежие, а не стареют до TTL при исправном источнике
+            confirmed = {
+                pair: client.source
+                for client in (by_name[n] for n in result.unchanged)
+                if client.source
+                for pair in client.confirmed_pairs()
+            }
+            revalidated = self.storage.revalidate(confirmed) if confirmed else 0
+            logger.info("Rates not modified, revalidated %d rates.", revalidated)
+        elif not all_rates:
             logger.warning("No rates fetched.")
 
-        if errors:
-            logger.warning(f"Update completed with {errors} errors.")
+        if result.failed:
+            logger.warning("Update completed with %d errors.", len(result.failed))
         else:
-            logger.info("Update successful.")
\ No newline at end of file
+            logger.info("Update successful.")
+        return result
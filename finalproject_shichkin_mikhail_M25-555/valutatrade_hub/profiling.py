@@ -0,0 +1,219 @@
+"""
+Профилирование команд CLI и обновления курсов.
+
+Включается флагом --profile у `project` и у планировщика. Для каждой
+профилируемой команды в каталог профилей пишутся:
+- <имя>.pstats     — статистика cProfile (python -m pstats, snakeviz);
+- <имя>.collapsed  — свёрнутые стеки «a;b;c мкс» для flamegraph.pl/speedscope;
+- <имя>.alloc.txt  — пик памяти и топ мест выделения памяти (tracemalloc).
+
+Профилируется только доля вызовов (rate) и только нужные команды
+(commands), поэтому режим можно оставлять включённым на части запусков.
+В процессе одновременно может работать только один профилировщик
+(в Python 3.12+ второй cProfile.enable() падает с ValueError), поэтому
+профилируются только команды основного потока и не больше одной за раз.
+Фоновые обновления курсов (stale-while-revalidate) и вложенные команды
+выполняются без профиля; запросы клиентов курсов в рабочих потоках
+RatesUpdater попадают в профиль команды как ожидание.
+"""
+
+import os
+import random
+import re
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from valutatrade_hub.logging_config import get_logger
+
+logger = get_logger("profiling")
+
+# ограничения при восстановлении стеков: глубина и минимальное время пути
+# (без отсечения число путей в графе вызовов растёт экспоненциально)
+MAX_STACK_DEPTH = 64
+MIN_PATH_SECONDS = 5e-6
+
+
+def _label(func: tuple) -> str:
+    filename, line, name = func
+    if filename == "~":  # встроенные функции: ('~', 0, "<built-in ...>")
+        return name
+    return f"{name} ({Path(filename).name}:{line})"
+
+
+def collapsed_stacks(stats) -> dict[str, float]:
+    """
+    Свёрнутые стеки из pstats.Stats: {"a;b;c": собственное время, мкс}.
+
+    cProfile хранит только пары вызывающий → вызываемый, поэтому стеки
+    восстанавливаются обходом от корней: время функции делится между
+    путями пропорционально накопленному времени вызовов по каждому ребру.
+    """
+    children: dict[tuple, dict[tuple, float]] = {}
+    roots = []
+    for func, (_cc, _nc, _tt, _ct, callers) in stats.stats.items():
+        if not callers:
+            roots.append(func)
+        for caller, edge in callers.items():
+            children.setdefault(caller, {})[func] = edge[3]
+
+    stacks: dict[str, float] = {}
+
+    def walk(func: tuple, share: float, path: list[str], seen: set) -> None:
+        tottime = stats.stats[func][2]
+        path.append(_label(func))
+        own = tottime * share * 1e6
+        if own >= 1:
+            key = ";".join(path)
+            stacks[key] = stacks.get(key, 0.0) + own
+        if len(path) < MAX_STACK_DEPTH:
+            for child, edge_time in children.get(func, {}).items():
+                child_total = stats.stats[child][3]
+                if child in seen or share * edge_time < MIN_PATH_SECONDS:
+                    continue
+                seen.add(child)
+                walk(child, share * min(edge_time / child_total, 1.0), path, seen)
+                seen.discard(child)
+        path.pop()
+
+    for root in roots:
+        walk(root, 1.0, [], {root})
+    return stacks
+
+
+class Profiler:
+    """cProfile + tracemalloc для выборки команд."""
+
+    def __init__(
+        self,
+        out_dir: str,
+        rate: float = 1.0,
+        commands: set[str] | None = None,
+        memory: bool = True,
+        top: int = 25,
+    ) -> None:
+        self.out_dir = Path(out_dir)
+        self.rate = rate
+        self.commands = commands or set()
+        self.memory = memory
+        self.top = top
+        # один профиль на процесс, а не на поток: cProfile не допускает двух
+        self._busy = threading.Lock()
+        self._seq = 0
+        self._seq_lock = threading.Lock()
+
+    def wanted(self, name: str) -> bool:
+        if self.commands and name not in self.commands:
+            return False
+        return self.rate >= 1.0 or random.random() < self.rate
+
+    @contextmanager
+    def profile(self, name: str) -> Iterator[None]:
+        """
+        Профилирует блок, если команда выбрана и вызвана в основном потоке;
+        вложенные и параллельные блоки выполняются без профиля.
+        """
+        if (
+            threading.current_thread() is not threading.main_thread()
+            or not self.wanted(name)
+            or not self._busy.acquire(blocking=False)
+        ):
+            yield
+            return
+
+        import cProfile
+        import tracemalloc
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # процесс уже профилирует другой инструмент
+            self._busy.release()
+            yield
+            return
+        trace_memory = self.memory and not tracemalloc.is_tracing()
+        if trace_memory:
+            tracemalloc.start(MAX_STACK_DEPTH)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - started
+            snapshot = tracemalloc.take_snapshot() if trace_memory else None
+            peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+            if trace_memory:
+                tracemalloc.stop()
+            self._busy.release()
+            try:
+                self._write(name, profile, snapshot, peak, elapsed)
+            except OSError as e:
+                logger.warning("Профиль '%s' не записан: %s", name, e)
+
+    def _write(self, name, profile, snapshot, peak: int, elapsed: float) -> None:
+        import pstats
+
+        with self._seq_lock:
+            self._seq += 1
+            seq = self._seq
+        safe = re.sub(r"[^\w.-]+", "_", name) or "command"
+        stem = f"{time.strftime('%Y%m%dT%H%M%S')}-{safe}-{os.getpid()}-{seq}"
+        base = self.out_dir / stem
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+
+        profile.dump_stats(f"{base}.pstats")
+        stats = pstats.Stats(profile)
+        with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+            for stack, micros in sorted(collapsed_stacks(stats).items()):
+                f.write(f"{stack} {round(micros)}\n")
+
+        if snapshot is not None:
+            with open(f"{base}.alloc.txt", "w", encoding="utf-8") as f:
+                f.write(
+                    f"{name}: {elapsed * 1000:.1f} мс, "
+                    f"пик памяти {peak / 1024:.1f} КБ\n"
+                )
+                for stat in snapshot.statistics("lineno")[: self.top]:
+                    frame = stat.traceback[0]
+                    f.write(
+                        f"{stat.size / 1024:10.1f} КБ {stat.count:8} блоков  "
+                        f"{frame.filename}:{frame.lineno}\n"
+                    )
+        logger.info("Профиль '%s' (%.1f мс): %s.*", name, elapsed * 1000, base)
+
+
+_profiler: Profiler | None = None
+
+
+def enable_profiling(
+    out_dir: str | None = None,
+    rate: float | None = None,
+    commands: str | None = None,
+) -> Profiler:
+    """
+    Включает профилирование в процессе. Параметры, не заданные явно, берутся
+    из настроек (VALUTATRADE_PROFILE_DIR, _RATE, _COMMANDS).
+    """
+    from valutatrade_hub.infra.settings import SettingsLoader
+
+    global _profiler
+    settings = SettingsLoader()
+    commands = commands if commands is not None else settings.get("PROFILE_COMMANDS")
+    _profiler = Profiler(
+        out_dir or settings.get("PROFILE_DIR"),
+        rate=rate if rate is not None else settings.get("PROFILE_RATE"),
+        commands={c.strip() for c in commands.split(",") if c.strip()},
+    )
+    return _profiler
+
+
+@contextmanager
+def profiled(name: str) -> Iterator[None]:
+    """Профилирует блок, если профилирование включено; иначе ничего не делает."""
+    if _profiler is None:
+        yield
+        return
+    with _profiler.profile(name):
+        yield